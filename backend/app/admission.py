@@ -0,0 +1,144 @@
+"""
+Admission control: per-budget concurrency limits with early 503s under overload.
+
+Every request is assigned to a budget by route: /student/register (register and
+cancel) has its own, so registrations are never stuck behind a browse storm;
+other GETs share "read", other writes share "write", and /admin exports and
+imports share a small "admin" budget. Health, metrics and the live-calendar
+stream are never limited.
+
+A request over its budget's concurrency waits in a bounded queue. It is rejected
+with 503 and Retry-After, before any work is done, when:
+    queue_full     the budget's queue already holds ADMISSION_MAX_QUEUE requests
+    queue_timeout  no slot freed up within the budget's queue wait
+    pool_pressure  the recent Mongo pool checkout wait is above ADMISSION_POOL_WAIT_MS
+                   (read, write and admin only: registrations keep their share of the pool)
+
+Limits are per worker process; a budget of 0 disables it. Shed counts, queue
+depths and queue waits are exported on /_metrics.
+"""
+import asyncio
+import json
+import os
+import time
+from .metrics import (
+    route_template, recent_checkout_wait,
+    admission_in_flight, admission_queued, admission_queue_wait, requests_shed
+)
+
+ADMISSION_READ_CONCURRENCY = int(os.getenv("ADMISSION_READ_CONCURRENCY", "64"))
+ADMISSION_WRITE_CONCURRENCY = int(os.getenv("ADMISSION_WRITE_CONCURRENCY", "32"))
+ADMISSION_REGISTER_CONCURRENCY = int(os.getenv("ADMISSION_REGISTER_CONCURRENCY", "32"))
+ADMISSION_ADMIN_CONCURRENCY = int(os.getenv("ADMISSION_ADMIN_CONCURRENCY", "4"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "256"))
+ADMISSION_QUEUE_WAIT_MS = int(os.getenv("ADMISSION_QUEUE_WAIT_MS", "500"))
+# Registrations may wait longer: being served late beats being told to retry
+ADMISSION_REGISTER_QUEUE_WAIT_MS = int(os.getenv("ADMISSION_REGISTER_QUEUE_WAIT_MS", "3000"))
+ADMISSION_POOL_WAIT_MS = int(os.getenv("ADMISSION_POOL_WAIT_MS", "200"))
+ADMISSION_RETRY_AFTER_SECONDS = int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "2"))
+
+UNLIMITED_ROUTES = {"/_health", "/_ready", "/_metrics", "/_cache", "/_events", "/student/calendar/stream", "unmatched"}
+
+
+class Budget:
+    def __init__(self, name, concurrency, queue_wait_ms, shed_on_pool_pressure=True):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_wait = queue_wait_ms / 1000
+        self.shed_on_pool_pressure = shed_on_pool_pressure
+        self.waiting = 0
+        self._slots = asyncio.Semaphore(concurrency) if concurrency > 0 else None
+
+    async def acquire(self):
+        """Take a slot; returns None when admitted, otherwise the reason for shedding"""
+        if self._slots is None:
+            return None
+        if self.shed_on_pool_pressure and recent_checkout_wait.value() * 1000 > ADMISSION_POOL_WAIT_MS:
+            return "pool_pressure"
+        if not self._slots.locked():
+            await self._slots.acquire()
+            return None
+        if self.waiting >= ADMISSION_MAX_QUEUE:
+            return "queue_full"
+
+        self.waiting += 1
+        admission_queued.inc(self.name)
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_wait)
+        except asyncio.TimeoutError:
+            return "queue_timeout"
+        finally:
+            self.waiting -= 1
+            admission_queued.dec(self.name)
+        admission_queue_wait.observe(time.perf_counter() - start, self.name)
+        return None
+
+    def release(self):
+        if self._slots is not None:
+            self._slots.release()
+
+
+BUDGETS = {
+    "read": Budget("read", ADMISSION_READ_CONCURRENCY, ADMISSION_QUEUE_WAIT_MS),
+    "write": Budget("write", ADMISSION_WRITE_CONCURRENCY, ADMISSION_QUEUE_WAIT_MS),
+    "register": Budget("register", ADMISSION_REGISTER_CONCURRENCY, ADMISSION_REGISTER_QUEUE_WAIT_MS,
+                       shed_on_pool_pressure=False),
+    "admin": Budget("admin", ADMISSION_ADMIN_CONCURRENCY, ADMISSION_QUEUE_WAIT_MS),
+}
+
+
+def budget_for(method, route):
+    if route in UNLIMITED_ROUTES or method == "OPTIONS":
+        return None
+    if route == "/student/register":
+        return BUDGETS["register"]
+    if route.startswith("/admin/"):
+        return BUDGETS["admin"]
+    if method in ("GET", "HEAD"):
+        return BUDGETS["read"]
+    return BUDGETS["write"]
+
+
+class AdmissionMiddleware:
+    """ASGI middleware: holds each request to its route's concurrency budget, shedding with 503 under overload"""
+
+    def __init__(self, app, routes):
+        self.app = app
+        self.routes = routes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        budget = budget_for(scope["method"], route_template(self.routes, scope))
+        if budget is None:
+            await self.app(scope, receive, send)
+            return
+
+        reason = await budget.acquire()
+        if reason is not None:
+            requests_shed.inc(budget.name, reason)
+            await self.shed(send)
+            return
+
+        admission_in_flight.inc(budget.name)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admission_in_flight.dec(budget.name)
+            budget.release()
+
+    async def shed(self, send):
+        body = json.dumps({"detail": "Server is busy, please retry shortly"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(ADMISSION_RETRY_AFTER_SECONDS).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,80 @@
+"""
+In-process read cache for /student/calendar.
+
+Entries are keyed by the calendar query (session_type, date, from_date,
+to_date, after, limit), bounded by LRU size and TTL, and dropped by the write
+helpers in utils.py whenever a slot is created, deleted, taken or freed.
+Entries can also be stamped with the "sessions" change counter from
+versions.py, which catches writes served by other worker processes; the TTL
+is the fallback bound when no counter is supplied.
+"""
+import os
+import time
+from collections import OrderedDict
+
+CALENDAR_CACHE_ENABLED = os.getenv("CALENDAR_CACHE_ENABLED", "1") != "0"
+CALENDAR_CACHE_TTL = float(os.getenv("CALENDAR_CACHE_TTL", "30"))  # seconds
+CALENDAR_CACHE_MAXSIZE = int(os.getenv("CALENDAR_CACHE_MAXSIZE", "256"))
+
+
+class CalendarCache:
+    def __init__(self, maxsize, ttl, enabled=True):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.enabled = enabled
+        self._entries = OrderedDict()  # key -> (expires_at, version, value)
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key, version=None):
+        if not self.enabled:
+            return None
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic() or (version is not None and entry[1] != version):
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[2]
+
+    def set(self, key, value, version=None):
+        if not self.enabled:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, version, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, session_type, date):
+        """Drop every cached page that could contain a slot of this session_type on this date"""
+        for key in list(self._entries):
+            key_type, key_date, from_date, to_date = key[:4]
+            if key_type not in (None, session_type):
+                continue
+            if date is not None:
+                if key_date not in (None, date):
+                    continue
+                if (from_date and date < from_date) or (to_date and date > to_date):
+                    continue
+            del self._entries[key]
+            self.invalidations += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+
+calendar_cache = CalendarCache(CALENDAR_CACHE_MAXSIZE, CALENDAR_CACHE_TTL, CALENDAR_CACHE_ENABLED)
@@ -0,0 +1,84 @@
+"""
+In-process pub/sub for live calendar updates.
+
+The write helpers in utils.py publish slot events; each /student/calendar/stream
+connection holds one bounded queue, registered under its (session_type, date)
+filter so a publish only touches the subscribers that can match it.
+"""
+import asyncio
+import json
+import os
+
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "100"))
+EVENT_HEARTBEAT_SECONDS = float(os.getenv("EVENT_HEARTBEAT_SECONDS", "15"))
+
+
+class Subscription:
+    def __init__(self, session_type=None, date=None):
+        self.key = (session_type, date)
+        self.queue = asyncio.Queue(maxsize=EVENT_QUEUE_SIZE)
+        self.overflowed = False
+
+
+class EventBroker:
+    def __init__(self):
+        self._subscribers = {}  # (session_type, date) filter -> set of Subscription
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self, session_type=None, date=None):
+        subscription = Subscription(session_type, date)
+        self._subscribers.setdefault(subscription.key, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        subscribers = self._subscribers.get(subscription.key)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.key]
+
+    def publish(self, event_type, session_type, date, data):
+        """Fan an event out to every subscriber whose filter matches (None matches anything)"""
+        self.published += 1
+        event = (event_type, data)
+        keys = {(session_type, date), (session_type, None), (None, date), (None, None)}
+        if date is None:
+            # Events without a date (e.g. a recurring template changed) reach every date filter
+            keys |= {key for key in self._subscribers if key[0] in (session_type, None)}
+        for key in keys:
+            for subscription in self._subscribers.get(key, ()):
+                try:
+                    subscription.queue.put_nowait(event)
+                except asyncio.QueueFull:
+                    # A stalled client is cut off and resyncs on reconnect instead of growing memory
+                    subscription.overflowed = True
+                    self.dropped += 1
+
+    def connection_count(self):
+        return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def stats(self):
+        return {
+            "connections": self.connection_count(),
+            "published": self.published,
+            "dropped": self.dropped,
+        }
+
+    async def stream(self, session_type=None, date=None):
+        """Server-Sent Events for one connection; unsubscribes when the client disconnects"""
+        subscription = self.subscribe(session_type, date)
+        try:
+            yield "retry: 3000\n\n"
+            while not subscription.overflowed:
+                try:
+                    event_type, data = await asyncio.wait_for(subscription.queue.get(), EVENT_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: {event_type}\ndata: {json.dumps(data, default=str)}\n\n"
+        finally:
+            self.unsubscribe(subscription)
+
+
+calendar_events = EventBroker()
@@ -0,0 +1,283 @@
+"""
+Bulk import of tutor accounts and availability slots from CSV or NDJSON.
+
+Rows are read one at a time, validated with the request models in schema.py and
+written in chunks of IMPORT_BATCH_SIZE with one unordered bulk_write of upserts,
+so re-running an import updates rows instead of duplicating them. Every row that
+cannot be written is reported with its row number.
+
+Run from the backend directory, e.g.:
+    python -m app.imports tutors tutors.csv
+    python -m app.imports availability slots.ndjson
+or POST the file body to /admin/import/{kind}?format=csv|ndjson with "Authorization: Bearer <ADMIN_TOKEN>".
+
+tutors columns: email, password, full_name, preferred_name, SID, study_year,
+major, contact_phone, profile_email (defaults to email). Existing accounts get
+their profile fields updated and keep their password; new accounts need one.
+availability columns: the TutorAvailabilityCreate fields. A row with the same
+tutor and times as an active slot updates its name, type, location and
+description; any other overlap with an active slot is rejected.
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import sys
+import time
+from pydantic import ValidationError
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from .mongo import user_collection, session_collection, schedule_collection
+from .schema import UserSignup, ProfileCreate, TutorAvailabilityCreate
+from .security import hash_password
+from .utils import build_availability, publish_calendar_change, tutor_schedule_refresh, slot_schedule_refresh
+from .versions import bump_versions, SESSIONS, USERS
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+
+FORMATS = ("csv", "ndjson")
+PROFILE_FIELDS = ["full_name", "preferred_name", "SID", "study_year", "major", "contact_phone"]
+
+
+class ImportReport:
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.errors = []
+
+    def fail(self, row, error):
+        self.errors.append({"row": row, "error": error})
+
+    def as_dict(self):
+        return {
+            "rows": self.rows,
+            "created": self.created,
+            "updated": self.updated,
+            "failed": len(self.errors),
+            "errors": sorted(self.errors, key=lambda error: error["row"]),
+        }
+
+
+def read_rows(text_file, file_format):
+    """Yield (row_number, dict or error string) from an open text file, one row at a time"""
+    if file_format == "csv":
+        reader = csv.DictReader(text_file)
+        for row in reader:
+            # Empty cells mean "not given", so model defaults apply
+            yield reader.line_num, {key: value for key, value in row.items() if key and value not in ("", None)}
+        return
+
+    for line_number, line in enumerate(text_file, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield line_number, "Invalid JSON"
+            continue
+        yield line_number, row if isinstance(row, dict) else "Expected a JSON object"
+
+
+def validation_message(error):
+    return "; ".join(
+        f"{'.'.join(str(part) for part in detail['loc'])}: {detail['msg']}" for detail in error.errors()
+    )
+
+
+async def import_rows(kind, text_file, file_format):
+    """Import every row of an open text file; returns the report as a dict"""
+    if kind not in IMPORTERS:
+        raise ValueError(f"Unknown import kind: {kind}")
+    if file_format not in FORMATS:
+        raise ValueError(f"Unknown import format: {file_format}")
+
+    validate, write = IMPORTERS[kind]
+    report = ImportReport()
+    chunk = []
+    for row_number, row in read_rows(text_file, file_format):
+        report.rows += 1
+        if isinstance(row, str):
+            report.fail(row_number, row)
+            continue
+        try:
+            chunk.append((row_number, validate(row)))
+        except ValidationError as e:
+            report.fail(row_number, validation_message(e))
+        except ValueError as e:
+            report.fail(row_number, str(e))
+        if len(chunk) >= IMPORT_BATCH_SIZE:
+            await write(chunk, report)
+            chunk = []
+    if chunk:
+        await write(chunk, report)
+    return report.as_dict()
+
+
+async def bulk_upsert(collection, chunk, operations, report):
+    """Run one chunk's upserts unordered and tally them; operations[i] belongs to chunk[i]"""
+    try:
+        result = await collection.bulk_write(operations, ordered=False)
+        upserted = result.upserted_count
+        written = len(operations)
+    except BulkWriteError as e:
+        for write_error in e.details.get("writeErrors", []):
+            report.fail(chunk[write_error["index"]][0], write_error.get("errmsg", "Write failed"))
+        upserted = len(e.details.get("upserted", []))
+        written = len(operations) - len(e.details.get("writeErrors", []))
+    report.created += upserted
+    report.updated += written - upserted
+    return written
+
+
+# ==================== Tutor Import Functions ====================
+
+def validate_tutor(row):
+    email = row.get("email")
+    profile = ProfileCreate(login_email=email, profile_email=row.get("profile_email") or email, **{
+        field: row[field] for field in PROFILE_FIELDS if field in row
+    })
+    password = row.get("password")
+    if password is not None:
+        UserSignup(email=email, password=password)
+    return profile, password
+
+
+async def write_tutors(chunk, report):
+    emails = [profile.login_email for _, (profile, _) in chunk]
+    existing = {user["email"] async for user in user_collection.find({"email": {"$in": emails}}, {"email": 1})}
+
+    # New accounts need a password; hash them concurrently on the hashing pool
+    rows = []
+    seen = set()
+    for row_number, (profile, password) in chunk:
+        email = profile.login_email
+        if email in seen:
+            report.fail(row_number, "Duplicate email in this import")
+        elif email not in existing and not password:
+            report.fail(row_number, "Password required for a new account")
+        else:
+            seen.add(email)
+            rows.append((row_number, profile, password if email not in existing else None))
+    hashes = await asyncio.gather(*[hash_password(password) for _, _, password in rows if password])
+    hashes = iter(hashes)
+
+    operations = []
+    for _, profile, password in rows:
+        update = {"$set": {
+            **{f"profile.{field}": getattr(profile, field) for field in PROFILE_FIELDS},
+            "profile.personal_email": profile.profile_email,
+        }}
+        if password:
+            update["$setOnInsert"] = {"password": next(hashes)}
+        operations.append(UpdateOne({"email": profile.login_email}, update, upsert=True))
+
+    if operations and await bulk_upsert(user_collection, rows, operations, report):
+        # Existing tutors may have booked sessions whose schedule entries carry their profile
+        refreshes = [
+            tutor_schedule_refresh(profile.login_email, profile.model_dump())
+            for _, profile, _ in rows if profile.login_email in existing
+        ]
+        if refreshes:
+            await schedule_collection.bulk_write(refreshes, ordered=False)
+        await bump_versions(USERS)
+
+
+# ==================== Availability Import Functions ====================
+
+def validate_availability(row):
+    item = TutorAvailabilityCreate(**row)
+    try:
+        return build_availability(
+            item.tutor_email, item.tutor_name, item.session_type, item.date,
+            item.time_slot, item.location, item.description, item.capacity
+        )
+    except ValueError:
+        raise ValueError("Invalid date or time slot")
+
+
+async def write_availability(chunk, report):
+    # Active slots of these tutors that touch the chunk's time range, to tell updates from overlaps
+    documents = [document for _, document in chunk]
+    existing = {}
+    async for slot in session_collection.find(
+        {
+            "tutor_email": {"$in": list({d["tutor_email"] for d in documents})},
+            "status": "active",
+            "start_at": {"$lt": max(d["end_at"] for d in documents)},
+            "end_at": {"$gt": min(d["start_at"] for d in documents)}
+        },
+        {"tutor_email": 1, "start_at": 1, "end_at": 1, "seats_taken": 1}
+    ):
+        existing.setdefault(slot["tutor_email"], []).append(slot)
+
+    rows = []
+    accepted = {}
+    refreshes = []
+    for row_number, document in sorted(chunk, key=lambda entry: (entry[1]["tutor_email"], entry[1]["start_at"])):
+        tutor = document["tutor_email"]
+        key = (document["start_at"], document["end_at"])
+        same_tutor = accepted.setdefault(tutor, [])
+        if any(start < document["end_at"] and end > document["start_at"] for start, end in same_tutor):
+            report.fail(row_number, "Overlaps another slot in this import")
+            continue
+        overlapping = [
+            slot for slot in existing.get(tutor, [])
+            if slot["start_at"] < document["end_at"] and slot["end_at"] > document["start_at"]
+        ]
+        if any((slot["start_at"], slot["end_at"]) != key for slot in overlapping):
+            report.fail(row_number, "Overlaps an existing slot")
+            continue
+        # Students booked on an updated slot see its new details in their schedules
+        refreshes += [slot_schedule_refresh({**document, "_id": slot["_id"]}) for slot in overlapping if slot.get("seats_taken")]
+        same_tutor.append(key)
+        rows.append((row_number, document))
+
+    operations = []
+    changed = set()
+    for _, document in rows:
+        # Descriptive fields follow the file; seats, bookings and status are only set on a new slot
+        updated_fields = {field: document.pop(field) for field in
+                          ("tutor_name", "session_type", "location", "description", "updated_at")}
+        operations.append(UpdateOne(
+            {"tutor_email": document.pop("tutor_email"), "start_at": document.pop("start_at"),
+             "end_at": document.pop("end_at"), "status": document.pop("status")},
+            {"$set": updated_fields, "$setOnInsert": document},
+            upsert=True
+        ))
+        changed.add((updated_fields["session_type"], document["date"]))
+
+    if operations and await bulk_upsert(session_collection, rows, operations, report):
+        if refreshes:
+            await schedule_collection.bulk_write(refreshes, ordered=False)
+        # One refetch signal per affected day instead of an event per slot
+        for session_type, date in changed:
+            publish_calendar_change(session_type, date)
+        await bump_versions(SESSIONS)
+
+
+IMPORTERS = {
+    "tutors": (validate_tutor, write_tutors),
+    "availability": (validate_availability, write_availability),
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import tutors or availability slots")
+    parser.add_argument("kind", choices=sorted(IMPORTERS))
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=FORMATS, help="defaults to the file extension (.csv, otherwise ndjson)")
+    args = parser.parse_args()
+
+    file_format = args.format or ("csv" if args.path.lower().endswith(".csv") else "ndjson")
+    started = time.perf_counter()
+    with open(args.path, newline="", encoding="utf-8-sig") as f:
+        result = asyncio.run(import_rows(args.kind, f, file_format))
+    for error in result["errors"]:
+        print(f"row {error['row']}: {error['error']}")
+    print(
+        f"Imported {result['rows']} rows in {time.perf_counter() - started:.1f}s: "
+        f"{result['created']} created, {result['updated']} updated, {result['failed']} failed"
+    )
+    sys.exit(1 if result["failed"] else 0)
@@ -0,0 +1,149 @@
+"""
+Index registry for every collection, matched to the query shapes in utils.py.
+
+Applied idempotently on app startup, or by hand from the backend directory:
+    python -m app.indexes          # drop obsolete and create any missing indexes; exits 1 if any collection failed
+    python -m app.indexes --list   # print the registry
+"""
+import asyncio
+import sys
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from .mongo import (
+    user_collection, session_collection, registration_collection, recurrence_collection, schedule_collection
+)
+
+INDEXES = {
+    user_collection: [
+        # check_email_exists, verify_user_credentials, profile CRUD, $in profile batches. Fails (and keeps
+        # /_ready at 503) while duplicate emails exist: run `python -m app.migrations dedupe-users` first
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+    ],
+    session_collection: [
+        # get_tutor_availability: tutor's slots by status, paged in (start_at, _id) order
+        IndexModel(
+            [("tutor_email", ASCENDING), ("status", ASCENDING), ("start_at", ASCENDING), ("_id", ASCENDING)],
+            name="tutor_status_start_at"
+        ),
+        # get_student_calendar_view: open slots by session type, paged in (start_at, _id) order
+        IndexModel(
+            [("status", ASCENDING), ("is_registered", ASCENDING), ("session_type", ASCENDING),
+             ("start_at", ASCENDING), ("_id", ASCENDING)],
+            name="open_slots_by_type_start_at"
+        ),
+        # get_student_calendar_view without a session type
+        IndexModel(
+            [("status", ASCENDING), ("is_registered", ASCENDING), ("start_at", ASCENDING), ("_id", ASCENDING)],
+            name="open_slots_by_start_at"
+        ),
+        # export_availability: slots by status in start order
+        IndexModel(
+            [("status", ASCENDING), ("start_at", ASCENDING), ("_id", ASCENDING)],
+            name="status_start_at"
+        ),
+        # Published recurring occurrences: one slot document per (template, date)
+        IndexModel(
+            [("recurrence_id", ASCENDING), ("occurrence_date", ASCENDING)],
+            name="recurrence_occurrence_unique",
+            unique=True,
+            partialFilterExpression={"recurrence_id": {"$exists": True}}
+        ),
+    ],
+    registration_collection: [
+        # check_time_conflict: equality on student/status, range on start_at
+        IndexModel(
+            [("student_email", ASCENDING), ("status", ASCENDING), ("start_at", ASCENDING)],
+            name="student_status_start_at"
+        ),
+        # export_registrations: registrations by status in start order
+        IndexModel(
+            [("status", ASCENDING), ("start_at", ASCENDING), ("_id", ASCENDING)],
+            name="status_start_at"
+        ),
+        # get_student_registrations: student's active registrations, newest first
+        IndexModel(
+            [("student_email", ASCENDING), ("status", ASCENDING), ("_id", DESCENDING)],
+            name="student_status_newest"
+        ),
+        # At most one active registration per student per slot (a group slot holds several students;
+        # seats are capped by the guarded seats_taken counter). Replaces active_registration_per_session.
+        IndexModel(
+            [("session_id", ASCENDING), ("student_email", ASCENDING)],
+            name="active_registration_per_student",
+            unique=True,
+            partialFilterExpression={"status": "registered"}
+        ),
+        # Waitlists: queue order per slot, and get_waitlist_position's count of entries ahead
+        IndexModel(
+            [("session_id", ASCENDING), ("status", ASCENDING), ("_id", ASCENDING)],
+            name="session_status_queue"
+        ),
+        # A student queues at most once per slot (keys reversed so it never clashes with the index above)
+        IndexModel(
+            [("student_email", ASCENDING), ("session_id", ASCENDING)],
+            name="waitlist_entry_per_student",
+            unique=True,
+            partialFilterExpression={"status": "waitlisted"}
+        ),
+    ],
+    recurrence_collection: [
+        # expand_recurring_slots: active templates of a session type still running in the window
+        IndexModel(
+            [("status", ASCENDING), ("session_type", ASCENDING), ("end_date", ASCENDING)],
+            name="active_by_type_end_date"
+        ),
+        # get_recurring_availability and tutor-scoped expansion
+        IndexModel([("tutor_email", ASCENDING), ("status", ASCENDING)], name="tutor_status"),
+    ],
+    schedule_collection: [
+        # Documents are keyed by student email; refresh_tutor_in_schedules finds the schedules a tutor appears in
+        IndexModel([("entries.session_details.tutor_email", ASCENDING)], name="entries_tutor_email"),
+    ],
+}
+
+
+# Indexes an older registry created that would now reject valid writes; dropped before the registry is applied
+OBSOLETE_INDEXES = {
+    # One active registration per slot: group sessions hold several
+    registration_collection: ["active_registration_per_session"],
+}
+
+
+async def drop_obsolete_indexes(collection):
+    existing = await collection.index_information()
+    for name in OBSOLETE_INDEXES.get(collection, []):
+        if name in existing:
+            await collection.drop_index(name)
+            print(f"Dropped obsolete index {name} on {collection.name}")
+
+
+async def ensure_indexes():
+    """Drop obsolete indexes and create every registered one; existing indexes with the same spec are left untouched.
+
+    Returns {collection name: error message} for every collection that failed, empty on success"""
+    failures = {}
+    for collection, models in INDEXES.items():
+        try:
+            await drop_obsolete_indexes(collection)
+            names = await collection.create_indexes(models)
+            print(f"Indexes on {collection.name}: {', '.join(names)}")
+        except Exception as e:
+            # Keep going so one bad collection (e.g. duplicate emails) doesn't block the rest
+            print(f"Index creation failed on {collection.name}:", e)
+            failures[collection.name] = str(e)
+    return failures
+
+
+def list_indexes():
+    for collection, models in INDEXES.items():
+        for model in models:
+            print(f"{collection.name}: {model.document}")
+    for collection, names in OBSOLETE_INDEXES.items():
+        for name in names:
+            print(f"{collection.name}: {name} (obsolete, dropped)")
+
+
+if __name__ == "__main__":
+    if "--list" in sys.argv[1:]:
+        list_indexes()
+    else:
+        sys.exit(1 if asyncio.run(ensure_indexes()) else 0)
@@ -0,0 +1,338 @@
+"""
+In-process metrics, rendered in Prometheus text format on /_metrics.
+
+MetricsMiddleware times every HTTP request by route template and tracks requests
+in flight; the pymongo listeners registered on the client in mongo.py time each
+command, count commands per request and time connection-pool checkouts. Motor
+runs pymongo on worker threads, so every metric guards its series with a lock;
+an observation is one bisect plus a dict lookup.
+"""
+import bisect
+import itertools
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from pymongo import monitoring
+from starlette.routing import Match
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55)
+
+_metrics = []
+
+
+def _format_labels(names, values, extra=""):
+    pairs = ['%s="%s"' % (name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+             for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{%s}" % ",".join(pairs) if pairs else ""
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def items(self):
+        with self._lock:
+            return list(self._values.items())
+
+    def samples(self):
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {value}" for labels, value in self.items()]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._series = {}  # labels -> [count per bucket (+Inf last), sum]
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def samples(self):
+        with self._lock:
+            series = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+        lines = []
+        for labels, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class GaugeFunction:
+    """A gauge read from `function` at scrape time"""
+    kind = "gauge"
+
+    def __init__(self, name, documentation, function):
+        self.name = name
+        self.documentation = documentation
+        self.function = function
+        _metrics.append(self)
+
+    def samples(self):
+        value = self.function()
+        return [] if value is None else [f"{self.name} {value}"]
+
+
+def render_metrics():
+    lines = []
+    for metric in _metrics:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    return "\n".join(lines) + "\n"
+
+
+# ==================== Process Metrics ====================
+
+def _max_rss_bytes():
+    try:
+        import resource
+    except ImportError:  # Not available on Windows
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss if sys.platform == "darwin" else max_rss * 1024  # Linux reports KiB
+
+
+process_max_resident_memory = GaugeFunction(
+    "process_max_resident_memory_bytes", "Peak resident set size of this worker", _max_rss_bytes)
+
+
+# ==================== HTTP Metrics ====================
+
+http_requests_in_flight = Gauge(
+    "http_requests_in_flight", "Requests currently being handled", ("method", "route"))
+http_request_duration = Histogram(
+    "http_request_duration_seconds", "Time from request start until the response finished", ("method", "route", "status"))
+mongo_commands_per_request = Histogram(
+    "mongo_commands_per_request", "MongoDB commands issued while handling one request", ("method", "route"),
+    buckets=COUNT_BUCKETS)
+
+# Commands counted for the current request; motor copies the context onto its worker threads
+_request_commands = ContextVar("request_commands", default=None)
+
+
+# Scope key holding the resolved template, so the route table is walked once per request
+ROUTE_TEMPLATE_KEY = "app.route_template"
+
+
+def route_template(routes, scope):
+    """The matched route's path template; labels use it, never the raw path, so e-mails and ids don't explode the series count.
+
+    Resolved by the outermost caller (MetricsMiddleware) and reused from the scope by inner middleware."""
+    template = scope.get(ROUTE_TEMPLATE_KEY)
+    if template is None:
+        template = "unmatched"
+        for route in routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                template = route.path
+                break
+        scope[ROUTE_TEMPLATE_KEY] = template
+    return template
+
+
+class MetricsMiddleware:
+    """ASGI middleware: per-route latency, in-flight requests and Mongo commands per request"""
+
+    def __init__(self, app, routes):
+        self.app = app
+        self.routes = routes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = route_template(self.routes, scope)
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        commands = itertools.count()  # next() is atomic under the GIL, so listener threads can share it
+        token = _request_commands.set(commands)
+        http_requests_in_flight.inc(method, route)
+        start = time.perf_counter()
+        try:
+            # Streaming responses (the calendar SSE stream) are timed until the stream closes
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_request_duration.observe(time.perf_counter() - start, method, route, status[0])
+            http_requests_in_flight.dec(method, route)
+            mongo_commands_per_request.observe(next(commands), method, route)
+            _request_commands.reset(token)
+
+
+# ==================== MongoDB Metrics ====================
+
+mongo_command_duration = Histogram(
+    "mongo_command_duration_seconds", "MongoDB command round trips, as timed by the driver", ("command",))
+mongo_command_failures = Counter(
+    "mongo_command_failures_total", "MongoDB commands that returned an error", ("command",))
+mongo_pool_checkout_wait = Histogram(
+    "mongo_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection")
+mongo_pool_checkout_failures = Counter(
+    "mongo_pool_checkout_failures_total", "Connection checkouts that failed, by reason", ("reason",))
+mongo_pool_connections = Gauge(
+    "mongo_pool_connections", "Open pooled connections", ("address",))
+mongo_pool_connections_in_use = Gauge(
+    "mongo_pool_connections_in_use", "Pooled connections currently checked out", ("address",))
+
+
+class CommandMetrics(monitoring.CommandListener):
+    def started(self, event):
+        commands = _request_commands.get()
+        if commands is not None:
+            next(commands)
+
+    def succeeded(self, event):
+        mongo_command_duration.observe(event.duration_micros / 1e6, event.command_name)
+
+    def failed(self, event):
+        mongo_command_duration.observe(event.duration_micros / 1e6, event.command_name)
+        mongo_command_failures.inc(event.command_name)
+
+
+class RecentAverage:
+    """Exponentially weighted average of recent observations; reads as 0 once nothing was observed for `horizon` seconds"""
+
+    def __init__(self, weight=0.2, horizon=5.0):
+        self.weight = weight
+        self.horizon = horizon
+        self._value = 0.0
+        self._observed_at = None
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            self._value += self.weight * (value - self._value)
+            self._observed_at = time.monotonic()
+
+    def value(self):
+        with self._lock:
+            if self._observed_at is None or time.monotonic() - self._observed_at > self.horizon:
+                return 0.0
+            return self._value
+
+
+# Smoothed checkout wait, read by the admission middleware as the pool-pressure signal
+recent_checkout_wait = RecentAverage()
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Checkout start and finish fire on the same thread, so the wait is timed thread-locally"""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def _checkout_wait(self):
+        started = getattr(self._local, "checkout_started", None)
+        self._local.checkout_started = None
+        if started is None:
+            return None
+        wait = time.perf_counter() - started
+        recent_checkout_wait.observe(wait)
+        return wait
+
+    def connection_check_out_started(self, event):
+        self._local.checkout_started = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        wait = self._checkout_wait()
+        if wait is not None:
+            mongo_pool_checkout_wait.observe(wait)
+        mongo_pool_connections_in_use.inc("%s:%s" % event.address)
+
+    def connection_checked_in(self, event):
+        mongo_pool_connections_in_use.dec("%s:%s" % event.address)
+
+    def connection_check_out_failed(self, event):
+        wait = self._checkout_wait()
+        if wait is not None:
+            mongo_pool_checkout_wait.observe(wait)
+        mongo_pool_checkout_failures.inc(event.reason)
+
+    def connection_created(self, event):
+        mongo_pool_connections.inc("%s:%s" % event.address)
+
+    def connection_closed(self, event):
+        mongo_pool_connections.dec("%s:%s" % event.address)
+
+    # Remaining pool events are not measured
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+
+def pool_stats():
+    """Pool occupancy summed over servers, for the readiness probe"""
+    return {
+        "open": sum(value for _, value in mongo_pool_connections.items()),
+        "in_use": sum(value for _, value in mongo_pool_connections_in_use.items()),
+        "checkout_failures": sum(value for _, value in mongo_pool_checkout_failures.items()),
+        "recent_checkout_wait_ms": round(recent_checkout_wait.value() * 1000, 2),
+    }
+
+
+# ==================== Admission Metrics ====================
+
+admission_in_flight = Gauge(
+    "admission_in_flight", "Requests holding a slot of a concurrency budget", ("budget",))
+admission_queued = Gauge(
+    "admission_queued", "Requests waiting for a slot of a concurrency budget", ("budget",))
+admission_queue_wait = Histogram(
+    "admission_queue_wait_seconds", "Time admitted requests waited for a budget slot", ("budget",))
+requests_shed = Counter(
+    "http_requests_shed_total", "Requests rejected with 503 before being handled, by budget and reason", ("budget", "reason"))
@@ -0,0 +1,167 @@
+"""
+One-off data migrations.
+
+Run from the backend directory, e.g.:
+    python -m app.migrations backfill-times
+    python -m app.migrations move-profile-pictures
+    python -m app.migrations group-sessions
+    python -m app.migrations dedupe-users
+"""
+import asyncio
+import sys
+from pymongo import UpdateOne
+from .indexes import drop_obsolete_indexes
+from .mongo import get_db, user_collection, session_collection, registration_collection
+from .utils import parse_time_slot, store_profile_picture
+
+BATCH_SIZE = 500
+
+
+async def _flush(collection, operations):
+    if operations:
+        await collection.bulk_write(operations, ordered=False)
+    return len(operations)
+
+
+async def backfill_session_times():
+    """Add start_at/end_at to slots and registrations created before those fields existed"""
+    slot_times = {}
+    operations = []
+    updated_slots = 0
+    skipped_slots = 0
+
+    cursor = session_collection.find(
+        {"start_at": {"$exists": False}},
+        {"date": 1, "time_slot": 1}
+    )
+    async for slot in cursor:
+        try:
+            start_at, end_at = parse_time_slot(slot["date"], slot["time_slot"])
+        except (KeyError, ValueError):
+            skipped_slots += 1
+            continue
+        slot_times[slot["_id"]] = (start_at, end_at)
+        operations.append(UpdateOne(
+            {"_id": slot["_id"]},
+            {"$set": {"start_at": start_at, "end_at": end_at}}
+        ))
+        if len(operations) >= BATCH_SIZE:
+            updated_slots += await _flush(session_collection, operations)
+            operations = []
+    updated_slots += await _flush(session_collection, operations)
+
+    operations = []
+    updated_registrations = 0
+    cursor = registration_collection.find(
+        {"start_at": {"$exists": False}},
+        {"session_id": 1}
+    )
+    async for registration in cursor:
+        times = slot_times.get(registration["session_id"])
+        if times is None:
+            # Slot was already migrated (or created with times); read them from the slot
+            slot = await session_collection.find_one(
+                {"_id": registration["session_id"]},
+                {"start_at": 1, "end_at": 1}
+            )
+            if not slot or "start_at" not in slot:
+                continue
+            times = (slot["start_at"], slot["end_at"])
+            slot_times[registration["session_id"]] = times
+        operations.append(UpdateOne(
+            {"_id": registration["_id"]},
+            {"$set": {"start_at": times[0], "end_at": times[1]}}
+        ))
+        if len(operations) >= BATCH_SIZE:
+            updated_registrations += await _flush(registration_collection, operations)
+            operations = []
+    updated_registrations += await _flush(registration_collection, operations)
+
+    print(f"Backfilled {updated_slots} slots ({skipped_slots} unparseable) and {updated_registrations} registrations")
+
+
+async def move_profile_pictures():
+    """Move base64 pictures embedded in user profiles into GridFS, leaving a reference and hash behind"""
+    moved = 0
+    failed = 0
+    bytes_before = 0
+
+    cursor = user_collection.find(
+        {"profile.profile_picture": {"$type": "string", "$ne": ""}},
+        {"email": 1, "profile.profile_picture": 1}
+    )
+    async for user in cursor:
+        picture = user["profile"]["profile_picture"]
+        try:
+            picture_refs = await store_profile_picture(user["email"], picture)
+        except ValueError as e:
+            print(f"Skipping {user['email']}: {e}")
+            failed += 1
+            continue
+        await user_collection.update_one(
+            {"_id": user["_id"]},
+            {
+                "$set": {f"profile.{key}": value for key, value in picture_refs.items()},
+                "$unset": {"profile.profile_picture": 1}
+            }
+        )
+        bytes_before += len(picture)
+        moved += 1
+
+    print(f"Moved {moved} profile pictures ({bytes_before} bytes no longer read with each user lookup), {failed} skipped")
+
+
+async def add_seat_counters():
+    """Give one-on-one slots created before group sessions a capacity and seat counter (startup's
+    ensure_indexes already swaps the one-registration-per-slot unique index for the per-student one)"""
+    await drop_obsolete_indexes(registration_collection)
+
+    taken = await session_collection.update_many(
+        {"seats_taken": {"$exists": False}, "is_registered": True},
+        {"$set": {"capacity": 1, "seats_taken": 1}}
+    )
+    free = await session_collection.update_many(
+        {"seats_taken": {"$exists": False}},
+        {"$set": {"capacity": 1, "seats_taken": 0}}
+    )
+    print(f"Added seat counters to {taken.modified_count} booked and {free.modified_count} open slots")
+
+
+async def dedupe_users():
+    """Collapse accounts sharing an email, so the email_unique index can be built.
+
+    The oldest account is kept (it is the one logins already matched); if it has no profile it takes
+    the newest duplicate's. The other accounts are moved to user_duplicates rather than deleted."""
+    duplicates = user_collection.aggregate([
+        {"$group": {"_id": "$email", "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}}
+    ], allowDiskUse=True)
+    backup = get_db()["user_duplicates"]
+    emails = 0
+    removed = 0
+    async for group in duplicates:
+        users = await user_collection.find({"_id": {"$in": group["ids"]}}).sort("_id", 1).to_list(length=None)
+        kept, extra = users[0], users[1:]
+        profile = next((user["profile"] for user in reversed(extra) if user.get("profile")), None)
+        if not kept.get("profile") and profile:
+            await user_collection.update_one({"_id": kept["_id"]}, {"$set": {"profile": profile}})
+        await backup.insert_many(extra)
+        await user_collection.delete_many({"_id": {"$in": [user["_id"] for user in extra]}})
+        emails += 1
+        removed += len(extra)
+    print(f"Kept one account for each of {emails} duplicated emails, moved {removed} to user_duplicates")
+
+
+MIGRATIONS = {
+    "backfill-times": backfill_session_times,
+    "move-profile-pictures": move_profile_pictures,
+    "group-sessions": add_seat_counters,
+    "dedupe-users": dedupe_users,
+}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2 or sys.argv[1] not in MIGRATIONS:
+        print("Usage: python -m app.migrations [%s]" % "|".join(MIGRATIONS))
+        sys.exit(1)
+    asyncio.run(MIGRATIONS[sys.argv[1]]())
@@ -1,5 +1,7 @@
+import asyncio
 import os
-import pymongo
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorGridFSBucket
+from .metrics import CommandMetrics, PoolMetrics
 
 # For production (Render) vs development (local)
 if os.getenv("RENDER"):  # Render sets this environment variable
@@ -9,15 +11,85 @@ else:
     load_dotenv()
     MONGODB_URL = os.getenv("MONGODB_URL")
 
-try:
-    client = pymongo.MongoClient(MONGODB_URL)
-    db = client.get_database("sign_up_system")  # Use the exact database name from Atlas
-    user_collection = db["user_collection"]
-    session_collection = db["session_collection"]  # For storing session information
-    registration_collection = db["registration_collection"]  # For storing session registrations
-    print("MongoDB connection successful")
-    print("Connected to database:", db.name)
-    print("Available collections:", db.list_collection_names())
-
-except Exception as e:
-    print("MongoDB connection failed:", e)
+DATABASE_NAME = os.getenv("MONGODB_DATABASE", "sign_up_system")  # Use the exact database name from Atlas
+
+# Connection pool sizing (override per deployment through the environment)
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "2000"))
+# Fail fast instead of hanging a request (or startup) for pymongo's 30s default when Mongo is unreachable
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_PING_TIMEOUT_SECONDS = float(os.getenv("MONGO_PING_TIMEOUT_SECONDS", "2"))
+
+_client = None
+
+
+def get_client():
+    """The shared client, created on first use (normally by connect() in the app lifespan)"""
+    global _client
+    if _client is None:
+        _client = AsyncIOMotorClient(
+            MONGODB_URL,
+            maxPoolSize=MONGO_MAX_POOL_SIZE,
+            minPoolSize=MONGO_MIN_POOL_SIZE,
+            waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+            connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+            serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            event_listeners=[CommandMetrics(), PoolMetrics()],  # Feeds /_metrics
+        )
+        print("MongoDB client configured for database:", DATABASE_NAME)
+        print("Pool settings: maxPoolSize=%d, waitQueueTimeoutMS=%d" % (MONGO_MAX_POOL_SIZE, MONGO_WAIT_QUEUE_TIMEOUT_MS))
+    return _client
+
+
+def get_db():
+    return get_client().get_database(DATABASE_NAME)
+
+
+async def ping():
+    """Round trip to the server; raises if Mongo is unreachable within MONGO_PING_TIMEOUT_SECONDS"""
+    await asyncio.wait_for(get_client().admin.command("ping"), MONGO_PING_TIMEOUT_SECONDS)
+
+
+async def connect():
+    """Create the client and check the server is reachable; a failure is reported, not raised"""
+    try:
+        await ping()
+        return True
+    except Exception as e:
+        print("MongoDB connection failed:", e)
+        return False
+
+
+def close():
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
+
+
+class _Lazy:
+    """Stands in for a client-bound object so modules can import it before the client exists"""
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._client = None
+        self._target = None
+
+    def __getattr__(self, name):
+        client = get_client()
+        if self._client is not client:
+            self._target = self._factory()
+            self._client = client
+        return getattr(self._target, name)
+
+
+client = _Lazy(get_client)
+user_collection = _Lazy(lambda: get_db()["user_collection"])
+session_collection = _Lazy(lambda: get_db()["session_collection"])  # For storing session information
+registration_collection = _Lazy(lambda: get_db()["registration_collection"])  # For storing session registrations
+recurrence_collection = _Lazy(lambda: get_db()["recurrence_collection"])  # For storing recurring availability templates
+schedule_collection = _Lazy(lambda: get_db()["schedule_collection"])  # Per-student schedule read model behind /my-sessions
+version_collection = _Lazy(lambda: get_db()["version_collection"])  # Change counters behind read-endpoint ETags
+profile_picture_bucket = _Lazy(lambda: AsyncIOMotorGridFSBucket(get_db(), bucket_name="profile_pictures"))  # Profile picture bytes
@@ -1,20 +1,38 @@
-from fastapi import APIRouter, HTTPException, status
+import csv
+import hmac
+import io
+import json
+import os
+import tempfile
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from .utils import (
     check_email_exists, create_user, verify_user_credentials, get_all_users,
     create_user_profile, get_user_profile, update_user_profile, delete_user_profile,
     register_student_for_tutor_slot, cancel_student_registration_for_tutor_slot,
+    join_waitlist, get_waitlist_position,
+    get_profile_picture_info, stream_profile_picture,
     # Tutor availability management functions
-    create_tutor_availability, get_tutor_availability, delete_tutor_availability,
+    create_tutor_availability, create_tutor_availabilities, get_tutor_availability, delete_tutor_availability,
+    # Recurring availability functions
+    create_recurring_availability, get_recurring_availability, set_recurrence_exception,
+    delete_recurring_availability,
     # Student registration function
     get_student_calendar_view, 
-    get_student_registrations
+    get_student_registrations,
+    # Admin export functions
+    export_registrations, export_availability, REGISTRATION_EXPORT_FIELDS, AVAILABILITY_EXPORT_FIELDS
 )
 
+from .events import calendar_events
+from .imports import import_rows, IMPORTERS
+from .versions import conditional_get, SESSIONS, REGISTRATIONS, USERS
     
 from .schema import (
     UserSignup, UserLogin, ProfileCreate, ProfileUpdate, ProfileResponse,
     # Tutor availability schemas
-    TutorAvailabilityCreate, SessionTypesList,
+    TutorAvailabilityCreate, TutorAvailabilityBatchCreate, SessionTypesList,
+    RecurringAvailabilityCreate, RecurrenceException,
     # Student registration schemas
     StudentSessionSelection, StudentCalendarView,
 )
@@ -22,18 +40,34 @@ from .schema import (
 
 router = APIRouter()
 
+# Largest number of slots accepted by POST /tutor/availability/batch
+MAX_BATCH_SIZE = 500
+
+# Opt-in: serialize the streamed calendar with orjson instead of the stdlib encoder
+FAST_JSON_RESPONSES = os.getenv("FAST_JSON_RESPONSES", "0") == "1"
+if FAST_JSON_RESPONSES:
+    import orjson
+
+# Streamed responses are flushed in chunks of about this size
+STREAM_CHUNK_BYTES = 64 * 1024
+
 @router.post("/signup")
-def signup(user_data: UserSignup):
+async def signup(user_data: UserSignup):
 
     # Check if email already exists
-    if check_email_exists(user_data.email):
+    if await check_email_exists(user_data.email):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
     # Create new user
-    user_id = create_user(user_data.email, user_data.password)
+    user_id = await create_user(user_data.email, user_data.password)
+    if user_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already registered"
+        )
     
     return {
         "message": "User created successfully",
@@ -42,10 +76,10 @@ def signup(user_data: UserSignup):
     }
 
 @router.post("/login")
-def login(user_data: UserLogin):
+async def login(user_data: UserLogin):
 
     # Verify user credentials
-    user = verify_user_credentials(user_data.email, user_data.password)
+    user = await verify_user_credentials(user_data.email, user_data.password)
     
     if not user:
         raise HTTPException(
@@ -60,20 +94,31 @@ def login(user_data: UserLogin):
     }
 
 @router.get("/users")
-def get_users():
+async def get_users(response: Response, after: str = None, limit: int = Query(None, ge=1)):
+
+    # Get one page of users for admin purposes; the next page's cursor is sent as a header
+    # so the body stays a plain list
+    result = await get_all_users(after, limit)
 
-    # Get all users for admin purposes
-    users = get_all_users()
+    if result == "Invalid cursor":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+    users, next_cursor = result
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return users
 
 # ==================== Personal Profile Endpoints ====================
 
 @router.post("/profile")
-def create_profile(profile_data: ProfileCreate):
+async def create_profile(profile_data: ProfileCreate):
     """
     Create a new profile for a user
     """
-    result = create_user_profile(
+    result = await create_user_profile(
         profile_data.login_email,  # Use login_email to find the user
         profile_data.SID,
         profile_data.full_name,
@@ -97,6 +142,12 @@ def create_profile(profile_data: ProfileCreate):
             detail="Profile already exists for this user"
         )
 
+    if result == "Invalid profile picture":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid profile picture"
+        )
+
     # return successful creation message
     return{
         "success": True,
@@ -105,11 +156,15 @@ def create_profile(profile_data: ProfileCreate):
     }
 
 @router.get("/profile/{login_email}", response_model=ProfileResponse)
-def get_profile(login_email: str):
+async def get_profile(login_email: str, request: Request, response: Response):
     """
     Get a user's profile by login email
     """
-    profile = get_user_profile(login_email)
+    not_modified, _ = await conditional_get(request, response, (USERS,), login_email)
+    if not_modified:
+        return not_modified
+
+    profile = await get_user_profile(login_email)
 
     if profile is None:
         raise HTTPException(
@@ -123,14 +178,45 @@ def get_profile(login_email: str):
             detail="Profile not found for this user"
         )
 
+    # Pictures stored in GridFS are served from their own cacheable endpoint; the hash busts caches on change
+    if profile.get("profile_picture_hash"):
+        picture_url = request.url_for("get_profile_picture", login_email=login_email)
+        profile["profile_picture"] = f"{picture_url}?v={profile['profile_picture_hash'][:16]}"
+
     return ProfileResponse(**profile)
 
+@router.get("/profile/{login_email}/picture")
+async def get_profile_picture(login_email: str, request: Request):
+    """
+    Stream a user's profile picture, honouring If-None-Match
+    """
+    picture = await get_profile_picture_info(login_email)
+
+    if picture is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profile picture not found"
+        )
+
+    headers = {
+        "ETag": f'"{picture["profile_picture_hash"]}"',
+        "Cache-Control": "public, max-age=86400"
+    }
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return StreamingResponse(
+        stream_profile_picture(picture["profile_picture_id"]),
+        media_type=picture.get("profile_picture_type") or "application/octet-stream",
+        headers=headers
+    )
+
 @router.put("/profile/{login_email}")
-def update_profile(login_email: str, profile_update: ProfileUpdate):
+async def update_profile(login_email: str, profile_update: ProfileUpdate):
     """
     Update a user's profile
     """
-    result = update_user_profile(
+    result = await update_user_profile(
         login_email,  # Use login_email to find the user
         profile_update.SID,
         profile_update.full_name,
@@ -159,6 +245,12 @@ def update_profile(login_email: str, profile_update: ProfileUpdate):
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="No fields to update"
         )
+
+    if result == "Invalid profile picture":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid profile picture"
+        )
     
     # return successful update message
     return{
@@ -169,11 +261,11 @@ def update_profile(login_email: str, profile_update: ProfileUpdate):
     
 
 @router.delete("/profile/{login_email}")
-def delete_profile(login_email: str):
+async def delete_profile(login_email: str):
     """
     Delete a user's profile
     """
-    result = delete_user_profile(login_email)
+    result = await delete_user_profile(login_email)
 
     if result is None:
         raise HTTPException(
@@ -194,17 +286,24 @@ def delete_profile(login_email: str):
 # ==================== Tutor Availability Management Endpoints ====================
 
 @router.post("/tutor/availability")
-def create_tutor_availability_endpoint(availability_data: TutorAvailabilityCreate):
+async def create_tutor_availability_endpoint(availability_data: TutorAvailabilityCreate):
     """Create a new tutor availability slot"""
-    availability_id = create_tutor_availability(
+    availability_id = await create_tutor_availability(
         availability_data.tutor_email,
         availability_data.tutor_name,
         availability_data.session_type,
         availability_data.date,
         availability_data.time_slot,
         availability_data.location,
-        availability_data.description
+        availability_data.description,
+        availability_data.capacity
     )
+
+    if availability_id == "Invalid date or time slot":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid date or time slot"
+        )
     
     return {
         "success": True,
@@ -212,24 +311,70 @@ def create_tutor_availability_endpoint(availability_data: TutorAvailabilityCreat
         "availability_id": availability_id
     }
 
+@router.post("/tutor/availability/batch")
+async def create_tutor_availability_batch_endpoint(batch_data: TutorAvailabilityBatchCreate):
+    """Create many tutor availability slots in one request; reports an id or error per item"""
+    if not batch_data.availabilities:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No availability slots provided"
+        )
+
+    if len(batch_data.availabilities) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_BATCH_SIZE} availability slots per batch"
+        )
+
+    results = await create_tutor_availabilities(batch_data.availabilities)
+    created = sum(1 for result in results if result["availability_id"])
+
+    return {
+        "success": created == len(results),
+        "message": f"Created {created} of {len(results)} availability slots",
+        "created": created,
+        "results": results
+    }
+
 @router.get("/tutor/availability/{tutor_email}")
-def get_tutor_availability_endpoint(tutor_email: str, date: str = None, session_type: str = None):
-    """Get a tutor's availability slots"""
-    availabilities = get_tutor_availability(tutor_email, date, session_type)
-    
+async def get_tutor_availability_endpoint(request: Request, response: Response,
+                                          tutor_email: str, date: str = None, session_type: str = None,
+                                          from_date: str = None, to_date: str = None,
+                                          after: str = None, limit: int = Query(None, ge=1)):
+    """Get one page of a tutor's availability slots, optionally within a from_date/to_date window"""
+    not_modified, _ = await conditional_get(
+        request, response, (SESSIONS, USERS),
+        tutor_email, date, session_type, from_date, to_date, after, limit
+    )
+    if not_modified:
+        return not_modified
+
+    result = await get_tutor_availability(
+        tutor_email, date, session_type,
+        from_date=from_date, to_date=to_date, after=after, limit=limit
+    )
+
+    if result in ("Invalid cursor", "Invalid date window"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=result
+        )
+
+    availabilities, next_cursor = result
     if availabilities is None:
         availabilities = []
     
     return {
         "tutor_email": tutor_email,
         "availabilities": availabilities,
-        "total_slots": len(availabilities)
+        "total_slots": len(availabilities),
+        "next_cursor": next_cursor
     }
 
 @router.delete("/tutor/availability/{availability_id}")
-def delete_tutor_availability_endpoint(availability_id: str, tutor_email: str):
+async def delete_tutor_availability_endpoint(availability_id: str, tutor_email: str):
     """Delete a tutor's availability slot"""
-    result = delete_tutor_availability(availability_id, tutor_email)
+    result = await delete_tutor_availability(availability_id, tutor_email)
     
     if result == "Availability slot not found or not owned by this tutor":
         raise HTTPException(
@@ -254,22 +399,196 @@ def delete_tutor_availability_endpoint(availability_id: str, tutor_email: str):
         "message": "Availability slot deleted successfully"
     }
 
+# ==================== Recurring Availability Endpoints ====================
+
+@router.post("/tutor/recurring-availability")
+async def create_recurring_availability_endpoint(recurrence_data: RecurringAvailabilityCreate):
+    """Create a weekly recurring availability; occurrences appear on the calendar without being stored"""
+    recurrence_id = await create_recurring_availability(
+        recurrence_data.tutor_email,
+        recurrence_data.tutor_name,
+        recurrence_data.session_type,
+        recurrence_data.weekday,
+        recurrence_data.time_slot,
+        recurrence_data.start_date,
+        recurrence_data.end_date,
+        recurrence_data.location,
+        recurrence_data.description,
+        recurrence_data.capacity
+    )
+
+    if recurrence_id == "Invalid recurrence":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid recurrence"
+        )
+
+    return {
+        "success": True,
+        "message": "Recurring availability created successfully",
+        "recurrence_id": recurrence_id
+    }
+
+@router.get("/tutor/recurring-availability/{tutor_email}")
+async def get_recurring_availability_endpoint(tutor_email: str):
+    """Get a tutor's recurring availability templates"""
+    recurrences = await get_recurring_availability(tutor_email)
+
+    return {
+        "tutor_email": tutor_email,
+        "recurrences": recurrences,
+        "total_recurrences": len(recurrences)
+    }
+
+@router.put("/tutor/recurring-availability/{recurrence_id}/exceptions")
+async def set_recurrence_exception_endpoint(recurrence_id: str, exception_data: RecurrenceException):
+    """Skip one occurrence of a recurring availability, or change its time, location or description"""
+    result = await set_recurrence_exception(
+        recurrence_id,
+        exception_data.tutor_email,
+        exception_data.date,
+        exception_data.skip,
+        exception_data.time_slot,
+        exception_data.location,
+        exception_data.description
+    )
+
+    if result in ("Recurring availability not found or not owned by this tutor",
+                  "Date is not an occurrence of this recurring availability"):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=result
+        )
+
+    if result in ("No fields to update", "Invalid date or time slot",
+                  "Cannot change an occurrence with a registered student"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=result
+        )
+
+    return {
+        "success": True,
+        "message": "Occurrence updated successfully"
+    }
+
+@router.delete("/tutor/recurring-availability/{recurrence_id}")
+async def delete_recurring_availability_endpoint(recurrence_id: str, tutor_email: str):
+    """End a recurring availability; occurrences students already booked are kept"""
+    result = await delete_recurring_availability(recurrence_id, tutor_email)
+
+    if result == "Recurring availability not found or not owned by this tutor":
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=result
+        )
+
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to delete recurring availability"
+        )
+
+    return {
+        "success": True,
+        "message": "Recurring availability deleted successfully"
+    }
+
 # # ==================== Student Calendar and Registration Endpoints ====================
 
 @router.get("/student/calendar", response_model=StudentCalendarView)
-def get_student_calendar(session_type: str = None, date: str = None, student_email: str = None):
-    """Get calendar view for students - shows available tutors grouped by time slots"""
-    calendar_slots = get_student_calendar_view(session_type, date, student_email)
-    
-    return StudentCalendarView(calendar_slots=calendar_slots)
+async def get_student_calendar(request: Request, response: Response,
+                               session_type: str = None, date: str = None, student_email: str = None,
+                               from_date: str = None, to_date: str = None,
+                               after: str = None, limit: int = Query(None, ge=1)):
+    """Get calendar view for students - shows available tutors grouped by time slots, one page at a time"""
+    not_modified, versions = await conditional_get(
+        request, response, (SESSIONS,),
+        session_type, date, student_email, from_date, to_date, after, limit
+    )
+    if not_modified:
+        return not_modified
+
+    result = await get_student_calendar_view(
+        session_type, date, student_email,
+        from_date=from_date, to_date=to_date, after=after, limit=limit,
+        version=versions[SESSIONS]
+    )
+
+    if result in ("Invalid cursor", "Invalid date window"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=result
+        )
+
+    calendar_slots, next_cursor = result
+    # Groups are written out as Mongo produces them, so memory and time to first byte don't grow with the page
+    return StreamingResponse(
+        stream_calendar_view(calendar_slots, next_cursor),
+        media_type="application/json",
+        headers=dict(response.headers)
+    )
+
+async def stream_calendar_view(calendar_slots, next_cursor):
+    """StudentCalendarView as JSON, one slot group at a time (groups already have its exact field order)"""
+    buffer = bytearray(b'{"calendar_slots":[')
+    first = True
+    async for slot in calendar_slots:
+        if not first:
+            buffer += b","
+        buffer += dump_json(slot)
+        first = False
+        if len(buffer) >= STREAM_CHUNK_BYTES:
+            yield bytes(buffer)
+            buffer.clear()
+    buffer += b'],"next_cursor":' + dump_json(next_cursor) + b"}"
+    yield bytes(buffer)
+
+def dump_json(value):
+    if FAST_JSON_RESPONSES:
+        return orjson.dumps(value)
+    # Same settings as FastAPI's JSONResponse, so the bytes match the non-streamed response
+    return json.dumps(value, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+@router.get("/student/calendar/stream")
+async def stream_student_calendar(session_type: str = None, date: str = None):
+    """Server-Sent Events: slot-created / slot-taken / slot-freed / slot-deleted / calendar-changed,
+    filtered by session_type and date, so clients can patch their calendar instead of polling"""
+    return StreamingResponse(
+        calendar_events.stream(session_type, date),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @router.post("/student/register")
-def register_student_for_session(selection_data: StudentSessionSelection):
-    """Register a student for a specific tutor's availability slot"""
-    result = register_student_for_tutor_slot(
+async def register_student_for_session(selection_data: StudentSessionSelection, response: Response):
+    """Register a student for a specific tutor's availability slot, or join its waitlist if it is taken"""
+    result = await register_student_for_tutor_slot(
         selection_data.student_email,
         selection_data.availability_id
     )
+
+    if result == "This tutor slot is already taken" and selection_data.waitlist:
+        result = await join_waitlist(selection_data.student_email, selection_data.availability_id)
+        if result is None:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Could not join the waitlist"
+            )
+        if isinstance(result, int) and result > 0:
+            response.status_code = status.HTTP_202_ACCEPTED
+            return {
+                "success": True,
+                "message": "Slot is taken; added to its waitlist",
+                "waitlisted": True,
+                "position": result
+            }
+        if result == 0:
+            return {
+                "success": True,
+                "message": "Successfully registered for tutor session",
+                "waitlisted": False
+            }
     
     # Handle different error cases
     if result == "Availability slot not found":
@@ -321,9 +640,9 @@ def register_student_for_session(selection_data: StudentSessionSelection):
     }
 
 @router.delete("/student/register")
-def cancel_student_registration(selection_data: StudentSessionSelection):
+async def cancel_student_registration(selection_data: StudentSessionSelection):
     """Cancel a student's registration for a specific tutor slot"""
-    result = cancel_student_registration_for_tutor_slot(
+    result = await cancel_student_registration_for_tutor_slot(
         selection_data.student_email,
         selection_data.availability_id
     )
@@ -339,22 +658,156 @@ def cancel_student_registration(selection_data: StudentSessionSelection):
         "message": "Registration cancelled successfully"
     }
 
+@router.get("/student/waitlist/{availability_id}")
+async def get_waitlist_position_endpoint(availability_id: str, student_email: str):
+    """A student's place in a slot's waitlist (1 = next to be promoted)"""
+    result = await get_waitlist_position(student_email, availability_id)
+
+    if result == "Not on the waitlist":
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Not on the waitlist"
+        )
+
+    return {
+        "availability_id": availability_id,
+        "student_email": student_email,
+        "position": result
+    }
+
 # ==================== Session Types Endpoint ====================
 
 @router.get("/session-types", response_model=SessionTypesList)
-def get_session_types():
+async def get_session_types():
     """Get available session types"""
     return SessionTypesList()
 
 # ==================== Student My Sessions Endpoint ====================
 
 @router.get("/my-sessions/{student_email}")
-def get_my_sessions(student_email: str):
-    """Get active sessions registered by a student"""
-    registrations = get_student_registrations(student_email)
+async def get_my_sessions(request: Request, response: Response,
+                          student_email: str, limit: int = Query(None, ge=1), before: str = None):
+    """Get active sessions registered by a student, newest first, from their schedule document; pass limit/before to page"""
+    not_modified, _ = await conditional_get(
+        request, response, (REGISTRATIONS, SESSIONS, USERS),
+        student_email, limit, before
+    )
+    if not_modified:
+        return not_modified
+
+    registrations = await get_student_registrations(student_email, limit, before)
+
+    if registrations == "Invalid cursor":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
     
     return {
         "student_email": student_email,
         "registrations": registrations,
-        "total_registrations": len(registrations)
+        "total_registrations": len(registrations),
+        # Pass as `before` to fetch the next (older) page
+        "next_before": registrations[-1]["registration_id"] if limit and len(registrations) == limit else None
     }
+
+# ==================== Admin Access ====================
+
+# Shared secret for /admin/*; admin requests are refused while it is unset
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+def require_admin(authorization: str = Header(None)):
+    """Dependency for admin endpoints: the request must send an "Authorization: Bearer <ADMIN_TOKEN>" header"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access is not configured"
+        )
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid admin token",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+
+# ==================== Admin Export Endpoints ====================
+
+EXPORT_MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+@router.get("/admin/export/registrations", dependencies=[Depends(require_admin)])
+async def export_registrations_endpoint(from_date: str = None, to_date: str = None, session_type: str = None,
+                                        status_filter: str = Query("registered", alias="status"),
+                                        export_format: str = Query("csv", alias="format", pattern="^(csv|ndjson)$")):
+    """Download registrations with their slot and student details as CSV or NDJSON ("status=" for every status)"""
+    rows = await export_registrations(from_date, to_date, session_type, status_filter or None)
+    return export_response(rows, REGISTRATION_EXPORT_FIELDS, export_format, "registrations")
+
+@router.get("/admin/export/availability", dependencies=[Depends(require_admin)])
+async def export_availability_endpoint(from_date: str = None, to_date: str = None, session_type: str = None,
+                                       status_filter: str = Query("active", alias="status"),
+                                       export_format: str = Query("csv", alias="format", pattern="^(csv|ndjson)$")):
+    """Download published tutor slots as CSV or NDJSON ("status=" for every status)"""
+    rows = await export_availability(from_date, to_date, session_type, status_filter or None)
+    return export_response(rows, AVAILABILITY_EXPORT_FIELDS, export_format, "availability")
+
+def export_response(rows, fields, export_format, name):
+    if rows == "Invalid date window":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=rows
+        )
+
+    return StreamingResponse(
+        stream_export(rows, fields, export_format),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{export_format}"'}
+    )
+
+async def stream_export(rows, fields, export_format):
+    """Rows as CSV (with a header line) or NDJSON, flushed in STREAM_CHUNK_BYTES chunks"""
+    buffer = io.StringIO()
+    if export_format == "csv":
+        writer = csv.writer(buffer)
+        writer.writerow(fields)
+        write = lambda row: writer.writerow([row[field] for field in fields])
+    else:
+        write = lambda row: buffer.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+    async for row in rows:
+        write(row)
+        if buffer.tell() >= STREAM_CHUNK_BYTES:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+# ==================== Admin Import Endpoints ====================
+
+# Uploads larger than this are spooled to a temporary file instead of memory
+IMPORT_SPOOL_BYTES = 1024 * 1024
+
+@router.post("/admin/import/{kind}", dependencies=[Depends(require_admin)])
+async def import_endpoint(request: Request, kind: str,
+                          import_format: str = Query("csv", alias="format", pattern="^(csv|ndjson)$")):
+    """Bulk upsert tutors or availability slots from a CSV or NDJSON request body; returns a per-row error report"""
+    if kind not in IMPORTERS:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Unknown import kind"
+        )
+
+    with tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_BYTES) as body:
+        async for chunk in request.stream():
+            body.write(chunk)
+        body.seek(0)
+        text = io.TextIOWrapper(body, encoding="utf-8-sig", newline="")
+        try:
+            return await import_rows(kind, text, import_format)
+        except UnicodeDecodeError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="File must be UTF-8 encoded"
+            )
+        finally:
+            text.detach()
@@ -0,0 +1,51 @@
+"""
+Reconcile the per-student schedule documents behind /my-sessions with the
+registration, slot and user collections they are built from.
+
+Run from the backend directory, e.g.:
+    python -m app.schedules verify                      # report drift, change nothing
+    python -m app.schedules rebuild                     # replace every drifted or missing document
+    python -m app.schedules rebuild --student a@b.edu   # just one student
+
+Students without a schedule document yet are not drift (one is built on their
+first read); verify reports them separately and rebuild fills them in.
+"""
+import argparse
+import asyncio
+import sys
+from .mongo import registration_collection, schedule_collection
+from .utils import reconcile_student_schedule
+
+
+async def schedule_students():
+    """Every student with an active registration or a stored schedule"""
+    students = set()
+    async for group in registration_collection.aggregate(
+        [{"$match": {"status": "registered"}}, {"$group": {"_id": "$student_email"}}],
+        allowDiskUse=True
+    ):
+        students.add(group["_id"])
+    async for schedule in schedule_collection.find({}, {"_id": 1}):
+        students.add(schedule["_id"])
+    return sorted(students)
+
+
+async def reconcile(repair, students=None):
+    counts = {"ok": 0, "missing": 0, "mismatch": 0, "repaired": 0}
+    for student_email in students or await schedule_students():
+        outcome = await reconcile_student_schedule(student_email, repair=repair)
+        counts[outcome] += 1
+        if outcome != "ok":
+            print(f"{outcome}: {student_email}")
+    print(", ".join(f"{count} {outcome}" for outcome, count in counts.items()))
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Verify or rebuild student schedule documents")
+    parser.add_argument("action", choices=["verify", "rebuild"])
+    parser.add_argument("--student", action="append", help="limit to this student email (repeatable)")
+    args = parser.parse_args()
+
+    counts = asyncio.run(reconcile(args.action == "rebuild", args.student))
+    sys.exit(1 if counts["mismatch"] else 0)
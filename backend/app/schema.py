@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List
 
 # User Signup and Login
@@ -41,7 +41,7 @@ class ProfileResponse(BaseModel):
     major: str
     contact_phone: str
     personal_email: str  # Keep consistent with database field name
-    profile_picture: Optional[str] = None  # Base64 encoded image or file path
+    profile_picture: Optional[str] = None  # URL of GET /profile/{email}/picture (or a legacy base64 image)
 
     class Config:
         # Allow extra fields and provide defaults for missing fields
@@ -71,6 +71,31 @@ class TutorAvailabilityCreate(BaseModel):
     time_slot: str  # Format: "HH:MM-HH:MM"
     location: str
     description: Optional[str] = None
+    capacity: int = Field(1, ge=1)  # Seats; more than 1 makes a group session
+
+class TutorAvailabilityBatchCreate(BaseModel):
+    availabilities: List[TutorAvailabilityCreate]  # Validated together and written in one insert
+
+# Recurring Availability Schemas
+class RecurringAvailabilityCreate(BaseModel):
+    tutor_email: str
+    tutor_name: str
+    session_type: str
+    weekday: int  # 0 = Monday ... 6 = Sunday
+    time_slot: str  # Format: "HH:MM-HH:MM"
+    start_date: str  # Format: "YYYY-MM-DD", first day the template applies
+    end_date: str  # Format: "YYYY-MM-DD", last day the template applies
+    location: str
+    description: Optional[str] = None
+    capacity: int = Field(1, ge=1)  # Seats in each occurrence
+
+class RecurrenceException(BaseModel):
+    tutor_email: str
+    date: str  # Format: "YYYY-MM-DD", the occurrence to change
+    skip: bool = False  # Cancel this occurrence
+    time_slot: Optional[str] = None  # Or override its time, location or description
+    location: Optional[str] = None
+    description: Optional[str] = None
 
 class TutorAvailabilityResponse(BaseModel):
     id: str
@@ -81,14 +106,17 @@ class TutorAvailabilityResponse(BaseModel):
     time_slot: str
     location: str
     description: Optional[str] = None
-    is_available: bool  # True if no student registered yet
-    student_registered: Optional[str] = None
+    is_available: bool  # True while seats are left
+    student_registered: Optional[str] = None  # One-on-one slots only
     status: str
+    capacity: int = 1
+    seats_remaining: Optional[int] = None
 
 # Student Session Selection
 class StudentSessionSelection(BaseModel):
     student_email: str
     availability_id: str  # The specific tutor's availability slot
+    waitlist: bool = False  # If the slot is taken, queue for it instead of failing
 
 # Calendar View for Students
 class CalendarSlot(BaseModel):
@@ -99,3 +127,4 @@ class CalendarSlot(BaseModel):
 
 class StudentCalendarView(BaseModel):
     calendar_slots: List[CalendarSlot]
+    next_cursor: Optional[str] = None  # Pass as `after` to fetch the next page
@@ -0,0 +1,67 @@
+"""
+Password hashing.
+
+Passwords are stored as "scrypt$<n>$<r>$<p>$<salt>$<hash>" (base64 salt/hash).
+scrypt is deliberately slow, so hashing and verification run on a dedicated,
+bounded thread pool (hashlib releases the GIL while it works) instead of on the
+event loop or the shared anyio threadpool. Records still holding a plaintext
+password, or a hash made with an older cost, are rehashed on the next login.
+"""
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+PASSWORD_SCRYPT_N = int(os.getenv("PASSWORD_SCRYPT_N", str(2 ** 14)))  # CPU/memory cost factor
+PASSWORD_SCRYPT_R = int(os.getenv("PASSWORD_SCRYPT_R", "8"))
+PASSWORD_SCRYPT_P = int(os.getenv("PASSWORD_SCRYPT_P", "1"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+
+SCHEME = "scrypt"
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+
+
+def _scrypt(password, salt, n, r, p):
+    return hashlib.scrypt(
+        password.encode(), salt=salt, n=n, r=r, p=p,
+        maxmem=256 * n * r,  # scrypt needs ~128*n*r bytes; leave headroom above OpenSSL's 32MB default
+        dklen=KEY_BYTES
+    )
+
+
+def hash_password_sync(password):
+    salt = os.urandom(SALT_BYTES)
+    key = _scrypt(password, salt, PASSWORD_SCRYPT_N, PASSWORD_SCRYPT_R, PASSWORD_SCRYPT_P)
+    return "$".join([
+        SCHEME, str(PASSWORD_SCRYPT_N), str(PASSWORD_SCRYPT_R), str(PASSWORD_SCRYPT_P),
+        base64.b64encode(salt).decode(), base64.b64encode(key).decode()
+    ])
+
+
+def verify_password_sync(password, stored):
+    """Returns (matches, needs_rehash)"""
+    if not stored:
+        return False, False
+    if not stored.startswith(SCHEME + "$"):
+        # Legacy plaintext record
+        return hmac.compare_digest(password.encode(), stored.encode()), True
+
+    _, n, r, p, salt, key = stored.split("$")
+    n, r, p = int(n), int(r), int(p)
+    candidate = _scrypt(password, base64.b64decode(salt), n, r, p)
+    matches = hmac.compare_digest(candidate, base64.b64decode(key))
+    needs_rehash = (n, r, p) != (PASSWORD_SCRYPT_N, PASSWORD_SCRYPT_R, PASSWORD_SCRYPT_P)
+    return matches, needs_rehash
+
+
+async def hash_password(password):
+    return await asyncio.get_running_loop().run_in_executor(_executor, hash_password_sync, password)
+
+
+async def verify_password(password, stored):
+    return await asyncio.get_running_loop().run_in_executor(_executor, verify_password_sync, password, stored)
@@ -1,40 +1,81 @@
-from .mongo import user_collection, session_collection, registration_collection
-from datetime import datetime
+from .mongo import (
+    client, user_collection, session_collection, registration_collection, recurrence_collection,
+    schedule_collection, profile_picture_bucket
+)
+from .cache import calendar_cache
+from .events import calendar_events
+from .versions import bump_versions, SESSIONS, REGISTRATIONS, USERS
+from .security import hash_password, verify_password
+import base64
+import binascii
+import hashlib
+import os
+from datetime import datetime, timedelta
 from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ReturnDocument, UpdateMany
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 
-def check_email_exists(email):
+# Upper bound (and default) for page sizes on list endpoints, so responses stay bounded
+PAGE_SIZE_MAX = int(os.getenv("PAGE_SIZE_MAX", "500"))
+# Slots nobody holds a seat in (slots from before group sessions have no seats_taken)
+UNBOOKED = {"is_registered": False, "seats_taken": {"$in": [0, None]}}
+
+async def check_email_exists(email):
     """Check if email already exists in database"""
-    return user_collection.find_one({"email": email})
+    return await user_collection.find_one({"email": email}, {"_id": 1})
 
-def create_user(email, password):
-    """Create a new user in database"""
+async def create_user(email, password):
+    """Create a new user in database; returns None if the email is already registered"""
     user = {
         "email": email,
-        "password": password
+        "password": await hash_password(password)
     }
-    result = user_collection.insert_one(user)
+    try:
+        result = await user_collection.insert_one(user)
+    except DuplicateKeyError:
+        # A concurrent signup for the same email won the email_unique index
+        return None
     return str(result.inserted_id)
 
-def verify_user_credentials(email, password):
-    """Verify if email and password match exactly"""
-    user = user_collection.find_one({"email": email})
+async def verify_user_credentials(email, password):
+    """Verify a login against the stored password hash, upgrading legacy records on success"""
+    user = await user_collection.find_one({"email": email}, {"password": 1})
     if not user:
         return None
-    if user["password"] != password:
+    matches, needs_rehash = await verify_password(password, user.get("password"))
+    if not matches:
         return None
+    if needs_rehash:
+        # Plaintext or old-cost hash: replace it, unless the password changed meanwhile
+        await user_collection.update_one(
+            {"_id": user["_id"], "password": user["password"]},
+            {"$set": {"password": await hash_password(password)}}
+        )
     return user
 
-def get_all_users():
-    """Get all users from database (without passwords)"""
-    users = list(user_collection.find({}, {"password": 0}))
+async def get_all_users(after=None, limit=None):
+    """Get one page of users from database (without passwords), returns (users, next_cursor)"""
+    limit = page_size(limit)
+    query = {}
+    if after:
+        try:
+            (user_id,) = decode_cursor(after)
+            query["_id"] = {"$gt": ObjectId(user_id)}
+        except Exception:
+            return "Invalid cursor"
+
+    users = await user_collection.find(query, {"password": 0}).sort("_id", 1).limit(limit).to_list(length=limit)
     for user in users:
         user["_id"] = str(user["_id"])
-    return users
 
-def create_user_profile(email, SID, full_name, preferred_name, study_year, major, contact_phone, profile_email, profile_picture=None):
+    next_cursor = encode_cursor(users[-1]["_id"]) if len(users) == limit else None
+    return users, next_cursor
+
+async def create_user_profile(email, SID, full_name, preferred_name, study_year, major, contact_phone, profile_email, profile_picture=None):
     """Create a profile for a user"""
     # First check if user exists
-    user = user_collection.find_one({"email": email})
+    user = await user_collection.find_one({"email": email}, {"profile": 1})
     if not user:
         return None
 
@@ -50,21 +91,29 @@ def create_user_profile(email, SID, full_name, preferred_name, study_year, major
         "study_year": study_year,
         "major": major,
         "contact_phone": contact_phone,
-        "personal_email": profile_email,
-        "profile_picture": profile_picture
+        "personal_email": profile_email
     }
 
+    # The picture itself goes to GridFS; the profile only keeps a reference and content hash
+    if is_embedded_picture(profile_picture):
+        try:
+            profile_data.update(await store_profile_picture(email, profile_picture))
+        except ValueError:
+            return "Invalid profile picture"
+
     # Update user with profile
-    result = user_collection.update_one(
+    result = await user_collection.update_one(
         {"email": email},
         {"$set": {"profile": profile_data}}
     )
+    await refresh_tutor_in_schedules(email)
+    await bump_versions(USERS)
 
     return str(result.modified_count) if result.modified_count > 0 else None
 
-def get_user_profile(email):
+async def get_user_profile(email):
     """Get a user's profile"""
-    user = user_collection.find_one({"email": email}, {"password": 0})
+    user = await user_collection.find_one({"email": email}, {"profile": 1})
     if not user:
         return None
 
@@ -75,10 +124,10 @@ def get_user_profile(email):
     user["_id"] = str(user["_id"])
     return user["profile"]
 
-def update_user_profile(email, SID=None, full_name=None, preferred_name=None, study_year=None, major=None, contact_phone=None, profile_email=None, profile_picture=None):
+async def update_user_profile(email, SID=None, full_name=None, preferred_name=None, study_year=None, major=None, contact_phone=None, profile_email=None, profile_picture=None):
     """Update a user's profile"""
     # First check if user exists
-    user = user_collection.find_one({"email": email})
+    user = await user_collection.find_one({"email": email}, {"profile.profile_picture_id": 1})
     if not user:
         return None
 
@@ -102,25 +151,42 @@ def update_user_profile(email, SID=None, full_name=None, preferred_name=None, st
         update_data["profile.contact_phone"] = contact_phone
     if profile_email is not None:
         update_data["profile.personal_email"] = profile_email  # Note: this is profile_email, not login email
-    if profile_picture is not None:
-        update_data["profile.profile_picture"] = profile_picture
+    update = {}
+    # A picture URL echoed back from GET /profile is not a new upload, so it is ignored
+    if is_embedded_picture(profile_picture):
+        try:
+            picture_refs = await store_profile_picture(email, profile_picture)
+        except ValueError:
+            return "Invalid profile picture"
+        update_data.update({f"profile.{key}": value for key, value in picture_refs.items()})
+        update["$unset"] = {"profile.profile_picture": 1}  # Drop any legacy embedded copy
 
     if not update_data:
         return "No fields to update"
 
     # Update user profile
-    result = user_collection.update_one(
+    update["$set"] = update_data
+    result = await user_collection.update_one(
         {"email": email},
-        {"$set": update_data}
+        update
     )
+    # Schedules only snapshot these two profile fields
+    if "profile.preferred_name" in update_data or "profile.study_year" in update_data:
+        await refresh_tutor_in_schedules(email)
+    await bump_versions(USERS)
+
+    # The old picture is unreferenced once the profile points at the new one
+    old_picture_id = user["profile"].get("profile_picture_id")
+    if "profile.profile_picture_id" in update_data and old_picture_id:
+        await delete_profile_picture(old_picture_id)
 
     # If we matched a document, the update is considered successful even if no changes were made
     return str(result.matched_count) if result.matched_count > 0 else None
 
-def delete_user_profile(email):
+async def delete_user_profile(email):
     """Delete a user's profile"""
     # Check if user exists
-    user = user_collection.find_one({"email": email})
+    user = await user_collection.find_one({"email": email}, {"profile.profile_picture_id": 1})
     if not user:
         return None
 
@@ -129,37 +195,190 @@ def delete_user_profile(email):
         return "Profile not found"
 
     # Remove profile from user
-    result = user_collection.update_one(
+    result = await user_collection.update_one(
         {"email": email},
         {"$unset": {"profile": 1}}
     )
+    await refresh_tutor_in_schedules(email)
+    await bump_versions(USERS)
+
+    if result.modified_count > 0 and user["profile"].get("profile_picture_id"):
+        await delete_profile_picture(user["profile"]["profile_picture_id"])
 
     return str(result.modified_count) if result.modified_count > 0 else None
 
+# ==================== Profile Picture Functions ====================
+
+def is_embedded_picture(profile_picture):
+    """True for base64 / data-URL image payloads, False for empty values and URLs"""
+    return bool(profile_picture) and not profile_picture.startswith(("http://", "https://", "/"))
+
+def decode_profile_picture(profile_picture):
+    """Decode a data URL ("data:image/png;base64,...") or bare base64 string into (bytes, content_type)"""
+    content_type = "application/octet-stream"
+    encoded = profile_picture
+    if profile_picture.startswith("data:"):
+        header, _, encoded = profile_picture.partition(",")
+        content_type = header[len("data:"):].split(";")[0] or content_type
+    try:
+        return base64.b64decode(encoded, validate=True), content_type
+    except binascii.Error:
+        raise ValueError("Profile picture is not valid base64")
+
+async def store_profile_picture(email, profile_picture):
+    """Upload a picture to GridFS, returns the profile fields that reference it"""
+    data, content_type = decode_profile_picture(profile_picture)
+    picture_hash = hashlib.sha256(data).hexdigest()
+    file_id = await profile_picture_bucket.upload_from_stream(
+        email,
+        data,
+        metadata={"content_type": content_type, "sha256": picture_hash}
+    )
+    return {
+        "profile_picture_id": file_id,
+        "profile_picture_hash": picture_hash,
+        "profile_picture_type": content_type
+    }
+
+async def delete_profile_picture(file_id):
+    try:
+        await profile_picture_bucket.delete(file_id)
+    except Exception as e:
+        print(f"Error deleting profile picture {file_id}: {e}")
+
+async def get_profile_picture_info(email):
+    """Get the GridFS reference, hash and content type of a user's picture"""
+    user = await user_collection.find_one(
+        {"email": email},
+        {"profile.profile_picture_id": 1, "profile.profile_picture_hash": 1, "profile.profile_picture_type": 1}
+    )
+    if not user or not (user.get("profile") or {}).get("profile_picture_id"):
+        return None
+    return user["profile"]
+
+async def stream_profile_picture(file_id):
+    """Yield a stored picture chunk by chunk"""
+    grid_out = await profile_picture_bucket.open_download_stream(file_id)
+    while True:
+        chunk = await grid_out.readchunk()
+        if not chunk:
+            break
+        yield chunk
+
 # ==================== Tutor Availability Management Functions ====================
 # create tutor availability
-def create_tutor_availability(tutor_email, tutor_name, session_type, date, time_slot, location, description=None):
-    """Create a new tutor availability slot"""
-    availability_data = {
+async def create_tutor_availability(tutor_email, tutor_name, session_type, date, time_slot, location, description=None, capacity=1):
+    """Create a new tutor availability slot (a group session when capacity > 1)"""
+    try:
+        availability_data = build_availability(tutor_email, tutor_name, session_type, date, time_slot, location, description, capacity)
+    except ValueError:
+        return "Invalid date or time slot"
+    
+    result = await session_collection.insert_one(availability_data)
+    publish_slot_change("slot-created", availability_data)
+    await bump_versions(SESSIONS)
+    return str(result.inserted_id)
+
+async def create_tutor_availabilities(items):
+    """Create many availability slots in one round trip.
+
+    Items are validated together: malformed slots, overlaps within the batch and overlaps with the
+    tutor's existing active slots are rejected per item. Returns one {index, availability_id, error}
+    result per item, in order.
+    """
+    results = [{"index": index, "availability_id": None, "error": None} for index in range(len(items))]
+    documents = {}
+    for index, item in enumerate(items):
+        try:
+            documents[index] = build_availability(
+                item.tutor_email, item.tutor_name, item.session_type, item.date,
+                item.time_slot, item.location, item.description, item.capacity
+            )
+        except ValueError:
+            results[index]["error"] = "Invalid date or time slot"
+
+    # Overlaps within the batch: walk each tutor's slots in start order
+    by_start = sorted(documents.items(), key=lambda entry: (entry[1]["tutor_email"], entry[1]["start_at"]))
+    previous = None
+    for index, document in by_start:
+        if previous and previous["tutor_email"] == document["tutor_email"] and document["start_at"] < previous["end_at"]:
+            results[index]["error"] = "Overlaps another slot in this batch"
+            del documents[index]
+            continue
+        previous = document
+
+    # Overlaps with existing slots: one range query covering the whole batch
+    if documents:
+        existing = await session_collection.find(
+            {
+                "tutor_email": {"$in": list({d["tutor_email"] for d in documents.values()})},
+                "status": "active",
+                "start_at": {"$lt": max(d["end_at"] for d in documents.values())},
+                "end_at": {"$gt": min(d["start_at"] for d in documents.values())}
+            },
+            {"tutor_email": 1, "start_at": 1, "end_at": 1}
+        ).to_list(length=None)
+        for index, document in list(documents.items()):
+            if any(
+                slot["tutor_email"] == document["tutor_email"]
+                and slot["start_at"] < document["end_at"] and slot["end_at"] > document["start_at"]
+                for slot in existing
+            ):
+                results[index]["error"] = "Overlaps an existing slot"
+                del documents[index]
+
+    if not documents:
+        return results
+
+    # Write everything that passed validation in one unordered insert
+    indexes = list(documents)
+    failed = set()
+    try:
+        await session_collection.insert_many([documents[index] for index in indexes], ordered=False)
+    except BulkWriteError as e:
+        for write_error in e.details.get("writeErrors", []):
+            index = indexes[write_error["index"]]
+            failed.add(index)
+            results[index]["error"] = "Failed to create availability slot"
+
+    for index in indexes:
+        if index in failed:
+            continue
+        document = documents[index]
+        results[index]["availability_id"] = str(document["_id"])  # Assigned client-side by insert_many
+        publish_slot_change("slot-created", document)
+    await bump_versions(SESSIONS)
+
+    return results
+
+def build_availability(tutor_email, tutor_name, session_type, date, time_slot, location, description=None, capacity=1):
+    """Build a new availability slot document; raises ValueError for a malformed date, time slot or capacity"""
+    start_at, end_at = parse_time_slot(date, time_slot)
+    if capacity < 1:
+        raise ValueError(f"Capacity must be at least 1: {capacity}")
+    now = datetime.utcnow()
+    return {
         "tutor_email": tutor_email,
         "tutor_name": tutor_name,
         "session_type": session_type,
         "date": date,
         "time_slot": time_slot,
+        "start_at": start_at,
+        "end_at": end_at,
         "location": location,
         "description": description,
-        "is_registered": False,  # Track if a student registered for this slot
-        "registered_student": None,  # Email of registered student
+        "capacity": capacity,  # Seats; more than 1 makes a group session
+        "seats_taken": 0,  # Registration count, kept by an atomic $inc instead of counting registrations
+        "is_registered": False,  # True once every seat is taken
+        "registered_student": None,  # Email of registered student (one-on-one slots only)
         "status": "active",
-        "created_at": datetime.utcnow(),
-        "updated_at": datetime.utcnow()
+        "created_at": now,
+        "updated_at": now
     }
-    
-    result = session_collection.insert_one(availability_data)
-    return str(result.inserted_id)
 
-def get_tutor_availability(tutor_email=None, date=None, session_type=None, status="active"):
-    """Get tutor availability slots with optional filters"""
+async def get_tutor_availability(tutor_email=None, date=None, session_type=None, status="active",
+                                 from_date=None, to_date=None, after=None, limit=None):
+    """Get one page of tutor availability slots with optional filters, returns (availabilities, next_cursor)"""
     query = {"status": status}
     
     if tutor_email:
@@ -168,23 +387,50 @@ def get_tutor_availability(tutor_email=None, date=None, session_type=None, statu
         query["date"] = date
     if session_type:
         query["session_type"] = session_type
-    
-    availabilities = list(session_collection.find(query))
+
+    try:
+        window = apply_slot_window(query, from_date, to_date, after)
+    except InvalidPageRequest as e:
+        return str(e)
+
+    limit = page_size(limit)
+    availabilities = await session_collection.find(query).sort(SLOT_ORDER).limit(limit).to_list(length=limit)
+
+    # Unbooked occurrences of recurring availability share the page (and its limit) in the same order
+    if status == "active":
+        availabilities = merge_occurrences(availabilities, await expand_recurring_slots(
+            window, page_end=availabilities[-1]["start_at"] if len(availabilities) == limit else None,
+            limit=limit, tutor_email=tutor_email, session_type=session_type, date=date
+        ))
+    next_cursor = slot_cursor(availabilities[limit - 1]) if len(availabilities) >= limit else None
+    availabilities = availabilities[:limit]
+
+    # Fetch every registered student's profile in one batch instead of one query per slot
+    student_emails = list({a["registered_student"] for a in availabilities if a.get("registered_student")})
+    student_profiles = {}
+    if student_emails:
+        students = await user_collection.find(
+            {"email": {"$in": student_emails}},
+            {"_id": 0, "email": 1, "profile.preferred_name": 1, "profile.study_year": 1}
+        ).to_list(length=None)
+        student_profiles = {student["email"]: student.get("profile") for student in students}
+
     for availability in availabilities:
         availability["_id"] = str(availability["_id"])
         availability["id"] = availability["_id"]
         availability["is_available"] = not availability.get("is_registered", False)
         availability["student_registered"] = availability.get("registered_student")
+        availability["seats_remaining"] = seats_remaining(availability)
         
         # Add student profile information if someone is registered
         if availability.get("registered_student"):
             student_email = availability.get("registered_student")
-            student_user = user_collection.find_one({"email": student_email})
-            if student_user and "profile" in student_user:
+            profile = student_profiles.get(student_email)
+            if profile:
                 availability["student_profile"] = {
                     "email": student_email,
-                    "preferred_name": student_user["profile"].get("preferred_name"),
-                    "study_year": student_user["profile"].get("study_year"),
+                    "preferred_name": profile.get("preferred_name"),
+                    "study_year": profile.get("study_year"),
                 }
             else:
                 # If no profile, just provide email
@@ -197,15 +443,29 @@ def get_tutor_availability(tutor_email=None, date=None, session_type=None, statu
             availability["student_profile"] = None
     
     if len(availabilities) == 0:
-        return None
+        return None, None
     
-    return availabilities
+    return availabilities, next_cursor
 
-def delete_tutor_availability(availability_id, tutor_email):
+async def delete_tutor_availability(availability_id, tutor_email):
     """Delete a tutor's availability slot (only if it's their own)"""
+    # Deleting an unbooked recurring occurrence skips it in the template
+    if is_occurrence_id(availability_id):
+        try:
+            recurrence_id, occurrence_date = parse_occurrence_id(availability_id)
+        except Exception:
+            return None
+        result = await set_recurrence_exception(recurrence_id, tutor_email, occurrence_date, skip=True)
+        if result in ("Recurring availability not found or not owned by this tutor",
+                      "Date is not an occurrence of this recurring availability"):
+            return "Availability slot not found or not owned by this tutor"
+        if result == "Cannot change an occurrence with a registered student":
+            return "Cannot delete slot with registered student"
+        return result
+
     try:
         # Check if the slot belongs to the tutor
-        availability = session_collection.find_one({
+        availability = await session_collection.find_one({
             "_id": ObjectId(availability_id),
             "tutor_email": tutor_email
         })
@@ -214,61 +474,520 @@ def delete_tutor_availability(availability_id, tutor_email):
             return "Availability slot not found or not owned by this tutor"
         
         # Check if someone is registered
-        if availability.get("is_registered", False):
+        if availability.get("is_registered", False) or availability.get("seats_taken", 0) > 0:
             return "Cannot delete slot with registered student"
         
         # Delete the availability slot
-        result = session_collection.delete_one({"_id": ObjectId(availability_id)})
-        return str(result.deleted_count) if result.deleted_count > 0 else None
+        result = await session_collection.delete_one({"_id": ObjectId(availability_id)})
+        if result.deleted_count > 0:
+            # A published occurrence must not be expanded again from its template
+            if availability.get("recurrence_id"):
+                await recurrence_collection.update_one(
+                    {"_id": availability["recurrence_id"]},
+                    {"$set": {f"exceptions.{availability['occurrence_date']}": {"skip": True}}}
+                )
+            # Anyone still queued for the slot has nothing left to wait for
+            await registration_collection.update_many(
+                {"session_id": availability["_id"], "status": "waitlisted"},
+                {"$set": {"status": "cancelled", "updated_at": datetime.utcnow()}}
+            )
+            publish_slot_change("slot-deleted", availability)
+            await bump_versions(SESSIONS, REGISTRATIONS)
+            return str(result.deleted_count)
+        return None
+    except:
+        return None
+
+# ==================== Recurring Availability Functions ====================
+# A template ("every Tue 14:00-15:00 from A to B") is stored once. Its occurrences are expanded on
+# read with ids "<recurrence_id>:<YYYY-MM-DD>" and only become slot documents when first claimed.
+
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+async def create_recurring_availability(tutor_email, tutor_name, session_type, weekday, time_slot, start_date, end_date, location, description=None, capacity=1):
+    """Create a weekly recurring availability template"""
+    try:
+        parse_time_slot(start_date, time_slot)
+        if capacity < 1 or not 0 <= weekday <= 6 or datetime.strptime(end_date, "%Y-%m-%d") < datetime.strptime(start_date, "%Y-%m-%d"):
+            raise ValueError
+    except ValueError:
+        return "Invalid recurrence"
+
+    recurrence_data = {
+        "tutor_email": tutor_email,
+        "tutor_name": tutor_name,
+        "session_type": session_type,
+        "weekday": weekday,  # 0 = Monday ... 6 = Sunday
+        "time_slot": time_slot,
+        "start_date": start_date,
+        "end_date": end_date,
+        "location": location,
+        "description": description,
+        "capacity": capacity,
+        "exceptions": {},  # "YYYY-MM-DD" -> {"skip": True} or overridden time_slot/location/description
+        "status": "active",
+        "created_at": datetime.utcnow(),
+        "updated_at": datetime.utcnow()
+    }
+
+    result = await recurrence_collection.insert_one(recurrence_data)
+    publish_calendar_change(session_type)
+    await bump_versions(SESSIONS)
+    return str(result.inserted_id)
+
+async def get_recurring_availability(tutor_email):
+    """Get a tutor's active recurring availability templates"""
+    recurrences = await recurrence_collection.find(
+        {"tutor_email": tutor_email, "status": "active"}
+    ).to_list(length=None)
+    for recurrence in recurrences:
+        recurrence["_id"] = str(recurrence["_id"])
+        recurrence["id"] = recurrence["_id"]
+        recurrence["weekday_name"] = WEEKDAYS[recurrence["weekday"]]
+    return recurrences
+
+async def set_recurrence_exception(recurrence_id, tutor_email, date, skip=False, time_slot=None, location=None, description=None):
+    """Skip one occurrence of a recurring template, or override its time slot, location or description"""
+    try:
+        recurrence = await recurrence_collection.find_one({
+            "_id": ObjectId(recurrence_id),
+            "tutor_email": tutor_email,
+            "status": "active"
+        })
+    except Exception:
+        recurrence = None
+    if not recurrence:
+        return "Recurring availability not found or not owned by this tutor"
+
+    if recurrence_occurrence(recurrence, date, ignore_exceptions=True) is None:
+        return "Date is not an occurrence of this recurring availability"
+
+    if skip:
+        exception = {"skip": True}
+    else:
+        exception = {key: value for key, value in (
+            ("time_slot", time_slot), ("location", location), ("description", description)
+        ) if value is not None}
+        if not exception:
+            return "No fields to update"
+        try:
+            parse_time_slot(date, exception.get("time_slot", recurrence["time_slot"]))
+        except ValueError:
+            return "Invalid date or time slot"
+
+    # An already published occurrence is replaced by the re-expanded one, unless it is booked
+    published = await session_collection.find_one(
+        {"recurrence_id": recurrence["_id"], "occurrence_date": date},
+        {"is_registered": 1, "seats_taken": 1}
+    )
+    if published and (published.get("is_registered") or published.get("seats_taken", 0) > 0):
+        return "Cannot change an occurrence with a registered student"
+    if published:
+        await session_collection.delete_one({"_id": published["_id"], **UNBOOKED})
+
+    result = await recurrence_collection.update_one(
+        {"_id": recurrence["_id"]},
+        {"$set": {f"exceptions.{date}": exception, "updated_at": datetime.utcnow()}}
+    )
+    publish_calendar_change(recurrence["session_type"], date)
+    await bump_versions(SESSIONS)
+    return str(result.matched_count)
+
+async def delete_recurring_availability(recurrence_id, tutor_email):
+    """End a recurring template; booked occurrences stay, unbooked published ones are removed"""
+    try:
+        recurrence = await recurrence_collection.find_one_and_update(
+            {"_id": ObjectId(recurrence_id), "tutor_email": tutor_email, "status": "active"},
+            {"$set": {"status": "cancelled", "updated_at": datetime.utcnow()}}
+        )
+        if not recurrence:
+            return "Recurring availability not found or not owned by this tutor"
+
+        await session_collection.delete_many({"recurrence_id": recurrence["_id"], **UNBOOKED})
+        publish_calendar_change(recurrence["session_type"])
+        await bump_versions(SESSIONS)
+        return "1"
     except:
         return None
 
+def recurrence_occurrence(recurrence, date, ignore_exceptions=False):
+    """Slot fields for the template's occurrence on this date, or None if there is none (or it is skipped)"""
+    try:
+        day = datetime.strptime(date, "%Y-%m-%d")
+    except ValueError:
+        return None
+    if day.weekday() != recurrence["weekday"] or not recurrence["start_date"] <= date <= recurrence["end_date"]:
+        return None
+
+    exception = {} if ignore_exceptions else (recurrence.get("exceptions") or {}).get(date, {})
+    if exception.get("skip"):
+        return None
+
+    time_slot = exception.get("time_slot", recurrence["time_slot"])
+    try:
+        start_at, end_at = parse_time_slot(date, time_slot)
+    except ValueError:
+        return None
+    return {
+        "time_slot": time_slot,
+        "start_at": start_at,
+        "end_at": end_at,
+        "location": exception.get("location", recurrence["location"]),
+        "description": exception.get("description", recurrence.get("description"))
+    }
+
+async def expand_recurring_slots(window, page_end=None, limit=None, tutor_email=None, session_type=None, date=None):
+    """Expand unbooked recurring occurrences that could fall inside a page of slots, in page_key order.
+
+    An occurrence qualifies when it starts inside the date window, after the page cursor and, if the
+    page's concrete slots filled it, no later than the last of them (page_end). Only the first `limit`
+    qualify, since no page holds more.
+    """
+    # Day range to expand over ("YYYY-MM-DD" strings compare in date order)
+    lower_bounds = [bound for bound in (window["start"], window["after"]) if bound]
+    upper_bounds = [bound for bound in (window["end"] and window["end"] - timedelta(microseconds=1), page_end) if bound]
+    first_day = date or (max(lower_bounds).strftime("%Y-%m-%d") if lower_bounds else None)
+    last_day = date or (min(upper_bounds).strftime("%Y-%m-%d") if upper_bounds else None)
+
+    query = {"status": "active"}
+    if first_day:
+        query["end_date"] = {"$gte": first_day}
+    if last_day:
+        query["start_date"] = {"$lte": last_day}
+    if tutor_email:
+        query["tutor_email"] = tutor_email
+    if session_type:
+        query["session_type"] = session_type
+
+    recurrences = await recurrence_collection.find(query).to_list(length=None)
+    if not recurrences:
+        return []
+
+    # Occurrences that were already published (booked or not) are served from session_collection
+    published_query = {"recurrence_id": {"$in": [r["_id"] for r in recurrences]}}
+    day_range = {key: value for key, value in (("$gte", first_day), ("$lte", last_day)) if value}
+    if day_range:
+        published_query["occurrence_date"] = day_range
+    published = {
+        (slot["recurrence_id"], slot["occurrence_date"])
+        async for slot in session_collection.find(published_query, {"recurrence_id": 1, "occurrence_date": 1})
+    }
+
+    after = window["after"] and page_key({"start_at": window["after"], "_id": window["after_id"]})
+    occurrences = []
+    for recurrence in recurrences:
+        day = datetime.strptime(max(first_day or "", recurrence["start_date"]), "%Y-%m-%d")
+        end_day = min(last_day or recurrence["end_date"], recurrence["end_date"])
+        day += timedelta(days=(recurrence["weekday"] - day.weekday()) % 7)
+        expanded = 0
+        # A template's occurrences come out in start order, so it never needs to give more than a page
+        while day.strftime("%Y-%m-%d") <= end_day and (limit is None or expanded < limit):
+            occurrence_date = day.strftime("%Y-%m-%d")
+            day += timedelta(days=7)
+            if (recurrence["_id"], occurrence_date) in published:
+                continue
+            occurrence = recurrence_occurrence(recurrence, occurrence_date)
+            if occurrence is None:
+                continue
+            start_at = occurrence["start_at"]
+            slot_id = occurrence_id(recurrence["_id"], occurrence_date)
+            if (window["start"] and start_at < window["start"]) or (window["end"] and start_at >= window["end"]):
+                continue
+            if (after and page_key({"start_at": start_at, "_id": slot_id}) <= after) or (page_end and start_at > page_end):
+                continue
+            expanded += 1
+            occurrences.append({
+                "_id": slot_id,
+                "tutor_email": recurrence["tutor_email"],
+                "tutor_name": recurrence["tutor_name"],
+                "session_type": recurrence["session_type"],
+                "date": occurrence_date,
+                **occurrence,
+                "capacity": recurrence.get("capacity", 1),
+                "seats_taken": 0,
+                "is_registered": False,
+                "registered_student": None,
+                "status": "active",
+                "recurrence_id": str(recurrence["_id"]),
+                "occurrence_date": occurrence_date
+            })
+    occurrences.sort(key=page_key)
+    return occurrences[:limit]
+
+def merge_occurrences(availabilities, occurrences):
+    """Merge expanded occurrences into a page of concrete slots, keeping page_key order"""
+    if not occurrences:
+        return availabilities
+    return sorted(availabilities + occurrences, key=page_key)
+
+def page_key(availability):
+    """SLOT_ORDER across concrete slots and recurring occurrences: at the same start, concrete slots
+    (ObjectId ids) come first, then occurrences by their "<recurrence_id>:<date>" id"""
+    slot_id = availability["_id"]
+    return availability["start_at"], isinstance(slot_id, str), slot_id
+
+def occurrence_id(recurrence_id, date):
+    return f"{recurrence_id}:{date}"
+
+def is_occurrence_id(availability_id):
+    return ":" in availability_id
+
+def parse_occurrence_id(availability_id):
+    recurrence_id, _, date = availability_id.partition(":")
+    return ObjectId(recurrence_id), date
+
+async def resolve_slot_id(availability_id, materialize=False):
+    """Map an availability id to a slot document _id, publishing a recurring occurrence if asked to"""
+    if not is_occurrence_id(availability_id):
+        return ObjectId(availability_id)
+
+    recurrence_id, date = parse_occurrence_id(availability_id)
+    if not materialize:
+        slot = await session_collection.find_one({"recurrence_id": recurrence_id, "occurrence_date": date}, {"_id": 1})
+        return slot["_id"] if slot else None
+
+    recurrence = await recurrence_collection.find_one({"_id": recurrence_id, "status": "active"})
+    occurrence = recurrence_occurrence(recurrence, date) if recurrence else None
+    if occurrence is None:
+        return None
+
+    availability_data = build_availability(
+        recurrence["tutor_email"], recurrence["tutor_name"], recurrence["session_type"], date,
+        occurrence["time_slot"], occurrence["location"], occurrence["description"], recurrence.get("capacity", 1)
+    )
+    availability_data.update({"recurrence_id": recurrence_id, "occurrence_date": date})
+    try:
+        # Upsert so concurrent claimers of the same occurrence share one slot document
+        slot = await session_collection.find_one_and_update(
+            {"recurrence_id": recurrence_id, "occurrence_date": date},
+            {"$setOnInsert": availability_data},
+            projection={"_id": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        slot = await session_collection.find_one({"recurrence_id": recurrence_id, "occurrence_date": date}, {"_id": 1})
+    return slot["_id"]
+
 # ==================== Student register sessions Functions ====================
     
-def get_student_calendar_view(session_type=None, date=None, student_email=None):
-    """Get calendar view for students - grouped by date/time with multiple tutor options"""
+async def get_student_calendar_view(session_type=None, date=None, student_email=None,
+                                    from_date=None, to_date=None, after=None, limit=None, version=None):
+    """Get one page of the calendar view for students - grouped by date/time with multiple tutor options.
+
+    Returns (calendar_slots, next_cursor), where calendar_slots is an async iterator yielding groups as
+    they are read, so callers can stream them out. Pass the current "sessions" version to reject cache
+    entries built before writes made by other workers."""
+    limit = page_size(limit)
+    key = (session_type, date, from_date, to_date, after, limit)
+    page = calendar_cache.get(key, version)
+    if page is not None:
+        cached_slots, next_cursor = page
+        calendar_slots = iterate(cached_slots)
+    else:
+        try:
+            calendar_slots, next_cursor = await open_calendar_page(session_type, date, from_date, to_date, after, limit)
+        except InvalidPageRequest as e:
+            return str(e)
+        if calendar_cache.enabled:
+            calendar_slots = cache_as_read(calendar_slots, key, next_cursor, version)
+
+    if student_email:
+        # Exclude sessions created by the student themselves (cheap filter over the shared view)
+        calendar_slots = without_tutor(calendar_slots, student_email)
+    return calendar_slots, next_cursor
+
+async def open_calendar_page(session_type=None, date=None, from_date=None, to_date=None, after=None, limit=PAGE_SIZE_MAX):
+    """Start reading one page of open slots grouped by date, time_slot and session_type.
+
+    The grouping runs in Mongo ($match up to the page's last slot and $sort over the slot index, then
+    $group/$push of only the fields the calendar shows). Raises InvalidPageRequest up front, before anything is streamed.
+    """
     query = {"status": "active", "is_registered": False}  # Only show available slots
-    
     if session_type:
         query["session_type"] = session_type
     if date:
         query["date"] = date
-    
-    # Exclude sessions created by the student themselves
-    if student_email:
-        query["tutor_email"] = {"$ne": student_email}
-    
-    availabilities = list(session_collection.find(query))
-    
-    # Group by date, time_slot, and session_type
-    calendar_slots = {}
-    
-    for availability in availabilities:
-        availability["_id"] = str(availability["_id"])
-        availability["id"] = availability["_id"]
-        availability["is_available"] = True  # All in this query are available
-        availability["student_registered"] = None
-        
-        # Create a key for grouping
-        key = f"{availability['date']}_{availability['time_slot']}_{availability['session_type']}"
-        
-        if key not in calendar_slots:
-            calendar_slots[key] = {
-                "date": availability["date"],
-                "time_slot": availability["time_slot"],
-                "session_type": availability["session_type"],
-                "available_tutors": []
-            }
-        
-        calendar_slots[key]["available_tutors"].append(availability)
-    
-    return list(calendar_slots.values())
+    window = apply_slot_window(query, from_date, to_date, after)
+
+    # The first `limit` slots, concrete or unbooked recurring occurrences, make the page. Its last slot gives
+    # the cursor and bounds the aggregation, so slots created or taken in between can't push a slot out of
+    # every page or repeat one
+    slots = await session_collection.find(query, {"start_at": 1}).sort(SLOT_ORDER).limit(limit).to_list(length=limit)
+    occurrences = await expand_recurring_slots(
+        window, page_end=slots[-1]["start_at"] if len(slots) == limit else None,
+        limit=limit, session_type=session_type, date=date
+    )
+    page = merge_occurrences(slots, occurrences)
+    last = page[limit - 1] if len(page) >= limit else None
+    next_cursor = slot_cursor(last) if last else None
+    if last:
+        occurrences = [availability for availability in occurrences if page_key(availability) <= page_key(last)]
+
+    occurrence_groups = {}
+    for availability in occurrences:
+        group_key = (availability["start_at"], availability["time_slot"], availability["session_type"])
+        occurrence_groups.setdefault(group_key, {
+            "date": availability["date"],
+            "time_slot": availability["time_slot"],
+            "session_type": availability["session_type"],
+            "available_tutors": []
+        })["available_tutors"].append(calendar_tutor(availability))
+
+    cursor = session_collection.aggregate([
+        {"$match": {"$and": [query, through_slot(last)]} if last else query},
+        {"$sort": dict(SLOT_ORDER)},
+        {"$group": {
+            "_id": {"date": "$date", "time_slot": "$time_slot", "session_type": "$session_type"},
+            "start_at": {"$min": "$start_at"},
+            "available_tutors": {"$push": CALENDAR_TUTOR_FIELDS}
+        }},
+        {"$sort": {"start_at": 1, "_id.time_slot": 1, "_id.session_type": 1}}
+    ])
+    return merge_calendar_groups(cursor, sorted(occurrence_groups.items())), next_cursor
+
+# Same fields and order as calendar_tutor(), computed by the $group stage
+CALENDAR_TUTOR_FIELDS = {
+    "id": {"$toString": "$_id"},
+    "tutor_email": "$tutor_email",
+    "tutor_name": "$tutor_name",
+    "session_type": "$session_type",
+    "date": "$date",
+    "time_slot": "$time_slot",
+    "location": "$location",
+    "description": {"$ifNull": ["$description", None]},
+    "is_available": {"$literal": True},
+    "student_registered": {"$literal": None},
+    "status": "$status",
+    "capacity": {"$ifNull": ["$capacity", 1]},
+    "seats_remaining": {"$subtract": [{"$ifNull": ["$capacity", 1]}, {"$ifNull": ["$seats_taken", 0]}]}
+}
+
+async def merge_calendar_groups(cursor, occurrence_groups):
+    """Yield aggregated slot groups in (start, time_slot, session_type) order, folding in the sorted
+    (key, group) pairs of recurring occurrences"""
+    pending = iter(occurrence_groups)
+    occurrence = next(pending, None)
+    async for group in cursor:
+        group_key = (group["start_at"], group["_id"]["time_slot"], group["_id"]["session_type"])
+        while occurrence and occurrence[0] < group_key:
+            yield occurrence[1]
+            occurrence = next(pending, None)
+        tutors = group["available_tutors"]
+        if occurrence and occurrence[0] == group_key:
+            tutors += occurrence[1]["available_tutors"]
+            occurrence = next(pending, None)
+        yield {
+            "date": group["_id"]["date"],
+            "time_slot": group["_id"]["time_slot"],
+            "session_type": group["_id"]["session_type"],
+            "available_tutors": tutors
+        }
+    while occurrence:
+        yield occurrence[1]
+        occurrence = next(pending, None)
+
+async def cache_as_read(calendar_slots, key, next_cursor, version):
+    """Pass groups through, caching the page once it has been read completely"""
+    page = []
+    async for slot in calendar_slots:
+        page.append(slot)
+        yield slot
+    calendar_cache.set(key, (page, next_cursor), version)
+
+async def without_tutor(calendar_slots, tutor_email):
+    async for slot in calendar_slots:
+        tutors = [t for t in slot["available_tutors"] if t["tutor_email"] != tutor_email]
+        if tutors:
+            yield {**slot, "available_tutors": tutors}
+
+async def iterate(items):
+    for item in items:
+        yield item
 
-def register_student_for_tutor_slot(student_email, availability_id):
+def calendar_tutor(availability):
+    """Shape an open slot exactly like TutorAvailabilityResponse (same fields, same order), so the
+    calendar can be serialized directly without another validation pass"""
+    return {
+        "id": str(availability["_id"]),
+        "tutor_email": availability["tutor_email"],
+        "tutor_name": availability["tutor_name"],
+        "session_type": availability["session_type"],
+        "date": availability["date"],
+        "time_slot": availability["time_slot"],
+        "location": availability["location"],
+        "description": availability.get("description"),
+        "is_available": True,  # All in this query are available
+        "student_registered": None,
+        "status": availability["status"],
+        "capacity": availability.get("capacity", 1),
+        "seats_remaining": seats_remaining(availability)
+    }
+
+def seats_remaining(availability):
+    if availability.get("is_registered"):
+        return 0
+    return availability.get("capacity", 1) - availability.get("seats_taken", 0)
+
+class RegistrationAborted(Exception):
+    """Raised inside a registration transaction to abort it with a user-facing reason"""
+
+async def register_student_for_tutor_slot(student_email, availability_id):
     """Register a student for a specific tutor's availability slot"""
     try:
-        # Check if availability slot exists and is active
-        availability = session_collection.find_one({"_id": ObjectId(availability_id)})
+        # A recurring occurrence becomes a real slot document the first time someone claims it
+        slot_id = await resolve_slot_id(availability_id, materialize=True)
+        if slot_id is None:
+            return "Availability slot not found"
+        claimed = {}
+
+        async def claim(session):
+            now = datetime.utcnow()
+            availability = await take_seat(slot_id, student_email, session)
+            if availability is None:
+                return None
+            claimed["availability"] = availability
+
+            # A group session has other seats left, so holding one already is not caught by the claim
+            if availability.get("capacity", 1) > 1 and await registration_collection.find_one(
+                {"session_id": slot_id, "student_email": student_email, "status": "registered"},
+                {"_id": 1}, session=session
+            ):
+                raise RegistrationAborted("Already registered for this tutor slot")
+
+            start_at, end_at = slot_times(availability)
+
+            # Check for time conflicts (same student can't book overlapping sessions)
+            if await check_time_conflict(student_email, start_at, end_at, session=session):
+                raise RegistrationAborted("Time conflict with existing registration")
+
+            # Create registration (with a denormalized copy of the slot times for conflict checks)
+            registration_data = {
+                "student_email": student_email,
+                "session_id": slot_id,
+                "start_at": start_at,
+                "end_at": end_at,
+                "registration_time": now,
+                "status": "registered",
+                "created_at": now,
+                "updated_at": now
+            }
+            result = await registration_collection.insert_one(registration_data, session=session)
+            await add_to_schedule(student_email, result.inserted_id, now, availability, session)
+            return str(result.inserted_id)
+
+        # Slot claim and registration insert commit together (retried on transient errors)
+        async with await client.start_session() as session:
+            registration_id = await session.with_transaction(claim)
+
+        if registration_id is not None:
+            availability = claimed["availability"]
+            publish_slot_change("slot-taken" if availability["is_registered"] else "seats-changed", availability)
+            await bump_versions(SESSIONS, REGISTRATIONS)
+            return registration_id
+
+        # The claim did not match; work out why (only on the failure path)
+        availability = await session_collection.find_one({"_id": slot_id})
         if not availability:
             return "Availability slot not found"
         
@@ -279,165 +998,678 @@ def register_student_for_tutor_slot(student_email, availability_id):
         if student_email == availability.get("tutor_email"):
             return "You cannot register for your own session"
         
-        # Check if slot is already registered (one-on-one)
-        if availability.get("is_registered", True):
-            return "This tutor slot is already taken"
-        
-        # Check if student is already registered for this specific slot
-        existing_registration = registration_collection.find_one({
-            "student_email": student_email,
-            "session_id": ObjectId(availability_id),
-            "status": "registered"
-        })
-        
-        if existing_registration:
+        # Check if student already holds a seat in this specific slot
+        if await registration_collection.find_one(
+            {"session_id": slot_id, "student_email": student_email, "status": "registered"}, {"_id": 1}
+        ):
             return "Already registered for this tutor slot"
         
-        # Check for time conflicts (same student can't book multiple sessions at same time)
-        if check_time_conflict(student_email, availability["date"], availability["time_slot"]):
-            return "Time conflict with existing registration"
-        
-        # Create registration
-        registration_data = {
-            "student_email": student_email,
-            "session_id": ObjectId(availability_id),
-            "registration_time": datetime.utcnow(),
-            "status": "registered",
-            "created_at": datetime.utcnow(),
-            "updated_at": datetime.utcnow()
-        }
-        
-        result = registration_collection.insert_one(registration_data)
-        
-        # Update availability slot registration status
-        session_collection.update_one(
-            {"_id": ObjectId(availability_id)},
-            {"$set": {
-                "is_registered": True,
-                "registered_student": student_email
-            }}
-        )
-        
-        return str(result.inserted_id)
-    
+        # Every seat is taken
+        return "This tutor slot is already taken"
+
+    except RegistrationAborted as e:
+        return str(e)
+    except DuplicateKeyError:
+        # The same student's concurrent request got the seat first (unique active registration per student)
+        return "Already registered for this tutor slot"
     except Exception as e:
         return None
 
-def cancel_student_registration_for_tutor_slot(student_email, availability_id):
+async def cancel_student_registration_for_tutor_slot(student_email, availability_id):
     """Cancel a student's registration for a specific tutor slot"""
     try:
-        # Find and update the registration
-        result = registration_collection.update_one(
-            {
+        slot_id = await resolve_slot_id(availability_id)
+        if slot_id is None:
+            return None
+
+        async def cancel(session):
+            # Find and update the registration
+            result = await registration_collection.update_one(
+                {
+                    "student_email": student_email,
+                    "session_id": slot_id,
+                    "status": "registered"
+                },
+                {
+                    "$set": {
+                        "status": "cancelled",
+                        "updated_at": datetime.utcnow()
+                    }
+                },
+                session=session
+            )
+            
+            if result.modified_count > 0:
+                await remove_from_schedule(student_email, slot_id, session)
+                availability = await release_seat(slot_id, student_email, session)
+
+                # Hand the seat straight to the head of the waitlist; the slot never shows as free in between
+                if await promote_waitlist(slot_id, session):
+                    return str(result.modified_count), None
+                return str(result.modified_count), availability
+
+            # Not registered; the student may be leaving the waitlist instead
+            result = await registration_collection.update_one(
+                {
+                    "student_email": student_email,
+                    "session_id": slot_id,
+                    "status": "waitlisted"
+                },
+                {"$set": {"status": "cancelled", "updated_at": datetime.utcnow()}},
+                session=session
+            )
+            if result.modified_count > 0:
+                return str(result.modified_count), None
+
+            return None, None
+
+        async with await client.start_session() as session:
+            modified_count, availability = await session.with_transaction(cancel)
+
+        if availability:
+            publish_slot_change("slot-freed" if seats_remaining(availability) == 1 else "seats-changed", availability)
+        if modified_count:
+            await bump_versions(SESSIONS, REGISTRATIONS)
+        return modified_count
+    except:
+        return None
+
+
+# ==================== Waitlist Functions ====================
+
+async def join_waitlist(student_email, availability_id):
+    """Queue a student for a taken slot; returns their position (0 if the slot was free and they got it)"""
+    try:
+        slot_id = await resolve_slot_id(availability_id)
+        if slot_id is None:
+            return "Availability slot not found"
+        availability = await session_collection.find_one(
+            {"_id": slot_id},
+            {"status": 1, "is_registered": 1, "date": 1, "time_slot": 1, "start_at": 1, "end_at": 1}
+        )
+        if not availability:
+            return "Availability slot not found"
+        if availability["status"] != "active":
+            return "Availability slot is not active"
+
+        start_at, end_at = slot_times(availability)
+        now = datetime.utcnow()
+        try:
+            await registration_collection.insert_one({
                 "student_email": student_email,
-                "session_id": ObjectId(availability_id),
-                "status": "registered"
-            },
-            {
-                "$set": {
-                    "status": "cancelled",
-                    "updated_at": datetime.utcnow()
-                }
-            }
+                "session_id": slot_id,
+                "start_at": start_at,
+                "end_at": end_at,
+                "status": "waitlisted",
+                "created_at": now,
+                "updated_at": now
+            })
+            await bump_versions(REGISTRATIONS)
+        except DuplicateKeyError:
+            pass  # Already queued; report the existing position
+
+        promoted = None
+        if not availability["is_registered"]:
+            # The slot was freed between the failed claim and the enqueue; serve the queue now
+            async with await client.start_session() as session:
+                promoted = await session.with_transaction(lambda session: promote_waitlist(slot_id, session))
+            if promoted:
+                publish_slot_change("slot-taken" if promoted["is_registered"] else "seats-changed", promoted)
+                await bump_versions(SESSIONS, REGISTRATIONS)
+
+        position = await get_waitlist_position(student_email, availability_id)
+        if position != "Not on the waitlist":
+            return position
+        if promoted and promoted["registered_student"] == student_email:
+            return 0
+        # Dropped from the queue straight away because of a clashing booking
+        return "Time conflict with existing registration"
+    except Exception as e:
+        return None
+
+async def get_waitlist_position(student_email, availability_id):
+    """1-based place of a student in a slot's waitlist, counted over the (session_id, status, _id) index"""
+    try:
+        slot_id = await resolve_slot_id(availability_id)
+    except InvalidId:
+        return "Not on the waitlist"
+    if slot_id is None:
+        return "Not on the waitlist"
+    entry = await registration_collection.find_one(
+        {"session_id": slot_id, "student_email": student_email, "status": "waitlisted"},
+        {"_id": 1}
+    )
+    if not entry:
+        return "Not on the waitlist"
+    ahead = await registration_collection.count_documents(
+        {"session_id": slot_id, "status": "waitlisted", "_id": {"$lt": entry["_id"]}}
+    )
+    return ahead + 1
+
+async def promote_waitlist(slot_id, session):
+    """Give a free seat to the first waiting student without a clashing booking, inside the caller's transaction.
+
+    Returns the slot document after promotion, or None if nobody could take the seat.
+    """
+    while True:
+        entry = await registration_collection.find_one(
+            {"session_id": slot_id, "status": "waitlisted"},
+            sort=[("_id", 1)],
+            session=session
         )
-        
-        if result.modified_count > 0:
-            # Free up the tutor slot (make it available again)
-            session_collection.update_one(
-                {"_id": ObjectId(availability_id)},
-                {"$set": {
-                    "is_registered": False,
-                    "registered_student": None
-                }}
+        if entry is None:
+            return None
+        now = datetime.utcnow()
+        if await check_time_conflict(entry["student_email"], entry["start_at"], entry["end_at"], session=session):
+            # Booked something else at that time since queueing; drop them and try the next in line
+            await registration_collection.update_one(
+                {"_id": entry["_id"]},
+                {"$set": {"status": "waitlist_skipped", "updated_at": now}},
+                session=session
             )
-            return str(result.modified_count)
-        
-        return None
-    except:
+            continue
+
+        availability = await take_seat(slot_id, entry["student_email"], session)
+        if availability is None:
+            return None
+        await registration_collection.update_one(
+            {"_id": entry["_id"]},
+            {"$set": {"status": "registered", "registration_time": now, "updated_at": now}},
+            session=session
+        )
+        await add_to_schedule(entry["student_email"], entry["_id"], now, availability, session)
+        return availability
+
+
+# ==================== Seat Functions ====================
+
+async def take_seat(slot_id, student_email, session):
+    """Take one seat in a slot, inside the caller's transaction; returns the slot after the claim, or None.
+
+    The $inc is guarded by seats_taken < capacity in the same update, so concurrent claimers can never
+    overfill a slot, and the seat count is read without counting registrations.
+    """
+    now = datetime.utcnow()
+    availability = await session_collection.find_one_and_update(
+        {
+            "_id": slot_id,
+            "status": "active",
+            "is_registered": False,
+            "tutor_email": {"$ne": student_email},
+            "$expr": {"$lt": [{"$ifNull": ["$seats_taken", 0]}, {"$ifNull": ["$capacity", 1]}]}
+        },
+        {"$inc": {"seats_taken": 1}, "$set": {"updated_at": now}},
+        return_document=ReturnDocument.AFTER,
+        session=session
+    )
+    if availability is None:
         return None
 
+    capacity = availability.get("capacity", 1)
+    seat_fields = {}
+    if availability["seats_taken"] >= capacity:
+        seat_fields["is_registered"] = True  # Full: drops out of the open-slot calendar
+    if capacity == 1:
+        seat_fields["registered_student"] = student_email
+    if seat_fields:
+        await session_collection.update_one({"_id": slot_id}, {"$set": seat_fields}, session=session)
+        availability.update(seat_fields)
+    return availability
+
+async def release_seat(slot_id, student_email, session):
+    """Give back one seat, inside the caller's transaction; returns the slot after the release"""
+    now = datetime.utcnow()
+    availability = await session_collection.find_one_and_update(
+        {"_id": slot_id, "seats_taken": {"$gt": 0}},
+        {"$inc": {"seats_taken": -1}, "$set": {"is_registered": False, "updated_at": now}},
+        return_document=ReturnDocument.AFTER,
+        session=session
+    )
+    if availability is None:
+        # Slot booked before seat counters existed
+        return await session_collection.find_one_and_update(
+            {"_id": slot_id},
+            {"$set": {"is_registered": False, "registered_student": None, "updated_at": now}},
+            return_document=ReturnDocument.AFTER,
+            session=session
+        )
+    if availability.get("registered_student") == student_email:
+        await session_collection.update_one({"_id": slot_id}, {"$set": {"registered_student": None}}, session=session)
+        availability["registered_student"] = None
+    return availability
+
+
+# ==================== Calendar Change Notification Functions ====================
+
+def publish_slot_change(event_type, availability):
+    """Drop cached calendar pages for a written slot and push the change to live calendar streams"""
+    session_type = availability.get("session_type")
+    date = availability.get("date")
+    calendar_cache.invalidate(session_type, date)
+    recurrence_id = availability.get("recurrence_id")
+    calendar_events.publish(event_type, session_type, date, {
+        "id": str(availability["_id"]),
+        # Open calendars list a not-yet-booked recurring slot under its virtual id, so they match on this too
+        "occurrence_id": occurrence_id(recurrence_id, availability.get("occurrence_date")) if recurrence_id else None,
+        "tutor_email": availability.get("tutor_email"),
+        "tutor_name": availability.get("tutor_name"),
+        "session_type": session_type,
+        "date": date,
+        "time_slot": availability.get("time_slot"),
+        "location": availability.get("location"),
+        "description": availability.get("description"),
+        "is_available": event_type in ("slot-created", "slot-freed", "seats-changed"),
+        "student_registered": None,
+        "status": availability.get("status", "active"),
+        "capacity": availability.get("capacity", 1),
+        "seats_remaining": seats_remaining(availability)
+    })
+
+def publish_calendar_change(session_type, date=None):
+    """Signal a change that affects many slots at once (recurring templates); clients should refetch"""
+    calendar_cache.invalidate(session_type, date)
+    calendar_events.publish("calendar-changed", session_type, date, {"session_type": session_type, "date": date})
+
 
 # ==================== Session Registration Helper Functions ====================
 
-def check_time_conflict(student_email, date, time_slot):
-    """Check if student has a time conflict with existing registrations"""
-    # Get all active registrations for the student
-    registrations = list(registration_collection.find({
-        "student_email": student_email,
-        "status": "registered"
-    }))
-    
-    for reg in registrations:
-        # Get session details for each registration
-        session = session_collection.find_one({"_id": reg["session_id"]})
-        if session and session["date"] == date and session["time_slot"] == time_slot:
-            return True  # Conflict found
-    
-    return False  # No conflict
+def parse_time_slot(date, time_slot):
+    """Parse a "YYYY-MM-DD" date and "HH:MM-HH:MM" time slot into (start_at, end_at) datetimes"""
+    start, end = (part.strip() for part in time_slot.split("-"))
+    start_at = datetime.strptime(f"{date} {start}", "%Y-%m-%d %H:%M")
+    end_at = datetime.strptime(f"{date} {end}", "%Y-%m-%d %H:%M")
+    if end_at <= start_at:
+        raise ValueError(f"Time slot must end after it starts: {time_slot}")
+    return start_at, end_at
+
+def slot_times(availability):
+    """(start_at, end_at) of a slot; slots created before those fields existed are parsed on the fly"""
+    start_at = availability.get("start_at")
+    end_at = availability.get("end_at")
+    if start_at is None or end_at is None:
+        start_at, end_at = parse_time_slot(availability["date"], availability["time_slot"])
+    return start_at, end_at
 
-def get_student_registrations(student_email):
-    """Get active registrations for a student"""
-    # Only get registrations with "registered" status
-    registrations = list(registration_collection.find({
+async def check_time_conflict(student_email, start_at, end_at, session=None):
+    """Check if student has an active registration overlapping [start_at, end_at)"""
+    # Two intervals overlap when each one starts before the other ends
+    conflict = await registration_collection.find_one({
         "student_email": student_email,
-        "status": "registered"
-    }))
-    
-    result = []
-    for reg in registrations:
+        "status": "registered",
+        "start_at": {"$lt": end_at},
+        "end_at": {"$gt": start_at}
+    }, {"_id": 1}, session=session)
+
+    return conflict is not None
+
+# ==================== Student Schedule Functions ====================
+# /my-sessions reads one schedule document per student (_id = student email) holding a snapshot of each
+# active registration's slot and tutor. Registration writes keep it current inside their transactions;
+# a student without a document yet gets one built from the source collections on first read.
+# `python -m app.schedules verify|rebuild` reconciles the documents against the source collections.
+
+TUTOR_PROFILE_PROJECTION = {"_id": 0, "profile.preferred_name": 1, "profile.study_year": 1}
+
+async def get_student_registrations(student_email, limit=None, before=None):
+    """Get active registrations for a student (newest first) from their schedule document"""
+    if before:
         try:
-            # Get session details (tutor availability)
-            session = session_collection.find_one({"_id": reg["session_id"]})
-            if not session:
-                continue
-            
-            # Get tutor email safely
-            tutor_email = session.get("tutor_email")
-            
-            reg_data = {
-                "registration_id": str(reg["_id"]),
-                "availability_id": str(reg["session_id"]),  # This is actually availability_id in the new system
-                "student_email": reg["student_email"],
-                "registration_time": reg["registration_time"].isoformat() if isinstance(reg["registration_time"], datetime) else str(reg["registration_time"]),
-                "status": reg["status"],
-                "session_details": {
-                    "session_type": session.get("session_type", ""),
-                    "tutor_name": session.get("tutor_name", ""),
-                    "tutor_email": tutor_email if tutor_email else "",
-                    "date": session.get("date", ""),
-                    "time_slot": session.get("time_slot", ""),
-                    "location": session.get("location", ""),
-                    "description": session.get("description", "")
-                }
-            }
-            
-            # Add tutor profile information - wrapped in try-catch to prevent errors
-            try:
-                if tutor_email:
-                    tutor_user = user_collection.find_one({"email": tutor_email})
-                    if tutor_user and "profile" in tutor_user:
-                        reg_data["tutor_profile"] = {
-                            "email": tutor_email,
-                            "preferred_name": tutor_user["profile"].get("preferred_name"),
-                            "study_year": tutor_user["profile"].get("study_year")
-                        }
-                    else:
-                        # If no profile, just provide email
-                        reg_data["tutor_profile"] = {
-                            "email": tutor_email,
-                            "preferred_name": None,
-                            "study_year": None
-                        }
-                else:
-                    reg_data["tutor_profile"] = None
-            except Exception as e:
-                # If getting profile fails, just set it to None
-                reg_data["tutor_profile"] = None
-            
-            result.append(reg_data)
-        except Exception as e:
-            # If there's any error processing this registration, skip it and continue
-            print(f"Error processing registration {reg.get('_id')}: {e}")
+            before = ObjectId(before)
+        except Exception:
+            return "Invalid cursor"
+
+    schedule = await schedule_collection.find_one({"_id": student_email}, {"entries": 1})
+    if schedule is None:
+        entries = await build_schedule_entries(student_email)
+        try:
+            # Only fill a missing document; a registration committed meanwhile already wrote a fresher one
+            await schedule_collection.update_one(
+                {"_id": student_email},
+                {"$setOnInsert": {"entries": entries, "updated_at": datetime.utcnow()}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            pass
+    else:
+        entries = schedule["entries"]
+
+    result = []
+    for entry in entries:
+        if before and entry["registration_id"] >= before:
             continue
-    
-    return result
\ No newline at end of file
+        registration_time = entry["registration_time"]
+        result.append({
+            "registration_id": str(entry["registration_id"]),
+            "availability_id": str(entry["availability_id"]),  # This is actually availability_id in the new system
+            "student_email": student_email,
+            "registration_time": registration_time.isoformat() if isinstance(registration_time, datetime) else str(registration_time),
+            "status": "registered",
+            "session_details": entry["session_details"],
+            "tutor_profile": entry["tutor_profile"]
+        })
+        if limit and len(result) == limit:
+            break
+    return result
+
+def schedule_entry(registration_id, registration_time, availability, tutor):
+    """One schedule entry: a registration with snapshots of its slot and the tutor's profile"""
+    tutor_email = availability.get("tutor_email")
+    return {
+        "registration_id": registration_id,
+        "availability_id": availability["_id"],
+        "registration_time": registration_time,
+        "session_details": {
+            "session_type": availability.get("session_type", ""),
+            "tutor_name": availability.get("tutor_name", ""),
+            "tutor_email": tutor_email if tutor_email else "",
+            "date": availability.get("date", ""),
+            "time_slot": availability.get("time_slot", ""),
+            "location": availability.get("location", ""),
+            "description": availability.get("description", "")
+        },
+        "tutor_profile": schedule_tutor_profile(tutor_email, (tutor or {}).get("profile")) if tutor_email else None
+    }
+
+def schedule_tutor_profile(tutor_email, profile):
+    profile = profile or {}
+    return {
+        "email": tutor_email,
+        "preferred_name": profile.get("preferred_name"),
+        "study_year": profile.get("study_year")
+    }
+
+async def build_schedule_entries(student_email, session=None):
+    """A student's schedule entries computed from the source collections, newest registration first"""
+    pipeline = [
+        {"$match": {"student_email": student_email, "status": "registered"}},
+        {"$sort": {"_id": -1}},
+        # Registrations without a session are dropped
+        {"$lookup": {
+            "from": session_collection.name,
+            "localField": "session_id",
+            "foreignField": "_id",
+            "as": "session"
+        }},
+        {"$unwind": "$session"},
+        # Get only the tutor profile fields we keep, never the whole user document
+        {"$lookup": {
+            "from": user_collection.name,
+            "localField": "session.tutor_email",
+            "foreignField": "email",
+            "pipeline": [{"$project": TUTOR_PROFILE_PROJECTION}],
+            "as": "tutor"
+        }},
+        {"$project": {
+            "registration_time": 1,
+            "session": 1,
+            "tutor": {"$arrayElemAt": ["$tutor", 0]}
+        }}
+    ]
+    return [
+        schedule_entry(registration["_id"], registration["registration_time"], registration["session"], registration.get("tutor"))
+        async for registration in registration_collection.aggregate(pipeline, session=session)
+    ]
+
+async def add_to_schedule(student_email, registration_id, registration_time, availability, session):
+    """Add a new registration to the student's schedule, inside the registering transaction"""
+    tutor = await user_collection.find_one(
+        {"email": availability.get("tutor_email")}, TUTOR_PROFILE_PROJECTION, session=session
+    )
+    entry = schedule_entry(registration_id, registration_time, availability, tutor)
+    result = await schedule_collection.update_one(
+        {"_id": student_email},
+        {
+            "$push": {"entries": {"$each": [entry], "$sort": {"registration_id": -1}}},
+            "$set": {"updated_at": datetime.utcnow()}
+        },
+        session=session
+    )
+    if result.matched_count == 0:
+        # First write for this student: build the whole document; the transaction already sees the new registration
+        await schedule_collection.insert_one(
+            {"_id": student_email, "entries": await build_schedule_entries(student_email, session), "updated_at": datetime.utcnow()},
+            session=session
+        )
+
+async def remove_from_schedule(student_email, slot_id, session):
+    """Drop a cancelled registration from the student's schedule, inside the cancelling transaction"""
+    await schedule_collection.update_one(
+        {"_id": student_email},
+        {"$pull": {"entries": {"availability_id": slot_id}}, "$set": {"updated_at": datetime.utcnow()}},
+        session=session
+    )
+
+async def refresh_tutor_in_schedules(tutor_email):
+    """Rewrite the tutor profile snapshot in every schedule that holds one of this tutor's sessions"""
+    tutor = await user_collection.find_one({"email": tutor_email}, TUTOR_PROFILE_PROJECTION)
+    await schedule_collection.bulk_write([tutor_schedule_refresh(tutor_email, (tutor or {}).get("profile"))])
+
+def tutor_schedule_refresh(tutor_email, profile):
+    """UpdateMany setting a tutor's profile snapshot in every schedule entry for their sessions"""
+    return UpdateMany(
+        {"entries.session_details.tutor_email": tutor_email},
+        {"$set": {"entries.$[entry].tutor_profile": schedule_tutor_profile(tutor_email, profile)}},
+        array_filters=[{"entry.session_details.tutor_email": tutor_email}]
+    )
+
+def slot_schedule_refresh(availability):
+    """UpdateMany setting a slot's snapshot in the schedule of every student registered for it"""
+    return UpdateMany(
+        {"entries.session_details.tutor_email": availability["tutor_email"], "entries.availability_id": availability["_id"]},
+        {"$set": {
+            f"entries.$[entry].session_details.{field}": availability.get(field, "")
+            for field in ("session_type", "tutor_name", "date", "time_slot", "location", "description")
+        }},
+        array_filters=[{"entry.availability_id": availability["_id"]}]
+    )
+
+async def reconcile_student_schedule(student_email, repair=False):
+    """Compare a stored schedule with the source collections; with repair, replace it when they differ.
+
+    Returns "ok", "missing" (no stored document yet), "mismatch" or "repaired".
+    """
+    async def reconcile(session):
+        entries = await build_schedule_entries(student_email, session)
+        schedule = await schedule_collection.find_one({"_id": student_email}, {"entries": 1}, session=session)
+        if schedule is not None and schedule["entries"] == entries:
+            return "ok"
+        if not repair:
+            return "missing" if schedule is None else "mismatch"
+        await schedule_collection.replace_one(
+            {"_id": student_email},
+            {"entries": entries, "updated_at": datetime.utcnow()},
+            upsert=True,
+            session=session
+        )
+        return "repaired"
+
+    # One snapshot for the source read and the write, so a concurrent registration conflicts and retries
+    async with await client.start_session() as session:
+        return await session.with_transaction(reconcile)
+
+
+# ==================== Export Functions ====================
+# Admin exports read through one batched cursor and yield flat rows, so memory stays constant
+# however many rows match.
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+REGISTRATION_EXPORT_FIELDS = [
+    "registration_id", "status", "registration_time",
+    "student_email", "student_name", "student_preferred_name", "student_sid", "student_study_year", "student_major",
+    "availability_id", "session_type", "date", "time_slot", "location",
+    "tutor_email", "tutor_name",
+]
+
+AVAILABILITY_EXPORT_FIELDS = [
+    "availability_id", "status", "session_type", "date", "time_slot", "location",
+    "tutor_email", "tutor_name", "capacity", "seats_taken", "registered_student", "created_at",
+]
+
+async def export_registrations(from_date=None, to_date=None, session_type=None, status="registered"):
+    """Registrations in start order joined to their slot and student profile, as an async iterator of rows.
+
+    status=None exports every status. Returns "Invalid date window" for a malformed date range.
+    """
+    match = {"status": status} if status else {}
+    try:
+        apply_slot_window(match, from_date, to_date)
+    except InvalidPageRequest as e:
+        return str(e)
+
+    pipeline = [
+        {"$match": match},
+        {"$sort": {"start_at": 1, "_id": 1}},
+        {"$lookup": {
+            "from": session_collection.name,
+            "localField": "session_id",
+            "foreignField": "_id",
+            "pipeline": [{"$project": {
+                "session_type": 1, "date": 1, "time_slot": 1, "location": 1, "tutor_email": 1, "tutor_name": 1
+            }}],
+            "as": "session"
+        }},
+        {"$unwind": "$session"}
+    ]
+    if session_type:
+        pipeline.append({"$match": {"session.session_type": session_type}})
+    pipeline += [
+        {"$lookup": {
+            "from": user_collection.name,
+            "localField": "student_email",
+            "foreignField": "email",
+            "pipeline": [{"$project": {"_id": 0, "profile": 1}}],
+            "as": "student"
+        }},
+        {"$unwind": {"path": "$student", "preserveNullAndEmptyArrays": True}},
+        {"$project": {
+            "registration_id": "$_id",
+            "status": 1,
+            "registration_time": 1,
+            "student_email": 1,
+            "student_name": "$student.profile.full_name",
+            "student_preferred_name": "$student.profile.preferred_name",
+            "student_sid": "$student.profile.SID",
+            "student_study_year": "$student.profile.study_year",
+            "student_major": "$student.profile.major",
+            "availability_id": "$session_id",
+            "session_type": "$session.session_type",
+            "date": "$session.date",
+            "time_slot": "$session.time_slot",
+            "location": "$session.location",
+            "tutor_email": "$session.tutor_email",
+            "tutor_name": "$session.tutor_name"
+        }}
+    ]
+    cursor = registration_collection.aggregate(pipeline, allowDiskUse=True, batchSize=EXPORT_BATCH_SIZE)
+    return export_rows(cursor, REGISTRATION_EXPORT_FIELDS)
+
+async def export_availability(from_date=None, to_date=None, session_type=None, status="active"):
+    """Published slots in start order, as an async iterator of rows. Recurring occurrences nobody has
+    booked are not stored, so they are not exported. status=None exports every status."""
+    query = {"status": status} if status else {}
+    if session_type:
+        query["session_type"] = session_type
+    try:
+        apply_slot_window(query, from_date, to_date)
+    except InvalidPageRequest as e:
+        return str(e)
+
+    cursor = session_collection.find(
+        query,
+        {"status": 1, "session_type": 1, "date": 1, "time_slot": 1, "location": 1, "tutor_email": 1,
+         "tutor_name": 1, "capacity": 1, "seats_taken": 1, "registered_student": 1, "created_at": 1},
+        batch_size=EXPORT_BATCH_SIZE,
+        allow_disk_use=True
+    ).sort(SLOT_ORDER)
+    return export_rows(cursor, AVAILABILITY_EXPORT_FIELDS, id_field="availability_id")
+
+async def export_rows(cursor, fields, id_field=None):
+    """Flatten documents into rows with exactly `fields`, ids and datetimes as strings"""
+    async for document in cursor:
+        if id_field:
+            document[id_field] = document["_id"]
+        row = {}
+        for field in fields:
+            value = document.get(field)
+            if isinstance(value, ObjectId):
+                value = str(value)
+            elif isinstance(value, datetime):
+                value = value.isoformat()
+            row[field] = value
+        yield row
+
+
+# ==================== Pagination Helper Functions ====================
+
+# Slots are paged in (start_at, _id) order so the keyset cursor is stable under inserts
+SLOT_ORDER = [("start_at", 1), ("_id", 1)]
+
+class InvalidPageRequest(Exception):
+    """Raised for a malformed cursor or date window"""
+
+def page_size(limit):
+    """Clamp a requested page size to PAGE_SIZE_MAX (which is also the default)"""
+    return min(limit or PAGE_SIZE_MAX, PAGE_SIZE_MAX)
+
+def encode_cursor(*parts):
+    """Pack cursor fields into an opaque URL-safe token"""
+    return base64.urlsafe_b64encode("|".join(parts).encode()).decode()
+
+def decode_cursor(cursor):
+    return base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+
+def slot_cursor(availability):
+    """Cursor pointing just past this slot in SLOT_ORDER"""
+    return encode_cursor(availability["start_at"].isoformat(), str(availability["_id"]))
+
+def through_slot(availability):
+    """Filter for slots up to and including this one (a slot or a recurring occurrence) in page_key order"""
+    if isinstance(availability["_id"], str):
+        return {"start_at": {"$lte": availability["start_at"]}}
+    return {"$or": [
+        {"start_at": {"$lt": availability["start_at"]}},
+        {"start_at": availability["start_at"], "_id": {"$lte": availability["_id"]}}
+    ]}
+
+def apply_slot_window(query, from_date=None, to_date=None, after=None):
+    """Restrict a slot query to an inclusive "YYYY-MM-DD" date window and to slots after a cursor.
+
+    Returns the bounds as {"start" (inclusive), "end" (exclusive), "after" (exclusive)} datetimes or None,
+    plus the cursor's slot id as "after_id" (an ObjectId, or a recurring occurrence id string), so
+    recurring occurrences can be expanded over the same window.
+    """
+    window = {"start": None, "end": None, "after": None, "after_id": None}
+    start_range = {}
+    try:
+        if from_date:
+            window["start"] = start_range["$gte"] = datetime.strptime(from_date, "%Y-%m-%d")
+        if to_date:
+            window["end"] = start_range["$lt"] = datetime.strptime(to_date, "%Y-%m-%d") + timedelta(days=1)
+    except ValueError:
+        raise InvalidPageRequest("Invalid date window")
+    if start_range:
+        query["start_at"] = start_range
+
+    if after:
+        try:
+            start_at, slot_id = decode_cursor(after)
+            start_at = datetime.fromisoformat(start_at)
+            if is_occurrence_id(slot_id):
+                parse_occurrence_id(slot_id)
+            else:
+                slot_id = ObjectId(slot_id)
+        except Exception:
+            raise InvalidPageRequest("Invalid cursor")
+        if isinstance(slot_id, str):
+            # Past a recurring occurrence: concrete slots at the same start sorted before it
+            query["$or"] = [{"start_at": {"$gt": start_at}}]
+        else:
+            query["$or"] = [
+                {"start_at": {"$gt": start_at}},
+                {"start_at": start_at, "_id": {"$gt": slot_id}}
+            ]
+        window["after"] = start_at
+        window["after_id"] = slot_id
+
+    return window
@@ -0,0 +1,67 @@
+"""
+Change counters for conditional GETs.
+
+Each scope ("sessions", "registrations", "users") has one counter document in
+version_collection that the write helpers in utils.py bump after every
+committed write. Read endpoints build a weak ETag from the counters they depend
+on plus their query parameters, so a repeat request carrying If-None-Match is
+answered with 304 after a single small read, before the real query runs.
+
+Counters live in Mongo rather than in process memory so an ETag stays correct
+across worker processes.
+"""
+import hashlib
+from fastapi import Response
+from pymongo import UpdateOne
+from .mongo import version_collection
+
+SESSIONS = "sessions"
+REGISTRATIONS = "registrations"
+USERS = "users"
+
+
+async def get_versions(*scopes):
+    versions = {scope: 0 for scope in scopes}
+    async for counter in version_collection.find({"_id": {"$in": list(scopes)}}):
+        versions[counter["_id"]] = counter["version"]
+    return versions
+
+
+async def bump_versions(*scopes):
+    """Invalidate every ETag that depends on these scopes"""
+    try:
+        await version_collection.bulk_write(
+            [UpdateOne({"_id": scope}, {"$inc": {"version": 1}}, upsert=True) for scope in scopes],
+            ordered=False
+        )
+    except Exception as e:
+        # The write itself already succeeded; a missed bump only delays revalidation until the next one
+        print(f"Error bumping versions {scopes}: {e}")
+
+
+def make_etag(versions, *key_parts):
+    """Weak ETag over the counters of the scopes a response depends on and the request's own parameters"""
+    material = "|".join([f"{scope}={version}" for scope, version in versions.items()] + [str(part) for part in key_parts])
+    return 'W/"%s"' % hashlib.sha1(material.encode()).hexdigest()[:20]
+
+
+def etag_matches(request, etag):
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    return if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]
+
+
+async def conditional_get(request, response, scopes, *key_parts):
+    """Check If-None-Match against the current counters of `scopes`.
+
+    Returns (not_modified, versions): a 304 response when the client's copy is still current (else None,
+    with `response` tagged with the ETag), and the counters that were read, for callers that cache by them.
+    """
+    versions = await get_versions(*scopes)
+    etag = make_etag(versions, *key_parts)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers), versions
+    response.headers.update(headers)
+    return None, versions
@@ -0,0 +1,18 @@
+"""
+Load-test and benchmark suite.
+
+Needs a running mongod (a replica set, since registration uses transactions) and
+the API started separately; install bench/requirements.txt on top of the app's.
+Run from the backend directory:
+    python -m bench.seed --users 5000 --tutors 300 --slots-per-tutor 40 --registrations 2000
+    uvicorn main:app --host 0.0.0.0 --port 8000 --workers 4
+    python -m bench.run --url http://localhost:8000 --out bench/baseline.json
+    python -m bench.run --url http://localhost:8000 --out current.json
+    python -m bench.compare bench/baseline.json current.json
+    python -m bench.seed --clean
+    python -m bench.cold_start --runs 5   # spawns its own API process
+    python -m bench.export --seed-rows 1000000 && python -m bench.export --url http://localhost:8000
+
+Seeded documents all use the BENCH_DOMAIN email domain, so --clean only ever
+removes benchmark data.
+"""
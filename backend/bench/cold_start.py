@@ -0,0 +1,80 @@
+"""
+Measure cold-start time: launch a fresh API process and time how long until it serves.
+
+    python -m bench.cold_start --runs 5 [--out cold_start.json]
+
+Reports, per run, seconds from process spawn until /_health answers (liveness),
+/_ready answers 200 (Mongo reachable, indexes in place) and the first real
+calendar request returns.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import httpx
+
+MILESTONES = [
+    ("live", "/_health"),
+    ("ready", "/_ready"),
+    ("first_calendar", "/student/calendar?limit=20"),
+]
+
+
+def wait_for(client, path, deadline):
+    while time.perf_counter() < deadline:
+        try:
+            if client.get(path).status_code == 200:
+                return True
+        except httpx.TransportError:
+            pass
+        time.sleep(0.01)
+    return False
+
+
+def measure(port, timeout):
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    start = time.perf_counter()
+    timings = {}
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=timeout) as client:
+            for name, path in MILESTONES:
+                if not wait_for(client, path, start + timeout):
+                    timings[name] = None
+                    break
+                timings[name] = round(time.perf_counter() - start, 3)
+    finally:
+        process.terminate()
+        process.wait()
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time API cold starts")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=60, help="give up on a run after this many seconds")
+    parser.add_argument("--out", help="write the runs and medians as JSON")
+    args = parser.parse_args()
+
+    runs = []
+    for run in range(args.runs):
+        timings = measure(args.port, args.timeout)
+        runs.append(timings)
+        print(f"run {run + 1}: " + ", ".join(f"{name}={timings.get(name)}s" for name, _ in MILESTONES))
+
+    medians = {}
+    for name, _ in MILESTONES:
+        values = [timings[name] for timings in runs if timings.get(name) is not None]
+        medians[name] = statistics.median(values) if values else None
+    print("median: " + ", ".join(f"{name}={value}s" for name, value in medians.items()))
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"runs": runs, "median": medians}, f, indent=2)
@@ -0,0 +1,74 @@
+import math
+import time
+from collections import defaultdict
+
+BENCH_DOMAIN = "bench.local"
+BENCH_PASSWORD = "bench-password"
+TIME_SLOTS = ["%02d:00-%02d:00" % (hour, hour + 1) for hour in range(9, 18)]
+
+
+def tutor_email(index):
+    return f"tutor{index}@{BENCH_DOMAIN}"
+
+
+def student_email(index):
+    return f"student{index}@{BENCH_DOMAIN}"
+
+
+def bench_email_filter(field="email"):
+    return {field: {"$regex": f"@{BENCH_DOMAIN.replace('.', '[.]')}$"}}
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class Recorder:
+    """Collects latencies and status codes per endpoint label for one scenario"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.errors = defaultdict(int)
+        self.started = time.perf_counter()
+        self.finished = None
+
+    async def call(self, label, request):
+        """Await an httpx request coroutine, timing it under `label`; returns the response or None"""
+        start = time.perf_counter()
+        try:
+            response = await request
+        except Exception:
+            self.errors[label] += 1
+            return None
+        self.latencies[label].append(time.perf_counter() - start)
+        self.statuses[label][response.status_code] += 1
+        return response
+
+    def stop(self):
+        self.finished = time.perf_counter()
+
+    def report(self):
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        endpoints = {}
+        for label in sorted(set(self.latencies) | set(self.errors)):
+            values = sorted(self.latencies[label])
+            endpoints[label] = {
+                "requests": len(values),
+                "errors": self.errors[label],
+                "statuses": {str(code): count for code, count in sorted(self.statuses[label].items())},
+                "throughput_rps": round(len(values) / elapsed, 2) if elapsed else None,
+                "p50_ms": _ms(percentile(values, 50)),
+                "p95_ms": _ms(percentile(values, 95)),
+                "p99_ms": _ms(percentile(values, 99)),
+                "max_ms": _ms(values[-1] if values else None),
+            }
+        return {"elapsed_s": round(elapsed, 3), "endpoints": endpoints}
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 2)
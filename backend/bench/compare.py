@@ -0,0 +1,73 @@
+"""
+Diff two bench.run result files.
+
+    python -m bench.compare bench/baseline.json current.json [--threshold 0.15]
+
+Exits 1 when an endpoint's p95 grew, or its throughput fell, by more than the
+threshold, or when the rush scenario overbooked a slot.
+"""
+import argparse
+import json
+import sys
+
+METRICS = ["throughput_rps", "p50_ms", "p95_ms", "p99_ms"]
+
+
+def change(before, after):
+    if not before or after is None:
+        return None
+    return (after - before) / before
+
+
+def compare(baseline, current, threshold):
+    regressions = []
+    print(f"baseline {baseline['meta'].get('commit')}  ->  current {current['meta'].get('commit')}")
+    for scenario, result in current["scenarios"].items():
+        before = baseline["scenarios"].get(scenario)
+        print(f"\n== {scenario} ==")
+        if before is None:
+            print("(not in baseline)")
+            continue
+        print(f"{'endpoint':<40} " + " ".join(f"{metric:>24}" for metric in METRICS))
+        for label, stats in result["endpoints"].items():
+            old = before["endpoints"].get(label)
+            if old is None:
+                print(f"{label:<40} (new endpoint)")
+                continue
+            cells = []
+            for metric in METRICS:
+                delta = change(old[metric], stats[metric])
+                cells.append(f"{old[metric]} -> {stats[metric]} ({'n/a' if delta is None else '%+.0f%%' % (delta * 100)})")
+            print(f"{label:<40} " + " ".join(f"{cell:>24}" for cell in cells))
+
+            p95 = change(old["p95_ms"], stats["p95_ms"])
+            throughput = change(old["throughput_rps"], stats["throughput_rps"])
+            if p95 is not None and p95 > threshold:
+                regressions.append(f"{scenario} {label}: p95 {old['p95_ms']}ms -> {stats['p95_ms']}ms")
+            if throughput is not None and throughput < -threshold:
+                regressions.append(f"{scenario} {label}: throughput {old['throughput_rps']} -> {stats['throughput_rps']} rps")
+
+        if result.get("checks", {}).get("overbooked_slots"):
+            regressions.append(f"{scenario}: {result['checks']['overbooked_slots']} slots got more registrations than seats")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed relative p95/throughput regression")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    regressions = compare(baseline, current, args.threshold)
+    if regressions:
+        print("\nRegressions:")
+        for regression in regressions:
+            print("  " + regression)
+        sys.exit(1)
+    print("\nNo regressions beyond the threshold")
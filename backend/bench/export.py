@@ -0,0 +1,138 @@
+"""
+Export benchmark: seed a large slot/registration set, then stream an admin export.
+
+    python -m bench.export --seed-rows 1000000        # once; writes straight to MONGODB_URL
+    ADMIN_TOKEN=... uvicorn main:app --port 8000      # one worker, so /_metrics is the exporting process
+    ADMIN_TOKEN=... python -m bench.export --url http://localhost:8000 --kind registrations --format csv [--out export.json]
+    python -m bench.seed --clean
+
+Reports time to first byte, rows and bytes received, rows/s, and the server's
+peak RSS before and after the export; with a constant-memory export the peak
+should barely move whether the export is 10k rows or 1M.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from datetime import date, timedelta
+from math import ceil
+import httpx
+from app.indexes import ensure_indexes
+from app.mongo import session_collection, registration_collection, schedule_collection
+from app.schema import SessionTypesList
+from app.utils import build_availability
+from app.versions import bump_versions, SESSIONS, REGISTRATIONS
+from .common import TIME_SLOTS, tutor_email, student_email, bench_email_filter
+
+BATCH_SIZE = 10000
+DAYS = 365
+
+
+def export_window():
+    first_day = date.today() + timedelta(days=1)
+    return first_day, first_day + timedelta(days=DAYS - 1)
+
+
+async def seed_rows(rows, students):
+    """Insert `rows` slots from tomorrow on, each taken by one registration"""
+    if await ensure_indexes():
+        raise SystemExit("Index creation failed; fix the collections above before seeding")
+    session_types = SessionTypesList().session_types
+    first_day, _ = export_window()
+    cells_per_tutor = DAYS * len(TIME_SLOTS)
+    seeded = 0
+    for tutor in range(ceil(rows / cells_per_tutor)):
+        cells = [(day, time_slot) for day in range(DAYS) for time_slot in TIME_SLOTS]
+        cells = cells[:rows - seeded]
+        for start in range(0, len(cells), BATCH_SIZE):
+            slots = []
+            for index, (day, time_slot) in enumerate(cells[start:start + BATCH_SIZE], seeded + start):
+                slot = build_availability(
+                    tutor_email(tutor), f"Bench User {tutor}", session_types[index % len(session_types)],
+                    (first_day + timedelta(days=day)).isoformat(), time_slot, f"Room {100 + index % 900}",
+                    "Seeded by bench.export"
+                )
+                slot.update(is_registered=True, registered_student=student_email(index % students), seats_taken=1)
+                slots.append(slot)
+            result = await session_collection.insert_many(slots, ordered=False)
+            await registration_collection.insert_many([
+                {
+                    "student_email": slot["registered_student"],
+                    "session_id": slot_id,
+                    "start_at": slot["start_at"],
+                    "end_at": slot["end_at"],
+                    "registration_time": slot["created_at"],
+                    "status": "registered",
+                    "created_at": slot["created_at"],
+                    "updated_at": slot["created_at"],
+                }
+                for slot_id, slot in zip(result.inserted_ids, slots)
+            ], ordered=False)
+        seeded += len(cells)
+        print(f"Seeded {seeded} slots and registrations")
+
+    await schedule_collection.delete_many(bench_email_filter("_id"))  # Rebuilt on first read
+    await bump_versions(SESSIONS, REGISTRATIONS)
+
+
+async def peak_rss(client):
+    response = await client.get("/_metrics")
+    for line in response.text.splitlines():
+        if line.startswith("process_max_resident_memory_bytes "):
+            return int(float(line.split()[1]))
+    return None
+
+
+async def run_export(url, kind, export_format):
+    first_day, last_day = export_window()
+    params = {"format": export_format, "from_date": first_day.isoformat(), "to_date": last_day.isoformat()}
+    headers = {"Authorization": f"Bearer {os.getenv('ADMIN_TOKEN', '')}"}
+    async with httpx.AsyncClient(base_url=url, timeout=None, headers=headers) as client:
+        rss_before = await peak_rss(client)
+        lines = 0
+        received = 0
+        first_byte = None
+        start = time.perf_counter()
+        async with client.stream("GET", f"/admin/export/{kind}", params=params) as response:
+            response.raise_for_status()
+            async for chunk in response.aiter_bytes():
+                if first_byte is None:
+                    first_byte = time.perf_counter() - start
+                received += len(chunk)
+                lines += chunk.count(b"\n")
+        elapsed = time.perf_counter() - start
+        rss_after = await peak_rss(client)
+
+    rows = lines - 1 if export_format == "csv" else lines  # CSV has a header line
+    return {
+        "kind": kind,
+        "format": export_format,
+        "rows": rows,
+        "bytes": received,
+        "first_byte_ms": round(first_byte * 1000, 2) if first_byte is not None else None,
+        "elapsed_s": round(elapsed, 3),
+        "rows_per_s": round(rows / elapsed, 1) if elapsed else None,
+        "server_peak_rss_before_mb": round(rss_before / 2 ** 20, 1) if rss_before else None,
+        "server_peak_rss_after_mb": round(rss_after / 2 ** 20, 1) if rss_after else None,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the streaming admin exports")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--kind", choices=["registrations", "availability"], default="registrations")
+    parser.add_argument("--format", choices=["csv", "ndjson"], default="csv")
+    parser.add_argument("--seed-rows", type=int, help="seed this many taken slots instead of exporting")
+    parser.add_argument("--students", type=int, default=2000, help="registrations cycle over bench.seed's students")
+    parser.add_argument("--out", help="write the result as JSON")
+    args = parser.parse_args()
+
+    if args.seed_rows:
+        asyncio.run(seed_rows(args.seed_rows, args.students))
+    else:
+        result = asyncio.run(run_export(args.url, args.kind, args.format))
+        print(json.dumps(result, indent=2))
+        if args.out:
+            with open(args.out, "w") as f:
+                json.dump(result, f, indent=2)
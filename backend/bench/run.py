@@ -0,0 +1,409 @@
+"""
+Drive traffic mixes against a running API and report per-endpoint throughput and latency.
+
+    python -m bench.run --url http://localhost:8000 --scenario browse --scenario rush --out current.json
+
+Scenarios:
+    browse   calendar browse storm: filtered calendar pages, cursor follow-ups, ETag revalidation, my-sessions
+    bigpage  full-size calendar pages, timing first byte and completion of the streamed response
+    rush     registration rush: many students released at once onto a few hot slots; checks no slot ends up with more winners than seats,
+             then some winners cancel; reports requests per booking (compare runs with and without --waitlist)
+    publish  tutors bulk-publishing slots through the batch and single-slot endpoints
+    login    login throughput against the scrypt worker pool
+    sse      idle live-calendar connections held open while a lighter browse load runs
+    overload browse flood well past the read budget while steady registrants book and cancel; checks registrations
+             keep succeeding every second while reads are shed with 503 + Retry-After
+
+Server-side switches (CALENDAR_CACHE_ENABLED, FAST_JSON_RESPONSES, pool sizes) are compared by
+restarting the API with different settings and diffing the two result files with bench.compare.
+"""
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import time
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+import httpx
+from app.schema import SessionTypesList
+from .common import BENCH_PASSWORD, TIME_SLOTS, Recorder, tutor_email, student_email
+
+SESSION_TYPES = SessionTypesList().session_types
+DEFAULT_SCENARIOS = ["browse", "rush", "publish", "login"]
+
+
+def far_future_date(low, high):
+    """A random date well past the seeded window, so generated slots don't collide with earlier runs"""
+    return (date.today() + timedelta(days=random.randint(low, high))).isoformat()
+
+
+async def run_workers(concurrency, duration, worker):
+    deadline = time.perf_counter() + duration
+
+    async def loop():
+        while time.perf_counter() < deadline:
+            await worker()
+
+    await asyncio.gather(*[loop() for _ in range(concurrency)])
+
+
+# ==================== Scenarios ====================
+
+async def browse(client, recorder, args, concurrency=None):
+    etags = {}
+
+    async def worker():
+        params = {"limit": args.page_size}
+        if random.random() < 0.7:
+            params["session_type"] = random.choice(SESSION_TYPES)
+        if random.random() < 0.5:
+            params["from_date"] = (date.today() + timedelta(days=random.randint(1, args.days))).isoformat()
+        if random.random() < 0.3:
+            params["student_email"] = student_email(random.randrange(args.students))
+
+        # Returning visitors revalidate what they already have
+        key = tuple(sorted(params.items()))
+        headers = {"If-None-Match": etags[key]} if key in etags and random.random() < 0.5 else {}
+        response = await recorder.call("GET /student/calendar", client.get("/student/calendar", params=params, headers=headers))
+        if response is None or response.status_code != 200:
+            return
+        if "etag" in response.headers:
+            etags[key] = response.headers["etag"]
+
+        next_cursor = response.json().get("next_cursor")
+        if next_cursor and random.random() < 0.3:
+            await recorder.call(
+                "GET /student/calendar (next page)",
+                client.get("/student/calendar", params={**params, "after": next_cursor})
+            )
+        if random.random() < 0.2:
+            email = student_email(random.randrange(args.students))
+            await recorder.call("GET /my-sessions/{email}", client.get(f"/my-sessions/{email}"))
+
+    await run_workers(concurrency or args.concurrency, args.duration, worker)
+    return {}
+
+
+async def bigpage(client, recorder, args):
+    async def worker():
+        params = {"limit": args.big_page_size}
+        if random.random() < 0.5:
+            params["session_type"] = random.choice(SESSION_TYPES)
+        start = time.perf_counter()
+        try:
+            async with client.stream("GET", "/student/calendar", params=params) as response:
+                first_byte = None
+                async for _ in response.aiter_raw():
+                    if first_byte is None:
+                        first_byte = time.perf_counter() - start
+        except Exception:
+            recorder.errors["GET /student/calendar (first byte)"] += 1
+            return
+        for label, elapsed in (("GET /student/calendar (first byte)", first_byte),
+                               ("GET /student/calendar (complete)", time.perf_counter() - start)):
+            recorder.latencies[label].append(elapsed)
+            recorder.statuses[label][response.status_code] += 1
+
+    await run_workers(args.concurrency, args.duration, worker)
+    return {"page_size": args.big_page_size}
+
+
+async def rush(client, recorder, args):
+    # Fresh hot slots for every run, on a far-future day nobody has booked yet
+    slot_date = far_future_date(400, 3000)
+    slot_ids = []
+    for i, time_slot in enumerate(TIME_SLOTS[:args.hot_slots]):
+        response = await client.post("/tutor/availability", json={
+            "tutor_email": tutor_email(i % args.tutors),
+            "tutor_name": f"Bench User {i % args.tutors}",
+            "session_type": random.choice(SESSION_TYPES),
+            "date": slot_date,
+            "time_slot": time_slot,
+            "location": "Hot room",
+            "description": "bench.run rush",
+            "capacity": args.hot_capacity
+        })
+        response.raise_for_status()
+        slot_ids.append(response.json()["availability_id"])
+
+    start = asyncio.Event()
+    winners = defaultdict(list)  # slot id -> students who got it from the rush
+    waitlisted = Counter()
+    students = random.sample(range(args.students), min(args.rush_clients, args.students))
+
+    async def contender(student_index):
+        email = student_email(student_index)
+        slot_id = random.choice(slot_ids)
+        await start.wait()
+        for _ in range(args.rush_retries + 1):
+            response = await recorder.call("POST /student/register", client.post("/student/register", json={
+                "student_email": email,
+                "availability_id": slot_id,
+                "waitlist": args.waitlist
+            }))
+            if response is None:
+                return
+            if response.status_code == 200:
+                winners[slot_id].append(email)
+                return
+            if response.status_code == 202:
+                waitlisted[slot_id] += 1
+                return
+            # Lost the race: look at the calendar again and try another hot slot
+            await recorder.call("GET /student/calendar", client.get("/student/calendar", params={"date": slot_date}))
+            slot_id = random.choice(slot_ids)
+
+    tasks = [asyncio.create_task(contender(index)) for index in students]
+    await asyncio.sleep(0.1)
+    start.set()
+    await asyncio.gather(*tasks)
+
+    # Some winners drop out; with waitlists the next in line gets the seat without asking again
+    cancelled = [slot_id for slot_id in slot_ids if winners[slot_id] and random.random() < args.rush_cancel_ratio]
+    for slot_id in cancelled:
+        await recorder.call("DELETE /student/register", client.request("DELETE", "/student/register", json={
+            "student_email": winners[slot_id][0],
+            "availability_id": slot_id
+        }))
+
+    refilled = 0
+    for i in range(len(slot_ids)):
+        response = await client.get(f"/tutor/availability/{tutor_email(i % args.tutors)}", params={"date": slot_date})
+        for availability in response.json()["availabilities"]:
+            # Refilled when the cancelled seat was taken again
+            slot_id = availability["id"]
+            if slot_id in cancelled and availability["seats_remaining"] <= args.hot_capacity - len(winners[slot_id]):
+                refilled += 1
+
+    bookings = sum(len(winners[slot_id]) for slot_id in slot_ids) + refilled
+    requests = sum(len(latencies) for latencies in recorder.latencies.values()) + sum(recorder.errors.values())
+    return {
+        "hot_slots": len(slot_ids),
+        "contenders": len(students),
+        "waitlist": args.waitlist,
+        "capacity": args.hot_capacity,
+        "seats_won": sum(len(winners[slot_id]) for slot_id in slot_ids),
+        "overbooked_slots": sum(1 for slot_id in slot_ids if len(winners[slot_id]) > args.hot_capacity),
+        "waitlisted": sum(waitlisted.values()),
+        "cancelled": len(cancelled),
+        "refilled_after_cancel": refilled,
+        "requests_per_booking": round(requests / bookings, 2) if bookings else None,
+    }
+
+
+async def publish(client, recorder, args):
+    async def worker():
+        tutor = random.randrange(args.tutors)
+        slot_date = far_future_date(3000, 6000)
+
+        def availability(time_slot):
+            return {
+                "tutor_email": tutor_email(tutor),
+                "tutor_name": f"Bench User {tutor}",
+                "session_type": random.choice(SESSION_TYPES),
+                "date": slot_date,
+                "time_slot": time_slot,
+                "location": f"Room {random.randint(100, 999)}",
+                "description": "bench.run publish"
+            }
+
+        if random.random() < 0.8:
+            await recorder.call("POST /tutor/availability/batch", client.post("/tutor/availability/batch", json={
+                "availabilities": [availability(random.choice(TIME_SLOTS)) for _ in range(args.batch_size)]
+            }))
+        else:
+            await recorder.call(
+                "POST /tutor/availability",
+                client.post("/tutor/availability", json=availability(random.choice(TIME_SLOTS)))
+            )
+
+    await run_workers(args.concurrency, args.duration, worker)
+    return {"batch_size": args.batch_size}
+
+
+async def login(client, recorder, args):
+    async def worker():
+        await recorder.call("POST /login", client.post("/login", json={
+            "email": student_email(random.randrange(args.students)),
+            "password": BENCH_PASSWORD
+        }))
+
+    await run_workers(args.concurrency, args.duration, worker)
+    return {}
+
+
+async def sse(client, recorder, args):
+    opened = 0
+    done = asyncio.Event()
+    stream_timeout = httpx.Timeout(10.0, read=None)
+
+    async def listener():
+        nonlocal opened
+        session_type = random.choice(SESSION_TYPES + [None])
+        params = {"session_type": session_type} if session_type else {}
+        start = time.perf_counter()
+        try:
+            async with client.stream("GET", "/student/calendar/stream", params=params, timeout=stream_timeout) as response:
+                async for _ in response.aiter_text():
+                    recorder.latencies["GET /student/calendar/stream (first byte)"].append(time.perf_counter() - start)
+                    recorder.statuses["GET /student/calendar/stream (first byte)"][response.status_code] += 1
+                    opened += 1
+                    break
+                await done.wait()
+        except Exception:
+            recorder.errors["GET /student/calendar/stream (first byte)"] += 1
+
+    listeners = [asyncio.create_task(listener()) for _ in range(args.sse_connections)]
+    await asyncio.sleep(min(10, args.duration / 4))
+
+    # Latency of ordinary reads while the idle connections are held open
+    await browse(client, recorder, args, concurrency=max(1, args.concurrency // 4))
+    server_stats = (await client.get("/_events")).json()
+
+    done.set()
+    await asyncio.gather(*listeners)
+    return {"requested": args.sse_connections, "opened": opened, "server_connections": server_stats.get("connections")}
+
+
+async def overload(client, recorder, args):
+    # Each registrant owns one slot and one student, so register/cancel never conflicts with another registrant
+    slot_date = far_future_date(6000, 9000)
+    registrants = []
+    for i in range(args.overload_registrants):
+        response = await client.post("/tutor/availability", json={
+            "tutor_email": tutor_email(i % args.tutors),
+            "tutor_name": f"Bench User {i % args.tutors}",
+            "session_type": random.choice(SESSION_TYPES),
+            "date": (date.fromisoformat(slot_date) + timedelta(days=i)).isoformat(),
+            "time_slot": TIME_SLOTS[0],
+            "location": "Overload room",
+            "description": "bench.run overload"
+        })
+        response.raise_for_status()
+        registrants.append((student_email(i % args.students), response.json()["availability_id"]))
+
+    started = time.perf_counter()
+    booked_per_second = Counter()
+
+    async def registrant(email, slot_id):
+        while time.perf_counter() - started < args.duration:
+            selection = {"student_email": email, "availability_id": slot_id}
+            response = await recorder.call("POST /student/register", client.post("/student/register", json=selection))
+            if response is not None and response.status_code == 200:
+                booked_per_second[int(time.perf_counter() - started)] += 1
+                await recorder.call("DELETE /student/register", client.request("DELETE", "/student/register", json=selection))
+            elif response is not None and response.status_code == 503:
+                await asyncio.sleep(float(response.headers.get("retry-after", 1)))
+
+    async def reader():
+        response = await recorder.call("GET /student/calendar", client.get("/student/calendar", params={
+            "limit": args.page_size, "session_type": random.choice(SESSION_TYPES)
+        }))
+        if response is not None and response.status_code == 503:
+            # Well-behaved clients honour Retry-After; the flood keeps the pressure on regardless
+            await asyncio.sleep(random.random() * float(response.headers.get("retry-after", 1)))
+
+    await asyncio.gather(
+        run_workers(args.overload_clients, args.duration, reader),
+        *[registrant(email, slot_id) for email, slot_id in registrants]
+    )
+
+    seconds = [booked_per_second[second] for second in range(int(args.duration))]
+    metrics = (await client.get("/_metrics")).text
+    shed = {line.split("{", 1)[1].split("}")[0]: float(line.rsplit(" ", 1)[1])
+            for line in metrics.splitlines() if line.startswith("http_requests_shed_total{")}
+    return {
+        "readers": args.overload_clients,
+        "registrants": len(registrants),
+        "bookings": sum(seconds),
+        "bookings_per_s_min": min(seconds) if seconds else None,
+        "bookings_per_s_median": sorted(seconds)[len(seconds) // 2] if seconds else None,
+        "seconds_without_booking": sum(1 for count in seconds if count == 0),
+        "server_shed": shed,
+    }
+
+
+# ==================== Runner ====================
+
+RUNNERS = {
+    "browse": browse, "bigpage": bigpage, "rush": rush, "publish": publish, "login": login, "sse": sse,
+    "overload": overload,
+}
+
+
+async def run(args):
+    unbounded = "sse" in args.scenario or "overload" in args.scenario
+    limits = httpx.Limits(max_connections=None if unbounded else args.concurrency + args.rush_clients)
+    results = {}
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        for name in args.scenario:
+            print(f"Running {name}...")
+            recorder = Recorder()
+            checks = await RUNNERS[name](client, recorder, args)
+            recorder.stop()
+            results[name] = {**recorder.report(), "checks": checks}
+            print_report(name, results[name])
+    return results
+
+
+def print_report(name, result):
+    print(f"\n== {name} ({result['elapsed_s']}s) ==")
+    print(f"{'endpoint':<40} {'reqs':>7} {'err':>5} {'rps':>9} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for label, stats in result["endpoints"].items():
+        print(f"{label:<40} {stats['requests']:>7} {stats['errors']:>5} {stats['throughput_rps'] or 0:>9} "
+              f"{stats['p50_ms'] or '-':>9} {stats['p95_ms'] or '-':>9} {stats['p99_ms'] or '-':>9}")
+    if result["checks"]:
+        print("checks:", json.dumps(result["checks"]))
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run benchmark traffic mixes against a running API")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--scenario", action="append", choices=RUNNERS, help="repeatable; default: %s" % ",".join(DEFAULT_SCENARIOS))
+    parser.add_argument("--duration", type=float, default=20, help="seconds per timed scenario")
+    parser.add_argument("--concurrency", type=int, default=50, help="concurrent clients per timed scenario")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--students", type=int, default=2000, help="seeded students to draw from")
+    parser.add_argument("--tutors", type=int, default=200, help="seeded tutors to draw from")
+    parser.add_argument("--days", type=int, default=28, help="seeded day window")
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--big-page-size", type=int, default=500, help="calendar page size for the bigpage scenario")
+    parser.add_argument("--hot-slots", type=int, default=3)
+    parser.add_argument("--hot-capacity", type=int, default=1, help="seats per hot slot (above 1: group sessions)")
+    parser.add_argument("--rush-clients", type=int, default=200)
+    parser.add_argument("--rush-retries", type=int, default=3, help="times a rush loser refetches and tries again")
+    parser.add_argument("--rush-cancel-ratio", type=float, default=0.5, help="share of rush winners who cancel")
+    parser.add_argument("--waitlist", action="store_true", help="rush losers join the slot's waitlist instead of retrying")
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--sse-connections", type=int, default=1000)
+    parser.add_argument("--overload-clients", type=int, default=1000, help="concurrent calendar readers in the overload scenario")
+    parser.add_argument("--overload-registrants", type=int, default=20, help="students booking and cancelling throughout the overload")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--out", help="write machine-readable results here, for bench.compare")
+    args = parser.parse_args()
+    args.scenario = args.scenario or DEFAULT_SCENARIOS
+    random.seed(args.seed)
+
+    results = asyncio.run(run(args))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({
+                "meta": {
+                    "commit": git_commit(),
+                    "timestamp": datetime.utcnow().isoformat() + "Z",
+                    "url": args.url,
+                    "args": vars(args),
+                },
+                "scenarios": results,
+            }, f, indent=2)
+        print(f"\nWrote {args.out}")
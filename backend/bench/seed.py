@@ -0,0 +1,141 @@
+"""
+Synthetic data seeder for the benchmark suite.
+
+Writes straight to the database configured by MONGODB_URL:
+    python -m bench.seed --users 5000 --tutors 300 --slots-per-tutor 40 --registrations 2000
+    python -m bench.seed --clean
+"""
+import argparse
+import asyncio
+import random
+from datetime import date, timedelta
+from pymongo import UpdateOne
+from app.indexes import ensure_indexes
+from app.mongo import (
+    user_collection, session_collection, registration_collection, recurrence_collection, schedule_collection
+)
+from app.schema import SessionTypesList
+from app.security import hash_password_sync
+from app.utils import build_availability
+from app.versions import bump_versions, SESSIONS, REGISTRATIONS, USERS
+from .common import BENCH_PASSWORD, TIME_SLOTS, tutor_email, student_email, bench_email_filter
+
+BATCH_SIZE = 1000
+SESSION_TYPES = SessionTypesList().session_types
+
+
+def build_user(email, index, password_hash):
+    return {
+        "email": email,
+        "password": password_hash,
+        "profile": {
+            "full_name": f"Bench User {index}",
+            "preferred_name": f"Bench {index}",
+            "SID": str(30000000 + index),
+            "study_year": random.choice(["1", "2", "3", "4"]),
+            "major": random.choice(["Finance", "Accounting", "Economics", "Data Science"]),
+            "contact_phone": "%08d" % random.randrange(10 ** 8),
+            "personal_email": email,
+        },
+    }
+
+
+async def insert_in_batches(collection, documents):
+    inserted = []
+    for start in range(0, len(documents), BATCH_SIZE):
+        result = await collection.insert_many(documents[start:start + BATCH_SIZE], ordered=False)
+        inserted.extend(result.inserted_ids)
+    return inserted
+
+
+async def seed(users, tutors, slots_per_tutor, registrations, days, seed_value):
+    random.seed(seed_value)
+    if await ensure_indexes():
+        raise SystemExit("Index creation failed; fix the collections above before seeding")
+
+    # One hash shared by every seeded account: scrypt per user would dominate seeding time
+    password_hash = hash_password_sync(BENCH_PASSWORD)
+    documents = [build_user(tutor_email(i), i, password_hash) for i in range(tutors)]
+    documents += [build_user(student_email(i), tutors + i, password_hash) for i in range(users)]
+    await insert_in_batches(user_collection, documents)
+    print(f"Seeded {tutors} tutors and {users} students")
+
+    first_day = date.today() + timedelta(days=1)
+    cells = [(day, time_slot) for day in range(days) for time_slot in TIME_SLOTS]
+    slots = []
+    for i in range(tutors):
+        for day, time_slot in random.sample(cells, min(slots_per_tutor, len(cells))):
+            slots.append(build_availability(
+                tutor_email(i), f"Bench User {i}", random.choice(SESSION_TYPES),
+                (first_day + timedelta(days=day)).isoformat(), time_slot,
+                f"Room {random.randint(100, 999)}", "Seeded by bench.seed"
+            ))
+    slot_ids = await insert_in_batches(session_collection, slots)
+    print(f"Seeded {len(slot_ids)} availability slots over {days} days")
+
+    # Each registered slot goes to one student; a student's slots never overlap
+    taken = []
+    booked = {}
+    for index in random.sample(range(len(slots)), min(registrations, len(slots))):
+        slot = slots[index]
+        student = student_email(random.randrange(users)) if users else None
+        if student is None or (slot["date"], slot["time_slot"]) in booked.setdefault(student, set()):
+            continue
+        booked[student].add((slot["date"], slot["time_slot"]))
+        taken.append((slot_ids[index], slot, student))
+
+    for start in range(0, len(taken), BATCH_SIZE):
+        chunk = taken[start:start + BATCH_SIZE]
+        await registration_collection.insert_many([
+            {
+                "student_email": student,
+                "session_id": slot_id,
+                "start_at": slot["start_at"],
+                "end_at": slot["end_at"],
+                "registration_time": slot["created_at"],
+                "status": "registered",
+                "created_at": slot["created_at"],
+                "updated_at": slot["created_at"],
+            }
+            for slot_id, slot, student in chunk
+        ], ordered=False)
+        await session_collection.bulk_write([
+            UpdateOne({"_id": slot_id}, {"$set": {"is_registered": True, "registered_student": student, "seats_taken": 1}})
+            for slot_id, _, student in chunk
+        ], ordered=False)
+    print(f"Seeded {len(taken)} registrations")
+    # Registrations were inserted directly; drop stale schedules so they are rebuilt on first read
+    await schedule_collection.delete_many(bench_email_filter("_id"))
+
+    await bump_versions(SESSIONS, REGISTRATIONS, USERS)
+
+
+async def clean():
+    """Remove every document created by the seeder or by benchmark traffic"""
+    users = await user_collection.delete_many(bench_email_filter("email"))
+    slots = await session_collection.delete_many(bench_email_filter("tutor_email"))
+    recurrences = await recurrence_collection.delete_many(bench_email_filter("tutor_email"))
+    registrations = await registration_collection.delete_many(bench_email_filter("student_email"))
+    await schedule_collection.delete_many(bench_email_filter("_id"))
+    await bump_versions(SESSIONS, REGISTRATIONS, USERS)
+    print(
+        f"Removed {users.deleted_count} users, {slots.deleted_count} slots, "
+        f"{recurrences.deleted_count} recurring templates and {registrations.deleted_count} registrations"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed or remove synthetic benchmark data")
+    parser.add_argument("--users", type=int, default=2000, help="students to create")
+    parser.add_argument("--tutors", type=int, default=200)
+    parser.add_argument("--slots-per-tutor", type=int, default=30)
+    parser.add_argument("--registrations", type=int, default=1000, help="slots to mark as taken")
+    parser.add_argument("--days", type=int, default=28, help="spread slots over this many days from tomorrow")
+    parser.add_argument("--seed", type=int, default=1, help="random seed, for repeatable data")
+    parser.add_argument("--clean", action="store_true", help="delete benchmark data instead of seeding")
+    args = parser.parse_args()
+
+    if args.clean:
+        asyncio.run(clean())
+    else:
+        asyncio.run(seed(args.users, args.tutors, args.slots_per_tutor, args.registrations, args.days, args.seed))
@@ -0,0 +1,104 @@
+"""
+Serialization microbenchmark: encode a calendar page of synthetic slots, no server or database.
+
+    python -m bench.serialize [--slots 1000] [--tutors-per-group 5] [--repeat 200] [--out serialize.json]
+
+Times, per page, the streamed encoder (routes.stream_calendar_view) with the
+stdlib json encoder and with orjson (FAST_JSON_RESPONSES=1), against the
+validated path it replaced: StudentCalendarView, jsonable_encoder and
+JSONResponse. Reports median and p95 microseconds per 1k slots and the body size.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from datetime import date, timedelta
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from app import routes
+from app.schema import StudentCalendarView
+from app.utils import build_availability, calendar_tutor, iterate
+from .common import TIME_SLOTS, tutor_email, percentile
+
+
+def calendar_page(slots, tutors_per_group):
+    """`slots` open slots as calendar groups of `tutors_per_group` tutors, shaped like open_calendar_page's"""
+    first_day = date.today() + timedelta(days=1)
+    groups = []
+    for index in range(slots):
+        if index % tutors_per_group == 0:
+            cell = index // tutors_per_group
+            groups.append({
+                "date": (first_day + timedelta(days=cell // len(TIME_SLOTS))).isoformat(),
+                "time_slot": TIME_SLOTS[cell % len(TIME_SLOTS)],
+                "session_type": "Casual Chat",
+                "available_tutors": []
+            })
+        group = groups[-1]
+        availability = build_availability(
+            tutor_email(index), f"Bench Tutör {index}", group["session_type"], group["date"], group["time_slot"],
+            f"Room {100 + index % 900}", f'Bring "questions" – slot {index}' if index % 3 else None
+        )
+        availability["_id"] = ObjectId()
+        group["available_tutors"].append(calendar_tutor(availability))
+    return groups
+
+
+async def streamed(groups):
+    return b"".join([chunk async for chunk in routes.stream_calendar_view(iterate(groups), None)])
+
+
+async def validated(groups):
+    return JSONResponse(jsonable_encoder(StudentCalendarView(calendar_slots=groups, next_cursor=None))).body
+
+
+async def measure(encode, groups, repeat, slots):
+    body = await encode(groups)  # Warm up, and the body size
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await encode(groups)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    per_1k = 1e6 * 1000 / slots
+    return {
+        "median_us_per_1k_slots": round(statistics.median(timings) * per_1k, 1),
+        "p95_us_per_1k_slots": round(percentile(timings, 95) * per_1k, 1),
+        "bytes": len(body),
+    }
+
+
+async def run(slots, tutors_per_group, repeat):
+    groups = calendar_page(slots, tutors_per_group)
+    # (name, encoder, FAST_JSON_RESPONSES)
+    encoders = [("validated", validated, False), ("stream_stdlib", streamed, False)]
+    try:
+        import orjson
+        routes.orjson = orjson
+        encoders.append(("stream_orjson", streamed, True))
+    except ImportError:
+        print("orjson is not installed; skipping stream_orjson")
+
+    results = {}
+    for name, encode, fast_json in encoders:
+        routes.FAST_JSON_RESPONSES = fast_json
+        results[name] = await measure(encode, groups, repeat, slots)
+    routes.FAST_JSON_RESPONSES = False
+    return {"slots": slots, "tutors_per_group": tutors_per_group, "repeat": repeat, "encoders": results}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark calendar page serialization")
+    parser.add_argument("--slots", type=int, default=1000)
+    parser.add_argument("--tutors-per-group", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--out", help="write the result as JSON")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args.slots, args.tutors_per_group, args.repeat))
+    print(json.dumps(result, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
@@ -1,9 +1,49 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app.admission import AdmissionMiddleware
+from app.cache import calendar_cache
+from app.events import calendar_events
+from app.indexes import ensure_indexes
+from app.metrics import MetricsMiddleware, render_metrics, pool_stats
+from app.mongo import connect, close, ping
 from app.routes import router
 
-app = FastAPI(docs_url="/")
 
+INDEX_RETRY_MAX_SECONDS = 60
+
+
+async def prepare_indexes(app: FastAPI):
+    """Apply the index registry, retrying with backoff; the instance is ready only once every collection succeeded"""
+    delay = 1
+    while True:
+        app.state.index_failures = await ensure_indexes()
+        if not app.state.index_failures:
+            app.state.indexes_ready = True
+            return
+        print(f"Retrying index creation in {delay}s")
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, INDEX_RETRY_MAX_SECONDS)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Start serving (and answering /_health) right away; /_ready reports when Mongo and indexes are usable
+    app.state.indexes_ready = False
+    app.state.index_failures = {}
+    await connect()
+    indexes = asyncio.create_task(prepare_indexes(app))
+    yield
+    indexes.cancel()
+    close()
+
+
+app = FastAPI(docs_url="/", lifespan=lifespan)
+
+# Per-route concurrency budgets; innermost, so shed 503s still get CORS headers and show up in /_metrics
+app.add_middleware(AdmissionMiddleware, routes=app.routes)
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -16,15 +56,59 @@ app.add_middleware(
     allow_headers=["*"],
     expose_headers=["*"]
 )
+# Per-route latency and in-flight counts for /_metrics (outermost, so it times everything below it)
+app.add_middleware(MetricsMiddleware, routes=app.routes)
 # Include router
 app.include_router(router)
 
 @app.get("/_health")
-def health():
+async def health():
     """
-    Returns the health status of the application.
+    Returns the liveness of the process; does not touch the database (see /_ready).
 
     return: A string "OK" if working
     """
     return "OK"
 
+@app.get("/_ready")
+async def ready():
+    """
+    Returns whether this instance can serve traffic: MongoDB answers a ping and indexes are in place.
+
+    return: 200 with pool stats when ready, 503 otherwise
+    """
+    try:
+        await ping()
+        mongo = "ok"
+    except Exception as e:
+        mongo = f"unreachable: {e.__class__.__name__}"
+    if app.state.indexes_ready:
+        indexes = "ready"
+    elif app.state.index_failures:
+        indexes = f"failed on {', '.join(app.state.index_failures)}, retrying"
+    else:
+        indexes = "pending"
+    body = {"mongo": mongo, "indexes": indexes, "pool": pool_stats()}
+    is_ready = mongo == "ok" and app.state.indexes_ready
+    return JSONResponse(body, status_code=200 if is_ready else 503)
+
+@app.get("/_cache")
+async def cache_stats():
+    """
+    Returns hit/miss counters for the in-process calendar cache.
+    """
+    return calendar_cache.stats()
+
+@app.get("/_events")
+async def event_stats():
+    """
+    Returns open live-calendar connections and published/dropped event counts.
+    """
+    return calendar_events.stats()
+
+@app.get("/_metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Returns request, MongoDB command and connection-pool metrics in Prometheus text format.
+    """
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
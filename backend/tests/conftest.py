@@ -0,0 +1,81 @@
+"""
+Integration tests. They run against a real MongoDB replica set, because registration uses transactions.
+
+From the backend directory:
+    pip install -r tests/requirements.txt
+    TEST_MONGODB_URL=mongodb://localhost:27017 python -m pytest tests
+
+Every test is skipped when no replica-set member answers at TEST_MONGODB_URL. Tests
+use their own database (TEST_MONGODB_DATABASE), which is dropped before each test.
+"""
+import asyncio
+import itertools
+import os
+import httpx
+import pytest
+
+TEST_MONGODB_URL = os.getenv("TEST_MONGODB_URL", "mongodb://localhost:27017")
+TEST_MONGODB_DATABASE = os.getenv("TEST_MONGODB_DATABASE", "sign_up_system_test")
+
+# Must be set before app.mongo is imported
+os.environ["MONGODB_URL"] = TEST_MONGODB_URL
+os.environ["MONGODB_DATABASE"] = TEST_MONGODB_DATABASE
+
+from pymongo import MongoClient  # noqa: E402
+from pymongo.errors import PyMongoError  # noqa: E402
+from app import admission, mongo  # noqa: E402
+from app.cache import calendar_cache  # noqa: E402
+from app.indexes import ensure_indexes  # noqa: E402
+from app.metrics import _request_commands  # noqa: E402
+
+
+def replica_set_available():
+    try:
+        with MongoClient(TEST_MONGODB_URL, serverSelectionTimeoutMS=1000) as client:
+            return "setName" in client.admin.command("hello")
+    except PyMongoError:
+        return False
+
+
+@pytest.fixture(scope="session")
+def loop():
+    """One event loop for the whole session: the shared Motor client is bound to the loop it first ran on"""
+    if not replica_set_available():
+        pytest.skip(f"No MongoDB replica set at {TEST_MONGODB_URL}")
+    loop = asyncio.new_event_loop()
+    yield loop
+    mongo.close()
+    loop.close()
+
+
+@pytest.fixture
+def run(loop):
+    """Run a coroutine to completion on the session loop, against a freshly dropped and indexed database"""
+    loop.run_until_complete(mongo.get_client().drop_database(TEST_MONGODB_DATABASE))
+    failures = loop.run_until_complete(ensure_indexes())
+    assert not failures, failures
+    calendar_cache.clear()
+    return loop.run_until_complete
+
+
+@pytest.fixture
+def count_commands():
+    """Await a coroutine, returning (result, MongoDB commands it issued) as counted by app.metrics' CommandListener"""
+    async def count(coroutine):
+        commands = itertools.count()
+        token = _request_commands.set(commands)
+        try:
+            result = await coroutine
+        finally:
+            _request_commands.reset(token)
+        return result, next(commands)
+    return count
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """An HTTP client for the app served in-process, with admission budgets off so tests see the handlers' own answers"""
+    from main import app
+    for name in admission.BUDGETS:
+        monkeypatch.setitem(admission.BUDGETS, name, admission.Budget(name, 0, 0))
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
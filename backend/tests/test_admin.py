@@ -0,0 +1,48 @@
+"""Admin endpoints only serve requests carrying the configured ADMIN_TOKEN; refusals need no database."""
+import asyncio
+import pytest
+from app import routes
+
+ADMIN_ENDPOINTS = [
+    ("GET", "/admin/export/registrations"),
+    ("GET", "/admin/export/availability"),
+    ("POST", "/admin/import/tutors"),
+]
+
+
+def request(api, method, path, **kwargs):
+    async def send():
+        async with api:
+            return await api.request(method, path, **kwargs)
+    return asyncio.run(send())
+
+
+@pytest.mark.parametrize("method, path", ADMIN_ENDPOINTS)
+def test_admin_endpoints_are_refused_when_no_token_is_configured(api, monkeypatch, method, path):
+    monkeypatch.setattr(routes, "ADMIN_TOKEN", None)
+
+    response = request(api, method, path, headers={"Authorization": "Bearer anything"})
+
+    assert response.status_code == 403
+
+
+@pytest.mark.parametrize("authorization", [None, "Bearer wrong", "secret", "Basic secret"])
+@pytest.mark.parametrize("method, path", ADMIN_ENDPOINTS)
+def test_admin_endpoints_require_the_token(api, monkeypatch, method, path, authorization):
+    monkeypatch.setattr(routes, "ADMIN_TOKEN", "secret")
+
+    response = request(api, method, path, headers={"Authorization": authorization} if authorization else {})
+
+    assert response.status_code == 401
+    assert response.headers["www-authenticate"] == "Bearer"
+
+
+@pytest.mark.parametrize("method, path", ADMIN_ENDPOINTS)
+def test_admin_endpoints_accept_the_token(run, api, monkeypatch, method, path):
+    monkeypatch.setattr(routes, "ADMIN_TOKEN", "secret")
+
+    async def send():
+        async with api:
+            return await api.request(method, path, headers={"Authorization": "Bearer secret"})
+
+    assert run(send()).status_code == 200
@@ -0,0 +1,97 @@
+"""
+The streamed /student/calendar body is byte-for-byte what FastAPI would have sent
+for the same StudentCalendarView through JSONResponse, with the stdlib encoder
+and with FAST_JSON_RESPONSES (orjson).
+"""
+import asyncio
+from datetime import date, timedelta
+import pytest
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from app import routes
+from app.mongo import session_collection
+from app.schema import StudentCalendarView
+from app.utils import build_availability, calendar_tutor, iterate
+
+SLOT_DATE = (date.today() + timedelta(days=3)).isoformat()
+# Non-ASCII, quotes, backslashes and control characters, plus a slot without a description
+DETAILS = [
+    ("Zoë Ångström", "Raum „Süd“ 3", 'Bring "notes" \\ questions\nand a 🙂'),
+    ("李老师", "Room 1", None),
+    ("O'Brien", "Room <2> & 'annex'", "Tab\there"),
+]
+
+
+def slots():
+    documents = []
+    for index, (tutor_name, location, description) in enumerate(DETAILS):
+        document = build_availability(
+            f"tutor{index}@test.local", tutor_name, "Casual Chat", SLOT_DATE,
+            "%02d:00-%02d:00" % (9 + index % 2, 10 + index % 2), location, description, capacity=1 + index
+        )
+        documents.append(document)
+    return documents
+
+
+def calendar_groups():
+    groups = {}
+    for document in slots():
+        document["_id"] = ObjectId()
+        groups.setdefault(document["time_slot"], {
+            "date": document["date"],
+            "time_slot": document["time_slot"],
+            "session_type": document["session_type"],
+            "available_tutors": []
+        })["available_tutors"].append(calendar_tutor(document))
+    return list(groups.values())
+
+
+def streamed(groups, next_cursor):
+    async def collect():
+        return b"".join([chunk async for chunk in routes.stream_calendar_view(iterate(groups), next_cursor)])
+    return asyncio.run(collect())
+
+
+def validated(body):
+    """What the non-streamed endpoint sends: the body validated as StudentCalendarView, rendered by JSONResponse"""
+    return JSONResponse(jsonable_encoder(StudentCalendarView.model_validate_json(body))).body
+
+
+@pytest.mark.parametrize("next_cursor", [None, "abc:123"])
+@pytest.mark.parametrize("fast_json", [False, True], ids=["stdlib", "orjson"])
+def test_streamed_calendar_matches_json_response(monkeypatch, fast_json, next_cursor):
+    if fast_json:
+        monkeypatch.setattr(routes, "orjson", pytest.importorskip("orjson"), raising=False)
+    monkeypatch.setattr(routes, "FAST_JSON_RESPONSES", fast_json)
+
+    body = streamed(calendar_groups(), next_cursor)
+    assert body == validated(body)
+    assert StudentCalendarView.model_validate_json(body).next_cursor == next_cursor
+
+
+def test_encoders_agree(monkeypatch):
+    orjson = pytest.importorskip("orjson")
+    groups = calendar_groups()
+    monkeypatch.setattr(routes, "orjson", orjson, raising=False)
+    monkeypatch.setattr(routes, "FAST_JSON_RESPONSES", True)
+    fast = streamed(groups, "abc:123")
+    monkeypatch.setattr(routes, "FAST_JSON_RESPONSES", False)
+    assert fast == streamed(groups, "abc:123")
+
+
+def test_calendar_endpoint_matches_json_response(run, api):
+    """Groups built by the $group stage, not just calendar_tutor(), keep the model's field order"""
+    run(session_collection.insert_many(slots()))
+
+    async def get_pages():
+        async with api:
+            first = await api.get("/student/calendar", params={"session_type": "Casual Chat", "limit": 2})
+            second = await api.get("/student/calendar", params={
+                "session_type": "Casual Chat", "limit": 2, "after": first.json()["next_cursor"]
+            })
+            return first, second
+
+    for response in run(get_pages()):
+        assert response.status_code == 200, response.text
+        assert response.content == validated(response.content)
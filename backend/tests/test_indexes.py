@@ -0,0 +1,145 @@
+"""
+Every query shape in utils.py is served by the index registered for it in app/indexes.py.
+
+Each shape is explained twice: unhinted, the planner must not fall back to a
+collection scan; hinted with the registered index, that index must be usable
+(a partial index whose filter the query doesn't imply is rejected) and must
+provide the requested order without a blocking SORT.
+"""
+from datetime import datetime
+import pytest
+from bson import ObjectId
+from app.indexes import ensure_indexes
+from app.mongo import (
+    get_db, user_collection, session_collection, registration_collection, recurrence_collection, schedule_collection
+)
+from app.utils import SLOT_ORDER, through_slot
+
+DAY = datetime(2030, 1, 7)
+NEXT_DAY = datetime(2030, 1, 8)
+SLOT_ID = ObjectId()
+SORT = dict(SLOT_ORDER)
+CALENDAR = {"status": "active", "is_registered": False, "session_type": "Casual Chat", "start_at": {"$gte": DAY, "$lt": NEXT_DAY}}
+
+# (name, collection, filter, sort, registered index); filters mirror the utils.py functions named
+FIND_SHAPES = [
+    ("check_email_exists / profile CRUD", user_collection, {"email": "a@test.local"}, None, "email_unique"),
+    ("tutor profile batch", user_collection, {"email": {"$in": ["a@test.local", "b@test.local"]}}, None, "email_unique"),
+    ("get_tutor_availability", session_collection,
+     {"status": "active", "tutor_email": "t@test.local", "start_at": {"$gte": DAY, "$lt": NEXT_DAY}}, SORT,
+     "tutor_status_start_at"),
+    ("get_tutor_availability by date and type", session_collection,
+     {"status": "active", "tutor_email": "t@test.local", "date": "2030-01-07", "session_type": "Casual Chat"}, SORT,
+     "tutor_status_start_at"),
+    ("create_tutor_availabilities overlap check", session_collection,
+     {"tutor_email": {"$in": ["t@test.local"]}, "status": "active", "start_at": {"$lt": NEXT_DAY}, "end_at": {"$gt": DAY}},
+     None, "tutor_status_start_at"),
+    ("open_calendar_page by session type", session_collection, CALENDAR, SORT, "open_slots_by_type_start_at"),
+    ("open_calendar_page", session_collection, {"status": "active", "is_registered": False}, SORT,
+     "open_slots_by_start_at"),
+    ("open_calendar_page after a cursor", session_collection,
+     {"status": "active", "is_registered": False,
+      "$or": [{"start_at": {"$gt": DAY}}, {"start_at": DAY, "_id": {"$gt": SLOT_ID}}]}, SORT,
+     "open_slots_by_start_at"),
+    ("export_availability", session_collection, {"status": "active", "start_at": {"$gte": DAY, "$lt": NEXT_DAY}}, SORT,
+     "status_start_at"),
+    ("resolve_slot_id", session_collection, {"recurrence_id": SLOT_ID, "occurrence_date": "2030-01-07"}, None,
+     "recurrence_occurrence_unique"),
+    ("expand_recurring_slots published occurrences", session_collection,
+     {"recurrence_id": {"$in": [SLOT_ID]}, "occurrence_date": {"$gte": "2030-01-01", "$lte": "2030-02-01"}}, None,
+     "recurrence_occurrence_unique"),
+    ("check_time_conflict", registration_collection,
+     {"student_email": "s@test.local", "status": "registered", "start_at": {"$lt": NEXT_DAY}, "end_at": {"$gt": DAY}},
+     None, "student_status_start_at"),
+    ("register: already holds a seat / cancel", registration_collection,
+     {"session_id": SLOT_ID, "student_email": "s@test.local", "status": "registered"}, None,
+     "active_registration_per_student"),
+    ("promote_waitlist head", registration_collection, {"session_id": SLOT_ID, "status": "waitlisted"}, {"_id": 1},
+     "session_status_queue"),
+    ("get_waitlist_position count", registration_collection,
+     {"session_id": SLOT_ID, "status": "waitlisted", "_id": {"$lt": SLOT_ID}}, None, "session_status_queue"),
+    ("get_waitlist_position entry", registration_collection,
+     {"session_id": SLOT_ID, "student_email": "s@test.local", "status": "waitlisted"}, None,
+     "waitlist_entry_per_student"),
+    ("expand_recurring_slots", recurrence_collection,
+     {"status": "active", "session_type": "Casual Chat", "end_date": {"$gte": "2030-01-01"},
+      "start_date": {"$lte": "2030-02-01"}}, None, "active_by_type_end_date"),
+    ("get_recurring_availability", recurrence_collection, {"tutor_email": "t@test.local", "status": "active"}, None,
+     "tutor_status"),
+    ("refresh_tutor_in_schedules", schedule_collection, {"entries.session_details.tutor_email": "t@test.local"}, None,
+     "entries_tutor_email"),
+    ("slot_schedule_refresh", schedule_collection,
+     {"entries.session_details.tutor_email": "t@test.local", "entries.availability_id": SLOT_ID}, None,
+     "entries_tutor_email"),
+]
+
+AGGREGATE_SHAPES = [
+    ("build_schedule_entries", registration_collection,
+     [{"$match": {"student_email": "s@test.local", "status": "registered"}}, {"$sort": {"_id": -1}}],
+     "student_status_newest"),
+    ("export_registrations", registration_collection,
+     [{"$match": {"status": "registered", "start_at": {"$gte": DAY, "$lt": NEXT_DAY}}}, {"$sort": SORT}],
+     "status_start_at"),
+    ("open_calendar_page grouping", session_collection,
+     [{"$match": {"$and": [CALENDAR, through_slot({"start_at": DAY, "_id": SLOT_ID})]}}, {"$sort": SORT}],
+     "open_slots_by_type_start_at"),
+]
+
+
+def plan_stages(explain):
+    """(stage, indexName) for every stage of every winning plan in an explain result"""
+    stages = []
+
+    def walk(node, in_plan):
+        if isinstance(node, dict):
+            if in_plan and "stage" in node:
+                stages.append((node["stage"], node.get("indexName")))
+            for key, value in node.items():
+                if key != "rejectedPlans":
+                    walk(value, in_plan or key == "winningPlan")
+        elif isinstance(node, list):
+            for item in node:
+                walk(item, in_plan)
+
+    walk(explain, False)
+    return stages
+
+
+async def explain(collection, command):
+    return await get_db().command("explain", {command[0]: collection.name, **command[1]}, verbosity="queryPlanner")
+
+
+def check(run, collection, command, index):
+    unhinted = plan_stages(run(explain(collection, command)))
+    assert unhinted and "COLLSCAN" not in [stage for stage, _ in unhinted], unhinted
+
+    name, arguments = command
+    hinted = plan_stages(run(explain(collection, (name, {**arguments, "hint": index}))))
+    assert ("IXSCAN", index) in hinted, hinted
+    assert "SORT" not in [stage for stage, _ in hinted], hinted
+
+
+@pytest.mark.parametrize("name, collection, query, sort, index", FIND_SHAPES, ids=[shape[0] for shape in FIND_SHAPES])
+def test_find_uses_registered_index(run, name, collection, query, sort, index):
+    arguments = {"filter": query}
+    if sort:
+        arguments["sort"] = sort
+    check(run, collection, ("find", arguments), index)
+
+
+@pytest.mark.parametrize("name, collection, pipeline, index", AGGREGATE_SHAPES, ids=[shape[0] for shape in AGGREGATE_SHAPES])
+def test_aggregate_uses_registered_index(run, name, collection, pipeline, index):
+    check(run, collection, ("aggregate", {"pipeline": pipeline, "cursor": {}}), index)
+
+
+def test_ensure_indexes_drops_obsolete_indexes(run):
+    run(registration_collection.create_index(
+        [("session_id", 1)], name="active_registration_per_session", unique=True,
+        partialFilterExpression={"status": "registered"}
+    ))
+
+    assert not run(ensure_indexes())
+
+    names = run(registration_collection.index_information())
+    assert "active_registration_per_session" not in names
+    assert "active_registration_per_student" in names
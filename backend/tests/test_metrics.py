@@ -0,0 +1,57 @@
+"""Route templates are resolved once per request (no database needed)."""
+import asyncio
+from app import metrics
+
+
+class Routes(list):
+    """The app's route table, counting how often it is walked"""
+    walks = 0
+
+    def __iter__(self):
+        self.walks += 1
+        return super().__iter__()
+
+
+def request_scope(path):
+    return {"type": "http", "method": "GET", "path": path, "root_path": "", "query_string": b"", "headers": []}
+
+
+def test_route_template_walks_the_routes_once_per_request():
+    from main import app
+    routes = Routes(app.routes)
+    scope = request_scope("/student/waitlist/abc123")
+
+    templates = [metrics.route_template(routes, scope) for _ in range(3)]
+
+    assert templates == ["/student/waitlist/{availability_id}"] * 3
+    assert routes.walks == 1
+
+
+def test_unmatched_paths_are_resolved_once_too():
+    from main import app
+    routes = Routes(app.routes)
+    scope = request_scope("/no/such/path")
+
+    assert [metrics.route_template(routes, scope) for _ in range(2)] == ["unmatched"] * 2
+    assert routes.walks == 1
+
+
+def test_admission_reuses_the_template_resolved_by_metrics(api, monkeypatch):
+    resolved = []
+    route_template = metrics.route_template
+
+    def counting_route_template(routes, scope):
+        if metrics.ROUTE_TEMPLATE_KEY not in scope:
+            resolved.append(scope["path"])
+        return route_template(routes, scope)
+
+    monkeypatch.setattr(metrics, "route_template", counting_route_template)
+    from app import admission
+    monkeypatch.setattr(admission, "route_template", counting_route_template)
+
+    async def send():
+        async with api:
+            return await api.get("/_health")
+
+    assert asyncio.run(send()).status_code == 200
+    assert resolved == ["/_health"]
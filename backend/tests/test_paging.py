@@ -0,0 +1,88 @@
+from datetime import date, timedelta
+from app import utils
+from app.mongo import session_collection
+from app.utils import (
+    build_availability, create_recurring_availability, get_student_calendar_view, get_tutor_availability
+)
+
+FIRST_DAY = date.today() + timedelta(days=1)
+
+
+def slot(tutor, day, hour):
+    return build_availability(
+        f"tutor{tutor}@test.local", f"Tutor {tutor}", "Casual Chat", (FIRST_DAY + timedelta(days=day)).isoformat(),
+        "%02d:00-%02d:00" % (hour, hour + 1), "Room 1"
+    )
+
+
+async def calendar_ids(limit):
+    """Every tutor id on every calendar page, in page order"""
+    ids = []
+    after = None
+    while True:
+        calendar_slots, after = await get_student_calendar_view("Casual Chat", after=after, limit=limit)
+        page = [tutor["id"] async for group in calendar_slots for tutor in group["available_tutors"]]
+        assert len(page) <= limit
+        ids += page
+        if after is None:
+            return ids
+
+
+async def tutor_availability_ids(tutor_email, limit):
+    ids = []
+    after = None
+    while True:
+        availabilities, after = await get_tutor_availability(tutor_email, after=after, limit=limit)
+        assert len(availabilities or []) <= limit
+        ids += [availability["id"] for availability in availabilities or []]
+        if after is None:
+            return ids
+
+
+async def seed_recurring(tutors, weeks):
+    """`tutors` tutors with a 09:00 slot and as many with a weekly 09:00 template from the same day, so
+    occurrences share start times with concrete slots; everyone also has an 11:00 slot that day"""
+    await session_collection.insert_many(
+        [slot(tutor, 1, 9) for tutor in range(tutors)] + [slot(tutor, 1, 11) for tutor in range(2 * tutors)]
+    )
+    first = FIRST_DAY + timedelta(days=1)
+    for tutor in range(tutors, 2 * tutors):
+        await create_recurring_availability(
+            f"tutor{tutor}@test.local", f"Tutor {tutor}", "Casual Chat", first.weekday(), "09:00-10:00",
+            first.isoformat(), (first + timedelta(weeks=weeks)).isoformat(), "Room 2"
+        )
+
+
+def test_slot_opened_while_reading_a_page_is_not_skipped(run, monkeypatch):
+    run(session_collection.insert_many([slot(tutor, 1, 9 + tutor) for tutor in range(4)]))
+    expand = utils.expand_recurring_slots
+    opened = []
+
+    async def open_earlier_slot(*args, **kwargs):
+        # Runs between the read that sets the cursor and the aggregation that reads the page
+        if not opened:
+            result = await session_collection.insert_one(slot(9, 0, 9))
+            opened.append(str(result.inserted_id))
+        return await expand(*args, **kwargs)
+
+    monkeypatch.setattr(utils, "expand_recurring_slots", open_earlier_slot)
+    ids = run(calendar_ids(limit=2))
+
+    assert opened[0] in ids
+    assert len(ids) == len(set(ids)) == 5
+
+
+def test_calendar_pages_count_recurring_occurrences_against_the_limit(run):
+    run(seed_recurring(tutors=3, weeks=10))
+
+    ids = run(calendar_ids(limit=4))
+
+    assert len(ids) == len(set(ids)) == 3 + 6 + 3 * 11
+
+
+def test_tutor_availability_pages_count_recurring_occurrences_against_the_limit(run):
+    run(seed_recurring(tutors=2, weeks=10))
+
+    ids = run(tutor_availability_ids("tutor2@test.local", limit=3))
+
+    assert len(ids) == len(set(ids)) == 1 + 11
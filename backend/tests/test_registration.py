@@ -0,0 +1,73 @@
+import asyncio
+from datetime import date, timedelta
+import pytest
+from bson import ObjectId
+from app.mongo import session_collection, registration_collection
+from app.utils import create_tutor_availability
+
+CONTENDERS = 200
+
+
+def create_slot(run, capacity=1):
+    slot_date = (date.today() + timedelta(days=7)).isoformat()
+    return run(create_tutor_availability(
+        "tutor@test.local", "Tutor", "Casual Chat", slot_date, "10:00-11:00", "Room 1", capacity=capacity
+    ))
+
+
+async def rush(api, availability_id, contenders):
+    """Every contender registers for the same slot at once; returns the responses"""
+    async with api:
+        return await asyncio.gather(*[
+            api.post("/student/register", json={
+                "student_email": f"student{index}@test.local",
+                "availability_id": availability_id
+            })
+            for index in range(contenders)
+        ])
+
+
+def test_simultaneous_registrations_only_one_wins(run, api):
+    availability_id = create_slot(run)
+
+    responses = run(rush(api, availability_id, CONTENDERS))
+
+    statuses = [response.status_code for response in responses]
+    assert statuses.count(200) == 1
+    losers = [response.json()["detail"] for response in responses if response.status_code != 200]
+    assert losers == ["This tutor slot is already taken"] * (CONTENDERS - 1)
+
+    registrations = run(registration_collection.find(
+        {"session_id": ObjectId(availability_id), "status": "registered"}
+    ).to_list(length=None))
+    winner = next(response for response in responses if response.status_code == 200)
+    assert [str(registration["_id"]) for registration in registrations] == [winner.json()["registration_id"]]
+
+    slot = run(session_collection.find_one({"_id": ObjectId(availability_id)}))
+    assert slot["is_registered"] is True
+    assert slot["seats_taken"] == 1
+    assert slot["registered_student"] == registrations[0]["student_email"]
+
+
+@pytest.mark.parametrize("capacity", [3, 25])
+def test_simultaneous_registrations_fill_group_capacity_exactly(run, api, capacity):
+    availability_id = create_slot(run, capacity=capacity)
+
+    responses = run(rush(api, availability_id, CONTENDERS))
+
+    winners = [response for response in responses if response.status_code == 200]
+    assert len(winners) == capacity
+    losers = [response.json()["detail"] for response in responses if response.status_code != 200]
+    assert losers == ["This tutor slot is already taken"] * (CONTENDERS - capacity)
+
+    registrations = run(registration_collection.find(
+        {"session_id": ObjectId(availability_id), "status": "registered"}
+    ).to_list(length=None))
+    assert sorted(str(registration["_id"]) for registration in registrations) == sorted(
+        winner.json()["registration_id"] for winner in winners
+    )
+    assert len({registration["student_email"] for registration in registrations}) == capacity
+
+    slot = run(session_collection.find_one({"_id": ObjectId(availability_id)}))
+    assert slot["seats_taken"] == capacity
+    assert slot["is_registered"] is True
@@ -0,0 +1,40 @@
+from datetime import date, timedelta
+from app.mongo import user_collection, session_collection
+from app.utils import build_availability, get_tutor_availability
+
+
+async def seed_tutor(tutor_email, slots):
+    """`slots` one-hour slots for a tutor, every other one booked by a student with a profile"""
+    first_day = date.today() + timedelta(days=1)
+    documents = []
+    students = []
+    for index in range(slots):
+        slot = build_availability(
+            tutor_email, "Tutor", "Casual Chat", (first_day + timedelta(days=index // 8)).isoformat(),
+            "%02d:00-%02d:00" % (9 + index % 8, 10 + index % 8), "Room 1"
+        )
+        if index % 2 == 0:
+            student = f"student{index}.{tutor_email}"
+            slot.update(is_registered=True, registered_student=student, seats_taken=1)
+            students.append({"email": student, "profile": {"preferred_name": f"S{index}", "study_year": "2"}})
+        documents.append(slot)
+    await session_collection.insert_many(documents)
+    await user_collection.insert_many(students)
+
+
+def test_query_count_does_not_grow_with_slots(run, count_commands):
+    commands_by_size = {}
+    for slots in (2, 10, 40):
+        tutor_email = f"tutor{slots}@test.local"
+        run(seed_tutor(tutor_email, slots))
+
+        (availabilities, _), commands = run(count_commands(get_tutor_availability(tutor_email)))
+
+        assert len(availabilities) == slots
+        booked = [a for a in availabilities if a["registered_student"]]
+        assert len(booked) == (slots + 1) // 2
+        assert all(a["student_profile"]["preferred_name"] for a in booked)
+        commands_by_size[slots] = commands
+
+    # Slot page, recurring templates and one batched profile fetch, however many slots are booked
+    assert set(commands_by_size.values()) == {3}, commands_by_size
@@ -0,0 +1,42 @@
+import asyncio
+from app.indexes import ensure_indexes
+from app.migrations import dedupe_users
+from app.mongo import get_db, user_collection
+
+SIGNUPS = 20
+
+
+def test_simultaneous_signups_for_one_email_create_one_account(run, api):
+    async def rush():
+        async with api:
+            return await asyncio.gather(*[
+                api.post("/signup", json={"email": "new@test.local", "password": f"password{index}"})
+                for index in range(SIGNUPS)
+            ])
+
+    responses = run(rush())
+
+    assert [response.status_code for response in responses].count(200) == 1
+    losers = [response.json()["detail"] for response in responses if response.status_code != 200]
+    assert losers == ["Email already registered"] * (SIGNUPS - 1)
+    assert run(user_collection.count_documents({"email": "new@test.local"})) == 1
+
+
+def test_dedupe_users_lets_the_email_index_build(run):
+    run(user_collection.drop_indexes())
+    run(user_collection.insert_many([
+        {"email": "dup@test.local", "password": "first"},
+        {"email": "dup@test.local", "password": "second", "profile": {"preferred_name": "Second"}},
+        {"email": "dup@test.local", "password": "third"},
+        {"email": "single@test.local", "password": "only"},
+    ]))
+    assert "user_collection" in run(ensure_indexes())
+
+    run(dedupe_users())
+
+    assert not run(ensure_indexes())
+    kept = run(user_collection.find_one({"email": "dup@test.local"}))
+    assert kept["password"] == "first"
+    assert kept["profile"] == {"preferred_name": "Second"}
+    assert run(get_db()["user_duplicates"].count_documents({"email": "dup@test.local"})) == 2
+    assert run(user_collection.count_documents({})) == 2
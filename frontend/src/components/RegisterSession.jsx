@@ -73,6 +73,72 @@ function RegisterSession() {
         }
     }, [selectedSessionType, currentWeek]);
 
+    // Patch the calendar from live slot events instead of polling
+    useEffect(() => {
+        if (!selectedSessionType) {
+            return;
+        }
+
+        const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000';
+        const userEmail = localStorage.getItem('username');
+        const url = new URL(`${API_URL}/student/calendar/stream`);
+        url.searchParams.append('session_type', selectedSessionType);
+        const source = new EventSource(url.toString());
+
+        // A booked recurring occurrence is published under its new id; calendars may still hold its virtual one
+        const isSlot = (tutor, slot) => tutor.id === slot.id || (slot.occurrence_id && tutor.id === slot.occurrence_id);
+
+        const removeTutor = (event) => {
+            const slot = JSON.parse(event.data);
+            setAvailableSlots(slots => slots
+                .map(s => ({ ...s, available_tutors: s.available_tutors.filter(t => !isSlot(t, slot)) }))
+                .filter(s => s.available_tutors.length > 0));
+        };
+
+        const addTutor = (event) => {
+            const slot = JSON.parse(event.data);
+            if (slot.tutor_email === userEmail) {
+                return;
+            }
+            setAvailableSlots(slots => {
+                const existing = slots.find(
+                    s => s.date === slot.date && s.time_slot === slot.time_slot && s.session_type === slot.session_type
+                );
+                if (!existing) {
+                    return [...slots, {
+                        date: slot.date,
+                        time_slot: slot.time_slot,
+                        session_type: slot.session_type,
+                        available_tutors: [slot]
+                    }];
+                }
+                if (existing.available_tutors.some(t => isSlot(t, slot))) {
+                    return slots;
+                }
+                return slots.map(s => s === existing
+                    ? { ...s, available_tutors: [...s.available_tutors, slot] }
+                    : s);
+            });
+        };
+
+        const updateTutor = (event) => {
+            const slot = JSON.parse(event.data);
+            setAvailableSlots(slots => slots.map(s => ({
+                ...s,
+                available_tutors: s.available_tutors.map(t => (isSlot(t, slot) ? slot : t))
+            })));
+        };
+
+        source.addEventListener('slot-created', addTutor);
+        source.addEventListener('slot-freed', addTutor);
+        source.addEventListener('slot-taken', removeTutor);
+        source.addEventListener('slot-deleted', removeTutor);
+        source.addEventListener('seats-changed', updateTutor);
+        source.addEventListener('calendar-changed', () => fetchAvailableSlots());
+
+        return () => source.close();
+    }, [selectedSessionType]);
+
     const fetchSessionTypes = async () => {
         try {
             const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000';
@@ -89,20 +155,40 @@ function RegisterSession() {
             const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000';
             const userEmail = localStorage.getItem('username');
             
-            const url = new URL(`${API_URL}/student/calendar`);
-            url.searchParams.append('session_type', selectedSessionType);
-            if (userEmail) {
-                url.searchParams.append('student_email', userEmail);
-            }
-            
-            const response = await fetch(url.toString());
-            
-            if (response.ok) {
+            // The calendar is paged; follow next_cursor and merge slots that span pages
+            const slotsByKey = new Map();
+            let cursor = null;
+            do {
+                const url = new URL(`${API_URL}/student/calendar`);
+                url.searchParams.append('session_type', selectedSessionType);
+                if (userEmail) {
+                    url.searchParams.append('student_email', userEmail);
+                }
+                if (cursor) {
+                    url.searchParams.append('after', cursor);
+                }
+                
+                const response = await fetch(url.toString());
+                
+                if (!response.ok) {
+                    setAvailableSlots([]);
+                    return;
+                }
+
                 const data = await response.json();
-                setAvailableSlots(data.calendar_slots || []);
-            } else {
-                setAvailableSlots([]);
-            }
+                (data.calendar_slots || []).forEach(slot => {
+                    const key = `${slot.date}_${slot.time_slot}_${slot.session_type}`;
+                    const existing = slotsByKey.get(key);
+                    if (existing) {
+                        existing.available_tutors.push(...slot.available_tutors);
+                    } else {
+                        slotsByKey.set(key, slot);
+                    }
+                });
+                cursor = data.next_cursor;
+            } while (cursor);
+
+            setAvailableSlots(Array.from(slotsByKey.values()));
         } catch (error) {
             console.error('Error fetching available slots:', error);
             setAvailableSlots([]);
@@ -201,8 +287,11 @@ function RegisterSession() {
                 alert('Successfully registered for the session!');
                 setShowConfirmModal(false);
                 setSelectedSlot(null);
-                // Refresh available slots
-                fetchAvailableSlots();
+                // Drop the booked slot right away: live events only reach clients of the worker that served
+                // the booking, and may be missed while the stream (re)connects
+                setAvailableSlots(slots => slots
+                    .map(s => ({ ...s, available_tutors: s.available_tutors.filter(t => t.id !== tutor.id) }))
+                    .filter(s => s.available_tutors.length > 0));
             } else {
                 const errorData = await response.json();
                 alert(`Registration failed: ${errorData.detail}`);
@@ -386,6 +475,9 @@ function RegisterSession() {
                                         {tutor.description && (
                                             <p className="tutor-description"> {tutor.description}</p>
                                         )}
+                                        {tutor.capacity > 1 && (
+                                            <p className="tutor-seats">{tutor.seats_remaining} of {tutor.capacity} seats left</p>
+                                        )}
                                     </div>
                                     <button 
                                         className="register-btn"
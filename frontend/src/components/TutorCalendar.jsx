@@ -15,7 +15,8 @@ function TutorCalendar() {
     const [formData, setFormData] = useState({
         session_type: '',
         location: '',
-        description: ''
+        description: '',
+        capacity: 1
     });
 
     // Color palette for sessions
@@ -110,15 +111,30 @@ function TutorCalendar() {
             
             if (!userEmail) return;
             
-            const response = await fetch(`${API_URL}/tutor/availability/${encodeURIComponent(userEmail)}`);
-            
-            if (response.ok) {
+            // Availability is paged; follow next_cursor until every slot is loaded
+            const sessions = [];
+            let cursor = null;
+            do {
+                const url = new URL(`${API_URL}/tutor/availability/${encodeURIComponent(userEmail)}`);
+                if (cursor) {
+                    url.searchParams.append('after', cursor);
+                }
+                const response = await fetch(url.toString());
+                
+                if (!response.ok) {
+                    if (response.status === 404) {
+                        // No existing sessions found, which is fine
+                        setExistingSessions([]);
+                    }
+                    return;
+                }
+
                 const data = await response.json();
-                setExistingSessions(data.availabilities || []);
-            } else if (response.status === 404) {
-                // No existing sessions found, which is fine
-                setExistingSessions([]);
-            }
+                sessions.push(...(data.availabilities || []));
+                cursor = data.next_cursor;
+            } while (cursor);
+
+            setExistingSessions(sessions);
         } catch (error) {
             console.error('Error fetching existing sessions:', error);
             setExistingSessions([]);
@@ -239,33 +255,42 @@ function TutorCalendar() {
         
         try {
             const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000';
-            const promises = Array.from(selectedTimeSlots).map(async (slotKey) => {
+            // Publish every selected slot in one request
+            const availabilities = Array.from(selectedTimeSlots).map((slotKey) => {
                 const [date, timeSlot] = slotKey.split('_');
-                
-                const response = await fetch(`${API_URL}/tutor/availability`, {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json',
-                    },
-                    body: JSON.stringify({
-                        tutor_email: userEmail,
-                        tutor_name: username,
-                        session_type: formData.session_type,
-                        date: date,
-                        time_slot: timeSlot,
-                        location: formData.location,
-                        description: formData.description
-                    })
-                });
+                return {
+                    tutor_email: userEmail,
+                    tutor_name: username,
+                    session_type: formData.session_type,
+                    date: date,
+                    time_slot: timeSlot,
+                    location: formData.location,
+                    description: formData.description,
+                    capacity: formData.capacity
+                };
+            });
 
-                if (!response.ok) {
-                    throw new Error(`Failed to create session for ${date} ${timeSlot}`);
-                }
-                
-                return response.json();
+            const response = await fetch(`${API_URL}/tutor/availability/batch`, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+                body: JSON.stringify({ availabilities })
             });
 
-            await Promise.all(promises);
+            if (!response.ok) {
+                throw new Error('Failed to create sessions');
+            }
+
+            const data = await response.json();
+            const failed = data.results.filter(result => result.error);
+            if (failed.length > 0) {
+                const messages = failed.map(result => {
+                    const slot = availabilities[result.index];
+                    return `${slot.date} ${slot.time_slot}: ${result.error}`;
+                });
+                throw new Error(`Failed to create some sessions:\n${messages.join('\n')}`);
+            }
             
             alert('Successfully created session!');
             setSelectedTimeSlots(new Set());
@@ -273,7 +298,8 @@ function TutorCalendar() {
             setFormData({
                 session_type: '',
                 location: '',
-                description: ''
+                description: '',
+                capacity: 1
             });
             
             // Refresh existing sessions
@@ -496,6 +522,16 @@ function TutorCalendar() {
                                 />
                             </div>
                             
+                            <div className="form-group">
+                                <label>Seats</label>
+                                <input
+                                    type="number"
+                                    min="1"
+                                    value={formData.capacity}
+                                    onChange={(e) => setFormData({...formData, capacity: Math.max(1, parseInt(e.target.value, 10) || 1)})}
+                                />
+                            </div>
+                            
                             <div className="form-group">
                                 <label>Description</label>
                                 <textarea 